@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of PDF text extraction: page ranges opened once per worker, as
+`extract_text_from_pdf` does on each execution backend, against opening the
+document for every page.
+
+Usage:
+    uv run python scripts/benchmark_pdf_extraction.py --pages 1000 --workers 8
+    uv run python scripts/benchmark_pdf_extraction.py --pdf /path/to/document.pdf
+"""
+
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict
+
+import fitz  # PyMuPDF
+
+from core.document_loader.document_loader import extract_text_from_pdf
+from core.document_loader.executors import (
+    ExecutionBackend,
+    TaskRunner,
+    shutdown_process_pool,
+)
+
+
+def _extract_per_page(path: Path, max_workers: int) -> Dict[int, str]:
+    """The previous approach, every task opens the document for a single page."""
+
+    def extract_page(page_idx: int) -> tuple[int, str]:
+        with fitz.open(path) as doc:
+            return page_idx + 1, doc[page_idx].get_text()
+
+    with fitz.open(path) as doc:
+        page_count = len(doc)
+    with ThreadPoolExecutor(max_workers=min(max_workers, page_count)) as executor:
+        return dict(executor.map(extract_page, range(page_count)))
+
+
+def _extract_page_ranges(backend: ExecutionBackend) -> Callable[..., Dict[int, str]]:
+    def extract(path: Path, max_workers: int) -> Dict[int, str]:
+        return extract_text_from_pdf(path, max_workers, TaskRunner(backend))
+
+    return extract
+
+
+def _create_pdf(path: Path, pages: int) -> None:
+    paragraph = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 40
+    with fitz.open() as doc:
+        for page_number in range(pages):
+            page = doc.new_page()
+            page.insert_textbox(
+                fitz.Rect(50, 50, 550, 800), f"Page {page_number + 1}\n{paragraph}"
+            )
+        doc.save(path)
+
+
+def _measure(
+    extract: Callable[[Path, int], Dict[int, str]],
+    path: Path,
+    workers: int,
+    repeat: int,
+) -> tuple[float, int]:
+    best = float("inf")
+    pages = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pages = len(extract(path, workers))
+        best = min(best, time.perf_counter() - started)
+    return best, pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pdf", type=Path, help="document to extract")
+    parser.add_argument(
+        "--pages", type=int, default=1000, help="pages of a generated document"
+    )
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = args.pdf
+        if not path:
+            path = Path(temp_dir) / "benchmark.pdf"
+            _create_pdf(path, args.pages)
+
+        # warm up the process pool, it's started once per process
+        _extract_page_ranges("process")(path, args.workers)
+        for name, extract in [
+            ("per page", _extract_per_page),
+            ("inline", _extract_page_ranges("inline")),
+            ("threads", _extract_page_ranges("thread")),
+            ("processes", _extract_page_ranges("process")),
+        ]:
+            seconds, pages = _measure(extract, path, args.workers, args.repeat)
+            print(
+                f"{name:>10}: {pages} pages in {seconds:.3f} s, "
+                f"{pages / seconds:.0f} pages/s"
+            )
+        shutdown_process_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -17,10 +17,15 @@ for passing around to LLMs and agents.
 """
 
 from .constants import SUPPORTED_FILE_TYPES, SUPPORTED_MIME_TYPES
-from .document_loader import convert_document_to_text
+from .document_loader import (
+    aiter_document_pages,
+    convert_document_to_text,
+    iter_document_pages,
+)
 from .exceptions import (
     DocProcessorError,
     DocProcessorNoExtractorError,
+    DocProcessorTimeoutError,
     DocProcessorUnsupportedFileTypeError,
 )
 from .image_loader import convert_document_pages_to_images
@@ -29,8 +34,11 @@ __all__ = [
     "SUPPORTED_FILE_TYPES",
     "SUPPORTED_MIME_TYPES",
     "convert_document_to_text",
+    "iter_document_pages",
+    "aiter_document_pages",
     "convert_document_pages_to_images",
     "DocProcessorError",
     "DocProcessorNoExtractorError",
+    "DocProcessorTimeoutError",
     "DocProcessorUnsupportedFileTypeError",
 ]
@@ -25,6 +25,12 @@ SUPPORTED_MIME_TYPES = {
     "text/plain",
 }
 DEFAULT_MAX_WORKERS = 8
+# each PDF worker opens the document, which isn't worth it for fewer pages
+PDF_MIN_PAGES_PER_WORKER = 8
+# pages extracted together when streaming, the first ones arrive after a chunk
+PDF_STREAM_PAGES_PER_CHUNK = 16
+# uncompressed DOCX body parsed by a worker, smaller bodies are parsed at once
+DOCX_MIN_BYTES_PER_WORKER = 2 * 1024**2
 
 # Default to lower DPI for better performance
 DEFAULT_DPI = 72
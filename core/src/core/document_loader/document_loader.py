@@ -17,23 +17,41 @@ Supports lazy loading, parallel processing, and robust fallback strategies for d
 """
 
 # TODO: Ask Brett: why not textract to support more file types?
+import asyncio
 import logging
+import math
 import tempfile
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import xml.etree.ElementTree as ET
+import zipfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Callable, Dict, Tuple
+from typing import AsyncIterator, Callable, Dict, Generator, Iterator, Tuple
 
-import docx
 import fitz  # PyMuPDF
 import pptx
 from fsspec import AbstractFileSystem
+from fsspec.implementations.local import LocalFileSystem
 
-from ..persistent_fs.dr_file_system import get_file_system
-from .constants import DEFAULT_MAX_WORKERS, SUPPORTED_FILE_TYPES, TEXT_FILE_TYPES
+from ..persistent_fs.dr_file_system import DRFileSystem, get_file_system
+from .constants import (
+    DEFAULT_MAX_WORKERS,
+    DOCX_MIN_BYTES_PER_WORKER,
+    PDF_MIN_PAGES_PER_WORKER,
+    PDF_STREAM_PAGES_PER_CHUNK,
+    SUPPORTED_FILE_TYPES,
+    TEXT_FILE_TYPES,
+)
+from .docx_reader import (
+    docx_body_part,
+    join_docx_pages,
+    parse_docx_body,
+    split_docx_body,
+)
 from .exceptions import (
     DocProcessorNoExtractorError,
     DocProcessorUnsupportedFileTypeError,
 )
+from .executors import DEFAULT_EXECUTION_BACKEND, ExecutionBackend, TaskRunner
 
 logger = logging.getLogger(__name__)
 
@@ -42,21 +60,94 @@ def convert_document_to_text(
     document_path: str,
     max_workers: int = DEFAULT_MAX_WORKERS,
     file_system: AbstractFileSystem | None = None,
+    backend: ExecutionBackend = DEFAULT_EXECUTION_BACKEND,
+    timeout: float | None = None,
 ) -> Dict[int, str]:
     """
     Extract per-page text from a document, auto-detecting file type.
 
     Args:
         document_path: Path to the document file.
-        max_workers: Maximum number of worker threads for parallel processing.
+        max_workers: Maximum number of workers for parallel processing.
         file_system: implementation of AbstractFileSystem for accessing to files, LocalFileSystem is default
+        backend: Where the pages are extracted: "thread" pool, warm "process"
+            pool shared across calls, which runs PyMuPDF outside the GIL, or
+            "inline" in the calling thread.
+        timeout: Seconds after which the extraction is cancelled.
     Returns:
         Dict mapping page numbers (1-indexed) to extracted text.
     Raises:
         ValueError: If document type is not supported.
         FileNotFoundError: If document file doesn't exist.
+        DocProcessorTimeoutError: If the extraction exceeds the timeout.
+    """
+    runner = TaskRunner(backend, timeout)
+    with _local_document(document_path, file_system, runner) as (local_path, file_ext):
+        return FILE_TYPES_TO_EXTRACTORS[file_ext](local_path, max_workers, runner)
+
+
+def iter_document_pages(
+    document_path: str,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    file_system: AbstractFileSystem | None = None,
+    backend: ExecutionBackend = DEFAULT_EXECUTION_BACKEND,
+    timeout: float | None = None,
+) -> Generator[Tuple[int, str], None, None]:
     """
+    Extract per-page text from a document like `convert_document_to_text`,
+    yielding (page number, text) pairs in page order as they are extracted.
+    PDF pages are extracted in small ranges, only a couple per worker run
+    ahead of the caller, so memory doesn't grow with the document. Other
+    file types are extracted whole before their first page is yielded.
+    Closing the iterator cancels the extraction.
+    """
+    runner = TaskRunner(backend, timeout)
+    with _local_document(document_path, file_system, runner) as (local_path, file_ext):
+        if file_ext != "pdf":
+            extract = FILE_TYPES_TO_EXTRACTORS[file_ext]
+            yield from sorted(extract(local_path, max_workers, runner).items())
+            return
+
+        with fitz.open(local_path) as doc:
+            page_count = len(doc)
+        workers = runner.max_workers(max_workers)
+        chunk_size = max(
+            1, min(PDF_STREAM_PAGES_PER_CHUNK, math.ceil(page_count / workers))
+        )
+        cancelled = runner.cancel_check()
+        tasks = (
+            (local_path, range(start, min(start + chunk_size, page_count)), cancelled)
+            for start in range(0, page_count, chunk_size)
+        )
+        for results in runner.imap(_extract_pdf_pages_fitz, tasks, max_workers):
+            yield from results
 
+
+async def aiter_document_pages(
+    document_path: str,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    file_system: AbstractFileSystem | None = None,
+    backend: ExecutionBackend = DEFAULT_EXECUTION_BACKEND,
+    timeout: float | None = None,
+) -> AsyncIterator[Tuple[int, str]]:
+    """Async variant of `iter_document_pages`, extracting off the event loop."""
+    pages = iter_document_pages(
+        document_path, max_workers, file_system, backend, timeout
+    )
+    try:
+        while page := await asyncio.to_thread(next, pages, None):
+            yield page
+    finally:
+        await asyncio.to_thread(pages.close)
+
+
+@contextmanager
+def _local_document(
+    document_path: str,
+    file_system: AbstractFileSystem | None,
+    runner: TaskRunner,
+) -> Iterator[Tuple[Path, str]]:
+    """Yield a local path of the document and its type."""
     if not file_system:
         file_system = get_file_system()
     if not file_system.exists(document_path):
@@ -71,108 +162,166 @@ def convert_document_to_text(
         raise DocProcessorNoExtractorError(file_ext)
 
     logger.info(f"Processing {file_ext} document: {document_path}")
-    with tempfile.TemporaryDirectory() as tmpdirname:
-        tmp_path = Path(tmpdirname) / path.name
-        file_system.get(
-            document_path, str(tmp_path)
-        )  # copy file from persistent FS so we process locally
+    with _resolve_local_path(document_path, file_system) as local_path:
+        runner.check()
+        yield local_path, file_ext
 
-        return FILE_TYPES_TO_EXTRACTORS[file_ext](tmp_path, max_workers)
+
+@contextmanager
+def _resolve_local_path(
+    document_path: str, file_system: AbstractFileSystem
+) -> Iterator[Path]:
+    """
+    Local file with the document content, which extractors only read. Files of
+    the local file system are used in place, DRFileSystem lends its cached
+    copy; other file systems are copied to a temporary directory.
+    """
+    if isinstance(file_system, LocalFileSystem):
+        yield Path(file_system._strip_protocol(document_path))
+    elif isinstance(file_system, DRFileSystem):
+        with file_system.local_path(document_path) as local_path:
+            yield Path(local_path)
+    else:
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            tmp_path = Path(tmpdirname) / Path(document_path).name
+            file_system.get(document_path, str(tmp_path))
+            yield tmp_path
 
 
-def _extract_pdf_page_fitz(path: Path, page_idx: int) -> Tuple[int, str]:
+def _pdf_page_ranges(page_count: int, max_workers: int) -> list[range]:
+    """
+    Split PDF pages to contiguous ranges, one per worker. Small documents use
+    fewer workers, opening the document costs more than extracting a few pages.
     """
-    Helper for parallel PDF extraction using PyMuPDF.
-    Returns (1-indexed page number, text).
+    workers = max(1, min(max_workers, math.ceil(page_count / PDF_MIN_PAGES_PER_WORKER)))
+    chunk_size = max(1, math.ceil(page_count / workers))
+    return [
+        range(start, min(start + chunk_size, page_count))
+        for start in range(0, page_count, chunk_size)
+    ]
+
+
+def _extract_pdf_pages_fitz(
+    path: Path, pages: range, cancelled: Callable[[], bool] | None = None
+) -> list[Tuple[int, str]]:
+    """
+    Helper for parallel PDF extraction using PyMuPDF, the document is opened
+    once for the whole range. Returns (1-indexed page number, text) pairs,
+    stops early once `cancelled` returns True.
     """
     try:
-        with fitz.open(path) as doc:
-            page = doc[page_idx]
-            text = page.get_text()
-            return (page_idx + 1, text)
+        doc = fitz.open(path)
     except Exception as e:
-        logger.exception(f"Error extracting text from PDF page {page_idx + 1}: {e}")
-        return (page_idx + 1, "")
+        logger.exception(
+            f"Error opening PDF for pages {pages.start + 1}-{pages.stop}: {e}"
+        )
+        return [(page_idx + 1, "") for page_idx in pages]
+    with doc:
+        results = []
+        for page_idx in pages:
+            if cancelled and cancelled():
+                break
+            try:
+                text = doc[page_idx].get_text()
+            except Exception as e:
+                logger.exception(
+                    f"Error extracting text from PDF page {page_idx + 1}: {e}"
+                )
+                text = ""
+            results.append((page_idx + 1, text))
+        return results
 
 
 def extract_text_from_pdf(
-    path: Path, max_workers: int = DEFAULT_MAX_WORKERS
+    path: Path,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    runner: TaskRunner | None = None,
 ) -> Dict[int, str]:
     """
     Extract text from each page of a PDF using parallel processing.
-    Prefers PyMuPDF for speed, falls back to PyPDF2 if needed.
+    Pages are split to contiguous ranges, each worker opens the document once
+    and extracts its range with PyMuPDF.
 
     Args:
         path: Path to the PDF file.
-        max_workers: Maximum number of worker threads.
+        max_workers: Maximum number of workers.
+        runner: Execution backend and timeout, worker threads by default.
     Returns:
         Dict mapping page numbers to page text.
-    Raises:
-        ImportError: If no PDF extraction library is available.
     """
+    runner = runner or TaskRunner()
     with fitz.open(path) as doc:
         page_count = len(doc)
-    page_text = {}
-    actual_workers = min(max_workers, max(1, page_count))
-    with ThreadPoolExecutor(max_workers=actual_workers) as executor:
-        future_to_page = {
-            executor.submit(_extract_pdf_page_fitz, path, page_idx): page_idx
-            for page_idx in range(page_count)
-        }
-        for future in as_completed(future_to_page):
-            page_num, text = future.result()
-            page_text[page_num] = text
+    page_text: Dict[int, str] = {}
+    page_ranges = _pdf_page_ranges(page_count, runner.max_workers(max_workers))
+    for results in runner.run(
+        _extract_pdf_pages_fitz,
+        [(path, pages, runner.cancel_check()) for pages in page_ranges],
+        max_workers,
+    ):
+        page_text.update(results)
     logger.info(f"Extracted text from {len(page_text)} PDF pages using PyMuPDF")
     return page_text
 
 
 def extract_text_from_docx(
-    path: Path, max_workers: int = DEFAULT_MAX_WORKERS
+    path: Path,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    runner: TaskRunner | None = None,
 ) -> Dict[int, str]:
     """
-    Extract text from a DOCX file, splitting by page breaks.
-    Each section between page breaks is treated as a "page".
+    Extract text from a DOCX file, splitting by page and section breaks.
+    The document body is parsed incrementally; large bodies are split at
+    section breaks and the parts are parsed in parallel.
 
     Args:
         path: Path to the Word document.
+        max_workers: Maximum number of workers.
+        runner: Execution backend and timeout, worker threads by default.
     Returns:
         Dict mapping simulated page numbers to text.
-    Raises:
-        ImportError: If python-docx is not installed.
     """
-    # TODO: Add support for parallel processing if needed
-    page_text = {}
+    runner = runner or TaskRunner()
+    cancelled = runner.cancel_check()
     try:
-        doc = docx.Document(str(path))
-        current_page = 1
-        current_text = ""
-        for para in doc.paragraphs:
-            if (
-                "PAGE BREAK" in para.text.upper()
-                or para.text.strip() == "\f"
-                or (
-                    hasattr(para, "style")
-                    and para.style
-                    and "page break" in str(para.style).lower()
-                )
-            ):
-                if current_text.strip():
-                    page_text[current_page] = current_text.strip()
-                    current_page += 1
-                    current_text = ""
-            else:
-                current_text += para.text + "\n"
-        if current_text.strip():
-            page_text[current_page] = current_text.strip()
-        logger.info(f"Extracted {len(page_text)} pages from DOCX document")
+        with zipfile.ZipFile(path) as archive:
+            body_part = docx_body_part(archive)
+            body_size = archive.getinfo(body_part).file_size
+            workers = min(
+                runner.max_workers(max_workers),
+                body_size // DOCX_MIN_BYTES_PER_WORKER,
+            )
+            parts = None
+            if workers >= 2:
+                fragments = split_docx_body(archive.read(body_part), workers)
+                try:
+                    parts = runner.run(
+                        parse_docx_body,
+                        [(fragment, cancelled) for fragment in fragments],
+                        max_workers,
+                    )
+                except ET.ParseError as e:
+                    logger.warning(
+                        f"Failed to parse split DOCX body, parsing it whole: {e}"
+                    )
+            if parts is None:
+                with archive.open(body_part) as body:
+                    parts = [parse_docx_body(body, cancelled)]
     except Exception as e:
         logger.error(f"Error extracting text from DOCX: {e}")
         raise
+    runner.check()
+    page_text = dict(enumerate(join_docx_pages(parts), start=1))
+    logger.info(
+        f"Extracted {len(page_text)} pages from DOCX document in {len(parts)} parts"
+    )
     return page_text
 
 
 def extract_text_from_pptx(
-    path: Path, max_workers: int = DEFAULT_MAX_WORKERS
+    path: Path,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    runner: TaskRunner | None = None,
 ) -> Dict[int, str]:
     """
     Extract text from a PPTX file, treating each slide as a page.
@@ -201,7 +350,9 @@ def extract_text_from_pptx(
 
 
 def extract_text_from_txt(
-    path: Path, max_workers: int = DEFAULT_MAX_WORKERS
+    path: Path,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    runner: TaskRunner | None = None,
 ) -> Dict[int, str]:
     """
     Extract text from a TXT file, splitting by page markers or length.
@@ -261,7 +412,9 @@ def split_text_into_pages(content: str, max_chars_per_page: int = 3000) -> list[
     return pages
 
 
-FILE_TYPES_TO_EXTRACTORS: Dict[str, Callable[[Path, int], Dict[int, str]]] = {
+FILE_TYPES_TO_EXTRACTORS: Dict[
+    str, Callable[[Path, int, TaskRunner | None], Dict[int, str]]
+] = {
     "pdf": extract_text_from_pdf,
     "docx": extract_text_from_docx,
     "pptx": extract_text_from_pptx,
@@ -0,0 +1,229 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Streaming text extraction from the body of DOCX files. The main document part,
+usually word/document.xml, is parsed incrementally, pages end at page breaks
+and at section breaks other than continuous ones. Large bodies are split at
+section breaks into fragments, which can be parsed in parallel.
+"""
+
+import io
+import posixpath
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from dataclasses import dataclass, field
+from typing import IO, Callable, Iterable
+
+DOCX_BODY_PART = "word/document.xml"  # unless the package points elsewhere
+PACKAGE_RELATIONSHIPS_PART = "_rels/.rels"
+
+RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+BODY = _w("body")
+PARAGRAPH = _w("p")
+PARAGRAPH_PROPERTIES = _w("pPr")
+TEXT = _w("t")
+TAB = _w("tab")
+POSITIONAL_TAB = _w("ptab")
+BREAK = _w("br")
+CARRIAGE_RETURN = _w("cr")
+NO_BREAK_HYPHEN = _w("noBreakHyphen")
+TABLE = _w("tbl")
+TABLE_ROW = _w("tr")
+TABLE_CELL = _w("tc")
+SECTION_PROPERTIES = _w("sectPr")
+SECTION_TYPE = _w("type")
+# attributes
+TYPE = _w("type")
+VAL = _w("val")
+# text boxes are anchored within paragraphs and repeated in their fallback
+SKIPPED = {_w("txbxContent"), f"{{{MC_NS}}}Fallback"}
+
+# paragraph ending a section, i.e. one with section properties, is the place
+# where the body can be split into fragments of complete top level elements
+_SECTION_END = re.compile(rb"<w:sectPr\b.*?</w:p>", re.DOTALL)
+_BODY_START = re.compile(rb"<w:body\b[^>]*>")
+
+
+def docx_body_part(archive: zipfile.ZipFile) -> str:
+    """
+    Name of the main document part, as the package relationships tell, or the
+    usual one if they don't.
+    """
+    try:
+        relationships = ET.fromstring(archive.read(PACKAGE_RELATIONSHIPS_PART))
+    except (KeyError, ET.ParseError):
+        return DOCX_BODY_PART
+    for relationship in relationships.iter(f"{{{RELS_NS}}}Relationship"):
+        # transitional and strict documents use different namespaces
+        target = relationship.get("Target")
+        if relationship.get("Type", "").endswith("/officeDocument") and target:
+            # targets are relative to the package root
+            return posixpath.normpath(target).lstrip("/")
+    return DOCX_BODY_PART
+
+
+@dataclass
+class DocxPages:
+    """Lines of each page of a parsed body, or of a fragment of it."""
+
+    pages: list[list[str]] = field(default_factory=lambda: [[]])
+    # whether the first section continues the last page of the previous one
+    continuous_start: bool = False
+
+
+def parse_docx_body(
+    source: IO[bytes] | bytes, cancelled: Callable[[], bool] | None = None
+) -> DocxPages:
+    """
+    Parse the main document part, or a fragment from `split_docx_body`, to
+    lines of pages. Table rows are lines of their cells separated by tabs.
+    Stops early once `cancelled` returns True.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    result = DocxPages()
+    pages = result.pages
+    body: ET.Element | None = None
+    paragraph: list[str] | None = None  # text of the open paragraph
+    cells: list[list[str]] = []  # paragraphs of open table cells
+    rows: list[list[str]] = []  # cells of open table rows
+    skipped = 0  # depth within skipped elements
+    in_properties = False
+    section_type: str | None = None  # set within section properties
+    section_ends = False  # after the open paragraph
+    # (page, line) after the end of the previous section, its break is known
+    # only once the properties of the next section are parsed
+    section_break: tuple[int, int] | None = None
+    first_section = True
+
+    def add_line(line: str) -> None:
+        (cells[-1] if cells else pages[-1]).append(line)
+
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        tag = element.tag
+        if skipped or tag in SKIPPED:
+            skipped += 1 if event == "start" else -1
+            continue
+
+        if event == "start":
+            if tag == PARAGRAPH:
+                paragraph = []
+            elif tag == PARAGRAPH_PROPERTIES:
+                in_properties = True
+            elif tag == TABLE_ROW:
+                rows.append([])
+            elif tag == TABLE_CELL:
+                cells.append([])
+            elif tag == SECTION_PROPERTIES:
+                section_type = "nextPage"
+            elif tag == BODY:
+                body = element
+            continue
+
+        if paragraph is not None and not in_properties:
+            if tag == TEXT:
+                paragraph.append(element.text or "")
+            elif tag in (TAB, POSITIONAL_TAB):
+                paragraph.append("\t")
+            elif tag == BREAK and element.get(TYPE) == "page" and not cells:
+                # text before the break stays on the previous page
+                pages[-1].append("".join(paragraph))
+                paragraph.clear()
+                pages.append([])
+            elif tag in (BREAK, CARRIAGE_RETURN):
+                paragraph.append("\n")
+            elif tag == NO_BREAK_HYPHEN:
+                paragraph.append("-")
+
+        if tag == PARAGRAPH_PROPERTIES:
+            in_properties = False
+        elif tag == SECTION_TYPE and section_type is not None:
+            section_type = element.get(VAL, section_type)
+        elif tag == SECTION_PROPERTIES:
+            # a section's properties follow its content, their type tells
+            # how the section starts after the previous one
+            continuous = section_type == "continuous"
+            if first_section:
+                result.continuous_start = continuous
+                first_section = False
+            elif section_break and not continuous:
+                page, line = section_break
+                pages.insert(page + 1, pages[page][line:])
+                del pages[page][line:]
+            section_type = None
+            section_break = None
+            section_ends = paragraph is not None
+        elif tag == TABLE_CELL:
+            rows[-1].append(" ".join(line for line in cells.pop() if line))
+        elif tag == TABLE_ROW:
+            add_line("\t".join(rows.pop()))
+        elif tag == PARAGRAPH and paragraph is not None:
+            add_line("".join(paragraph))
+            paragraph = None
+            if section_ends:
+                section_break = (len(pages) - 1, len(pages[-1]))
+                section_ends = False
+
+        if tag in (PARAGRAPH, TABLE) and not cells and body is not None:
+            body.clear()  # top level element is done, free its tree
+            if cancelled and cancelled():
+                break
+    return result
+
+
+def split_docx_body(document_xml: bytes, max_fragments: int) -> list[bytes]:
+    """
+    Split the main document part at section breaks into at most
+    `max_fragments` documents of similar size, each with a part of the body.
+    Bodies without section breaks, or not using the usual "w" prefix, stay
+    whole. The split is textual, so a fragment may not be well-formed.
+    """
+    body_start = _BODY_START.search(document_xml)
+    body_end = document_xml.rfind(b"</w:body>")
+    if not body_start or body_end == -1 or max_fragments < 2:
+        return [document_xml]
+    head, tail = document_xml[: body_start.end()], document_xml[body_end:]
+
+    target_size = (body_end - body_start.end()) / max_fragments
+    fragments: list[bytes] = []
+    start = body_start.end()
+    for section_end in _SECTION_END.finditer(document_xml, start, body_end):
+        if len(fragments) == max_fragments - 1:
+            break
+        if section_end.end() - start >= target_size:
+            fragments.append(head + document_xml[start : section_end.end()] + tail)
+            start = section_end.end()
+    fragments.append(head + document_xml[start:body_end] + tail)
+    return fragments
+
+
+def join_docx_pages(parts: Iterable[DocxPages]) -> list[str]:
+    """Text of non-empty pages of the parsed fragments of a body, in order."""
+    pages: list[list[str]] = []
+    for part in parts:
+        part_pages = list(part.pages)
+        if pages and part.continuous_start:
+            pages[-1].extend(part_pages.pop(0))
+        pages.extend(part_pages)
+    texts = ("\n".join(lines).strip() for lines in pages)
+    return [text for text in texts if text]
@@ -34,3 +34,15 @@ class DocProcessorUnsupportedFileTypeError(DocProcessorError):
     def __init__(self, file_type: str):
         super().__init__(f"Unsupported file type: {file_type}")
         self.file_type = file_type
+
+
+class DocProcessorTimeoutError(DocProcessorError):
+    """Raised when document processing is cancelled or exceeds its timeout."""
+
+    def __init__(self, timeout: float | None):
+        super().__init__(
+            f"Document processing exceeded its timeout of {timeout} seconds"
+            if timeout is not None
+            else "Document processing was cancelled"
+        )
+        self.timeout = timeout
@@ -0,0 +1,249 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Execution backends for document extraction: worker threads, a warm process
+pool shared across calls, or the calling thread. PyMuPDF holds the GIL for
+most of its work, so only processes extract pages of a PDF in parallel.
+"""
+
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Literal,
+    Sequence,
+    TypeVar,
+    cast,
+    get_args,
+)
+
+from .exceptions import DocProcessorTimeoutError
+
+logger = logging.getLogger(__name__)
+
+ExecutionBackend = Literal["thread", "process", "inline"]
+EXECUTION_BACKENDS: tuple[ExecutionBackend, ...] = get_args(ExecutionBackend)
+DEFAULT_EXECUTION_BACKEND = cast(
+    ExecutionBackend, os.environ.get("DOCUMENT_LOADER_EXECUTION_BACKEND", "thread")
+)
+
+R = TypeVar("R")
+
+_process_pool: tuple[int, ProcessPoolExecutor] | None = None  # (pid, pool)
+_process_pool_lock = threading.Lock()
+
+
+def _cgroup_cpu_limit() -> float | None:
+    """CPUs granted by the cgroup CPU quota, None if unlimited."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota_us = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period_us = int(f.read())
+    except (OSError, ValueError):
+        return None
+    return quota_us / period_us if quota_us > 0 and period_us > 0 else None
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process can use: the CPU affinity mask capped by the cgroup
+    quota, which containers get instead of dedicated CPUs.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Return the process pool shared by extractions of this process, started on
+    first use with a worker per available CPU. Workers stay warm between calls,
+    so the libraries are imported once; a broken pool is replaced.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool:
+            pid, pool = _process_pool
+            # a forked child can't use the pool of its parent
+            if pid == os.getpid() and not getattr(pool, "_broken", False):
+                return pool
+        # forking a process with threads may deadlock the child
+        method = (
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else "spawn"
+        )
+        workers = available_cpus()
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context(method)
+        )
+        _process_pool = (os.getpid(), pool)
+        logger.info(
+            "Started document extraction process pool.", extra={"workers": workers}
+        )
+        return pool
+
+
+def _process_pool_of_this_process() -> ProcessPoolExecutor | None:
+    pool = _process_pool
+    return pool[1] if pool and pool[0] == os.getpid() else None
+
+
+def shutdown_process_pool() -> None:
+    """Stop workers of the shared process pool, the next extraction starts new."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool and _process_pool[0] == os.getpid():
+            _process_pool[1].shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+class TaskRunner:
+    """
+    Runs extraction tasks on an execution backend within an optional timeout.
+    When the timeout passes or `cancel()` is called, tasks not started yet are
+    cancelled and DocProcessorTimeoutError is raised. Tasks running in threads
+    stop at their next check of `cancel_check()`, ones in worker processes
+    can't be interrupted and finish their chunk in the background.
+    """
+
+    def __init__(
+        self,
+        backend: ExecutionBackend = DEFAULT_EXECUTION_BACKEND,
+        timeout: float | None = None,
+    ) -> None:
+        if backend not in EXECUTION_BACKENDS:
+            raise ValueError(f"Unknown execution backend: {backend}")
+        self.backend = backend
+        self.timeout = timeout
+        self._deadline = None if timeout is None else time.monotonic() + timeout
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> float | None:
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    def cancelled(self) -> bool:
+        if not self._cancelled.is_set() and self.remaining() == 0.0:
+            self._cancelled.set()
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Stop running tasks, e.g. from another thread when the caller gave up."""
+        self._cancelled.set()
+
+    def cancel_check(self) -> Callable[[], bool] | None:
+        """Callable telling tasks to stop, None for processes it can't reach."""
+        return None if self.backend == "process" else self.cancelled
+
+    def check(self) -> None:
+        """Raise DocProcessorTimeoutError if the work was cancelled."""
+        if self.cancelled():
+            raise DocProcessorTimeoutError(self.timeout)
+
+    def max_workers(self, requested: int) -> int:
+        """Workers worth using, processes are capped by the CPUs available."""
+        if self.backend == "inline":
+            return 1
+        if self.backend == "process":
+            return max(1, min(requested, available_cpus()))
+        return max(1, requested)
+
+    def run(
+        self,
+        func: Callable[..., R],
+        tasks: Sequence[tuple[Any, ...]],
+        max_workers: int,
+    ) -> list[R]:
+        """Call `func` with the arguments of each task, return results in order."""
+        return list(self.imap(func, tasks, max_workers, max_in_flight=len(tasks)))
+
+    def imap(
+        self,
+        func: Callable[..., R],
+        tasks: Iterable[tuple[Any, ...]],
+        max_workers: int,
+        max_in_flight: int | None = None,
+    ) -> Iterator[R]:
+        """
+        Call `func` with the arguments of each task, yield results in task
+        order as they complete. At most `max_in_flight` tasks, twice the
+        workers by default, are submitted or buffered before their results are
+        consumed. Closing the iterator cancels the tasks not started yet.
+        """
+        self.check()
+        workers = self.max_workers(max_workers)
+        pool: Executor
+        if self.backend == "process":
+            # even a single task, it would hold the GIL of the caller otherwise
+            pool = get_process_pool()
+        elif self.backend == "inline" or workers == 1:
+            for args in tasks:
+                self.check()
+                yield func(*args)
+                # tasks stopped by cancel() return incomplete results
+                self.check()
+            return
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers)
+
+        limit = max(1, max_in_flight or 2 * workers)
+        pending = iter(tasks)
+        in_flight: deque[Future[R]] = deque()
+        try:
+            for args in itertools.islice(pending, limit):
+                in_flight.append(pool.submit(func, *args))
+            while in_flight:
+                try:
+                    result = in_flight.popleft().result(self.remaining())
+                except FutureTimeoutError:
+                    self.cancel()
+                    raise DocProcessorTimeoutError(self.timeout) from None
+                self.check()
+                for args in itertools.islice(pending, 1):
+                    in_flight.append(pool.submit(func, *args))
+                yield result
+        finally:
+            for future in in_flight:
+                future.cancel()
+            if pool is not _process_pool_of_this_process():
+                # threads of cancelled tasks stop on their own, don't wait
+                pool.shutdown(wait=False, cancel_futures=True)
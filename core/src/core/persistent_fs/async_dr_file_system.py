@@ -0,0 +1,454 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import contextlib
+import datetime
+import logging
+import os
+import shutil
+import ssl
+import threading
+import uuid
+from typing import Any, AsyncIterator, BinaryIO
+
+import httpx
+import requests
+from fsspec.asyn import AsyncFileSystem
+from fsspec.implementations.asyn_wrapper import AsyncFileSystemWrapper
+from fsspec.implementations.local import LocalFileSystem
+
+from core.persistent_fs.dr_file_system import (
+    DOWNLOAD_ATTEMPTS,
+    DOWNLOAD_CHUNK_SIZE,
+    FILE_API_CONNECT_TIMEOUT,
+    FILE_API_READ_TIMEOUT,
+    DRFileSystem,
+    all_env_variables_present,
+    calculate_checksum,
+    get_dr_file_system,
+)
+from core.persistent_fs.local_cache import CacheMode
+from core.persistent_fs.metadata_journal import NodeInfo
+
+logger = logging.getLogger(__name__)
+
+# connections to the catalog API kept by the async client of the process
+ASYNC_MAX_CONNECTIONS = int(os.environ.get("DR_FS_ASYNC_MAX_CONNECTIONS", 20))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class AsyncDRFileSystem(AsyncFileSystem):  # type: ignore[misc]
+    """
+    Asynchronous DRFileSystem for use inside event loops.
+
+    Catalog files are transferred with a pooled async HTTP client, so awaiting
+    them doesn't block the loop. Metadata and local cache are shared with the
+    wrapped DRFileSystem; metadata operations call the blocking KeyValue API
+    and run in worker threads.
+    """
+
+    protocol = "dr"
+    cachable = False
+
+    def __init__(
+        self,
+        fs: DRFileSystem | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        **kwargs: Any,
+    ) -> None:
+        kwargs.setdefault("asynchronous", True)
+        super().__init__(**kwargs)
+        self.sync_fs = fs or get_dr_file_system()
+        self._transport = transport
+        # the client is bound to the loop it was created in
+        self._http: tuple[asyncio.AbstractEventLoop, httpx.AsyncClient] | None = None
+        # download lock of each catalog item with the number of its users
+        self._download_locks: dict[str, tuple[asyncio.Lock, int]] = {}
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http[0] is not loop:
+            client = self.sync_fs.client
+            self._http = (
+                loop,
+                httpx.AsyncClient(
+                    base_url=f"{client.endpoint.rstrip('/')}/",
+                    headers=dict(client.headers),
+                    verify=_ssl_verify(client),
+                    timeout=httpx.Timeout(
+                        FILE_API_READ_TIMEOUT, connect=FILE_API_CONNECT_TIMEOUT
+                    ),
+                    limits=httpx.Limits(
+                        max_connections=ASYNC_MAX_CONNECTIONS,
+                        max_keepalive_connections=ASYNC_MAX_CONNECTIONS,
+                    ),
+                    transport=self._transport,
+                ),
+            )
+        return self._http[1]
+
+    async def close_session(self) -> None:
+        """Close connections of the async HTTP client."""
+        if self._http is not None:
+            _, client = self._http
+            self._http = None
+            await client.aclose()
+
+    async def _info(self, path: str, **kwargs: Any) -> dict[str, Any]:
+        return await asyncio.to_thread(self.sync_fs.info, path)
+
+    async def _ls(
+        self, path: str, detail: bool = True, **kwargs: Any
+    ) -> list[str] | list[dict[str, Any]]:
+        return await asyncio.to_thread(self.sync_fs.ls, path, detail=detail)
+
+    async def _modified(self, path: str) -> datetime.datetime:
+        return await asyncio.to_thread(self.sync_fs.modified, path)
+
+    async def _mkdir(
+        self, path: str, create_parents: bool = True, **kwargs: Any
+    ) -> None:
+        await asyncio.to_thread(self.sync_fs.mkdir, path, create_parents=create_parents)
+
+    async def _makedirs(self, path: str, exist_ok: bool = False) -> None:
+        await asyncio.to_thread(self.sync_fs.makedirs, path, exist_ok=exist_ok)
+
+    async def _rm_file(self, path: str, **kwargs: Any) -> None:
+        # unreferenced catalog item is removed by the thread committing metadata
+        await asyncio.to_thread(self.sync_fs.rm_file, path)
+
+    async def _file_info(self, path: str) -> dict[str, Any]:
+        info = await self._info(path)
+        if info["type"] != "file":
+            raise ValueError(f"{path} is not a file")
+        return info
+
+    async def _cat_file(
+        self,
+        path: str,
+        start: int | None = None,
+        end: int | None = None,
+        **kwargs: Any,
+    ) -> bytes:
+        file_info = await self._file_info(path)
+        if file_info.get("pending"):
+            # queued write-behind upload, staged file is read under metadata lock
+            return await asyncio.to_thread(
+                self.sync_fs.cat_file, path, start=start, end=end
+            )
+        catalog_id = file_info["catalog_id"]
+        if start is None and end is None:
+            local_path = await self._get_local_path(file_info)
+            try:
+                return await asyncio.to_thread(_read_file, local_path)
+            finally:
+                self.sync_fs._cache.unpin(catalog_id)
+
+        size = file_info["size"]
+        start = 0 if start is None else start if start >= 0 else max(size + start, 0)
+        end = size if end is None else end if end >= 0 else max(size + end, 0)
+        cached_path = self.sync_fs._cache.get(catalog_id, pin=True)
+        if cached_path:
+            try:
+                return await asyncio.to_thread(_read_file, cached_path, start, end)
+            finally:
+                self.sync_fs._cache.unpin(catalog_id)
+        return await self._fetch_catalog_range(catalog_id, start, min(end, size))
+
+    async def _get_file(self, rpath: str, lpath: str, **kwargs: Any) -> None:
+        file_info = await self._file_info(rpath)
+        if file_info.get("pending"):
+            await asyncio.to_thread(self.sync_fs.get_file, rpath, lpath)
+            return
+        local_path = await self._get_local_path(file_info)
+        try:
+            await asyncio.to_thread(_copy_file, local_path, lpath)
+        finally:
+            self.sync_fs._cache.unpin(file_info["catalog_id"])
+
+    async def _pipe_file(self, path: str, value: bytes, **kwargs: Any) -> None:
+        path = self._strip_protocol(path).rstrip("/")
+        await asyncio.to_thread(self._check_parent_dir, path)
+        uploads = self.sync_fs._uploads
+        local_path = (
+            uploads.staging_path()
+            if uploads
+            else os.path.join(self.sync_fs._temp_dir, str(uuid.uuid4()))
+        )
+        await asyncio.to_thread(_write_file, local_path, value)
+        if uploads:
+            # may wait for the queue to get under its byte budget
+            await asyncio.to_thread(uploads.enqueue, path, local_path)
+            return
+        await self._upload(path, local_path, cache_mode="move")
+
+    async def _put_file(self, lpath: str, rpath: str, **kwargs: Any) -> None:
+        if os.path.isdir(lpath):
+            await self._makedirs(rpath, exist_ok=True)
+            return
+        rpath = self._strip_protocol(rpath).rstrip("/")
+        await asyncio.to_thread(self._check_parent_dir, rpath)
+        await self._upload(rpath, lpath, cache_mode="copy")
+
+    def _check_parent_dir(self, path: str) -> None:
+        with self.sync_fs._metadata_sync("_check_parent_dir"):
+            self.sync_fs._check_parent_dir(path)
+
+    def _register_upload(self, fs_info: NodeInfo) -> None:
+        # replaced catalog item is removed by the thread committing metadata
+        with self.sync_fs._metadata_sync("_register_upload"):
+            self.sync_fs._register_upload(fs_info)
+
+    def _register_stored_content(
+        self, virtual_path: str, local_path: str, checksum: str, cache_mode: CacheMode
+    ) -> bool:
+        """Reference catalog item with identical content if there is one."""
+        with self.sync_fs._metadata_sync("_register_stored_content"):
+            fs_info = self.sync_fs._reuse_stored_content(
+                virtual_path, local_path, checksum, cache_mode
+            )
+            if not fs_info:
+                return False
+            self.sync_fs._register_upload(fs_info)
+            return True
+
+    async def _upload(
+        self, virtual_path: str, local_path: str, cache_mode: CacheMode
+    ) -> None:
+        checksum = (await asyncio.to_thread(calculate_checksum, local_path)).hex()
+        reused = await asyncio.to_thread(
+            self._register_stored_content,
+            virtual_path,
+            local_path,
+            checksum,
+            cache_mode,
+        )
+        if not reused:
+            await self._post_to_catalog(virtual_path, local_path, cache_mode, checksum)
+
+    async def _post_to_catalog(
+        self, virtual_path: str, local_path: str, cache_mode: CacheMode, checksum: str
+    ) -> None:
+        logger.debug("Uploading file to catalog.", extra={"virtual_path": virtual_path})
+        # multipart body is streamed, the file is read in worker threads
+        boundary = uuid.uuid4().hex
+        head, tail = _multipart_envelope(boundary, virtual_path)
+        size = await asyncio.to_thread(os.path.getsize, local_path)
+        response = await self.http.post(
+            "files/fromFile/",
+            content=_stream_multipart(head, local_path, tail),
+            headers={
+                "Content-Type": f"multipart/form-data; boundary={boundary}",
+                "Content-Length": str(len(head) + size + len(tail)),
+            },
+        )
+        response.raise_for_status()
+        fs_info = await asyncio.to_thread(
+            self.sync_fs._cache_upload,
+            virtual_path,
+            response.json()["catalogId"],
+            local_path,
+            cache_mode,
+            checksum,
+        )
+        await asyncio.to_thread(self._register_upload, fs_info)
+
+    @contextlib.asynccontextmanager
+    async def _download_lock(self, catalog_id: str) -> AsyncIterator[None]:
+        """Let concurrent readers of the same file wait for a single download."""
+        lock, users = self._download_locks.get(catalog_id, (asyncio.Lock(), 0))
+        self._download_locks[catalog_id] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._download_locks[catalog_id]
+            if users > 1:
+                self._download_locks[catalog_id] = (lock, users - 1)
+            else:
+                # the lock is bound to the running loop, don't keep it around
+                del self._download_locks[catalog_id]
+
+    async def _get_local_path(self, file_info: dict[str, Any]) -> str:
+        """Return pinned local copy of the file, downloading it if needed."""
+        catalog_id = file_info["catalog_id"]
+        async with self._download_lock(catalog_id):
+            local_path = self.sync_fs._cache.get(catalog_id, pin=True)
+            if local_path:
+                return local_path
+            # the sync file system downloads to "{catalog_id}.part" under its own
+            # locks, so a concurrent download of the same item uses another file
+            partial_path = os.path.join(
+                self.sync_fs._temp_dir, f"{catalog_id}.async.part"
+            )
+            for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+                try:
+                    await self._stream_catalog_file(
+                        catalog_id, partial_path, file_info.get("size")
+                    )
+                    break
+                except httpx.TransportError:
+                    if attempt == DOWNLOAD_ATTEMPTS:
+                        raise
+                    logger.warning(
+                        "Download interrupted, resuming.",
+                        extra={"catalog_id": catalog_id, "attempt": attempt},
+                    )
+            return await asyncio.to_thread(
+                self.sync_fs._cache.add, catalog_id, partial_path, pin=True
+            )
+
+    async def _stream_catalog_file(
+        self, catalog_id: str, local_path: str, size: int | None = None
+    ) -> None:
+        logger.debug("Downloading file from catalog.", extra={"catalog_id": catalog_id})
+        offset = await asyncio.to_thread(_file_size, local_path)
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        async with self.http.stream(
+            "GET", f"files/{catalog_id}/file/", headers=headers
+        ) as response:
+            if response.status_code == 416 and offset:
+                if offset == size:
+                    return  # partial file is complete already
+                # partial file doesn't match the item, start over
+                await asyncio.to_thread(os.remove, local_path)
+                await self._stream_catalog_file(catalog_id, local_path, size)
+                return
+            response.raise_for_status()
+            if response.status_code != 206:
+                offset = 0  # range is not honored, start over
+            f = await asyncio.to_thread(open, local_path, "ab" if offset else "wb")
+            try:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    await asyncio.to_thread(f.write, chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+
+    async def _fetch_catalog_range(
+        self, catalog_id: str, start: int, end: int
+    ) -> bytes:
+        if start >= end:
+            return b""
+        response = await self.http.get(
+            f"files/{catalog_id}/file/",
+            headers={"Range": f"bytes={start}-{end - 1}"},
+        )
+        response.raise_for_status()
+        if response.status_code == 206:
+            return response.content
+        return response.content[start:end]  # range is not honored
+
+    def _open(self, path: str, mode: str = "rb", **kwargs: Any) -> BinaryIO:
+        # file objects are blocking, don't use them on the event loop
+        return self.sync_fs._open(path, mode=mode, **kwargs)
+
+
+def _ssl_verify(session: requests.Session) -> ssl.SSLContext | bool:
+    """TLS verification of the DataRobot client, for the async HTTP client."""
+    verify = session.verify
+    if verify is True and session.trust_env:
+        # requests honors CA bundles from its environment variables too
+        verify = (
+            os.environ.get("REQUESTS_CA_BUNDLE")
+            or os.environ.get("CURL_CA_BUNDLE")
+            or True
+        )
+    if not isinstance(verify, str):
+        return verify
+    if os.path.isdir(verify):
+        return ssl.create_default_context(capath=verify)
+    return ssl.create_default_context(cafile=verify)
+
+
+def _file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _read_file(path: str, start: int = 0, end: int | None = None) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read() if end is None else f.read(max(end - start, 0))
+
+
+def _write_file(path: str, value: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(value)
+
+
+def _multipart_envelope(boundary: str, virtual_path: str) -> tuple[bytes, bytes]:
+    """Multipart form parts around the content of the uploaded file."""
+    filename = virtual_path.replace("\\", "\\\\").replace('"', "%22")
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="useArchiveContents"\r\n\r\n'
+        "false\r\n"
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    )
+    return head.encode(), f"\r\n--{boundary}--\r\n".encode()
+
+
+async def _stream_multipart(
+    head: bytes, local_path: str, tail: bytes
+) -> AsyncIterator[bytes]:
+    yield head
+    f = await asyncio.to_thread(open, local_path, "rb")
+    try:
+        while chunk := await asyncio.to_thread(f.read, UPLOAD_CHUNK_SIZE):
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+    yield tail
+
+
+def _copy_file(src: str, dst: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    shutil.copyfile(src, dst)
+
+
+_shared_async_file_system: tuple[int, AsyncFileSystem] | None = None  # (pid, fs)
+_shared_async_file_system_lock = threading.Lock()
+
+
+def get_async_file_system() -> AsyncFileSystem:
+    """
+    Async counterpart of `get_file_system`, shared by the whole process. Local
+    runs get the local file system with methods running in worker threads.
+    """
+    global _shared_async_file_system
+    with _shared_async_file_system_lock:
+        if (
+            _shared_async_file_system is None
+            or _shared_async_file_system[0] != os.getpid()
+        ):
+            afs: AsyncFileSystem
+            if all_env_variables_present():
+                afs = AsyncDRFileSystem(get_dr_file_system())
+            else:
+                afs = AsyncFileSystemWrapper(
+                    LocalFileSystem(auto_mkdir=True), asynchronous=True
+                )
+            _shared_async_file_system = (os.getpid(), afs)
+        return _shared_async_file_system[1]
+
+
+async def close_async_file_system() -> None:
+    """Release connections of the shared async file system, e.g. on shutdown."""
+    if _shared_async_file_system is None:
+        return
+    afs = _shared_async_file_system[1]
+    if isinstance(afs, AsyncDRFileSystem):
+        await afs.close_session()
@@ -0,0 +1,120 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import time
+from dataclasses import dataclass
+
+from core.persistent_fs.dr_file_system import DRFileSystem, calculate_checksum
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+SQLITE_WRITE_VERSION_OFFSET = 18  # 1 for rollback journal, 2 for WAL
+SQLITE_CHANGE_COUNTER_OFFSET = 24
+# file system timestamps are coarser than their nanoseconds suggest, a file
+# modified this soon after it was remembered may keep the same mtime
+RACY_WINDOW_NS = 2 * 10**9
+
+
+@dataclass(frozen=True)
+class FileSignature:
+    size: int
+    mtime_ns: int
+    inode: int
+    # bumped by every commit in rollback journal mode, None for other files
+    # and WAL databases, whose commits don't have to update it
+    sqlite_change_counter: int | None
+
+
+@dataclass
+class ChangeDetectionStats:
+    cheap_checks: int = 0  # decided by the signature
+    hashed_checks: int = 0
+
+
+def file_signature(path: str) -> FileSignature | None:
+    try:
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            header = f.read(SQLITE_CHANGE_COUNTER_OFFSET + 4)
+    except FileNotFoundError:
+        return None
+    counter = None
+    if (
+        header.startswith(SQLITE_HEADER)
+        and len(header) == SQLITE_CHANGE_COUNTER_OFFSET + 4
+        and header[SQLITE_WRITE_VERSION_OFFSET] == 1
+    ):
+        counter = int.from_bytes(header[SQLITE_CHANGE_COUNTER_OFFSET:], "big")
+    return FileSignature(stat.st_size, stat.st_mtime_ns, stat.st_ino, counter)
+
+
+class FileChangeDetector:
+    """
+    Tells whether a local file changed since it was remembered. The size, mtime,
+    inode are compared first, then the change counter of SQLite databases; the
+    file is hashed only when they can't tell, e.g. other files or WAL databases
+    were rewritten with the same size. Without a remembered checksum such files
+    are reported as changed.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.stats = ChangeDetectionStats()
+        self._signature: FileSignature | None = None
+        self._checksum: bytes | None = None
+        self._remembered_at = 0  # time.time_ns()
+
+    @property
+    def checksum(self) -> bytes | None:
+        """sha256 of the remembered file, if known."""
+        return self._checksum
+
+    def remember(self, checksum: bytes | None = None) -> None:
+        """Take the current file as unchanged, `checksum` is its sha256 if known."""
+        self._signature = file_signature(self.path)
+        self._checksum = checksum
+        self._remembered_at = time.time_ns()
+
+    def remember_stored(self, fs: DRFileSystem, path: str) -> None:
+        """Remember the local file as a copy of `path`, whose checksum is in metadata."""
+        checksum = fs.info(path).get("checksum")
+        self.remember(
+            bytes.fromhex(checksum) if checksum else calculate_checksum(self.path)
+        )
+
+    def changed(self) -> bool:
+        verdict = self._compare_signatures(file_signature(self.path))
+        if verdict is not None:
+            self.stats.cheap_checks += 1
+            return verdict
+        self.stats.hashed_checks += 1
+        return calculate_checksum(self.path) != self._checksum
+
+    def _compare_signatures(self, signature: FileSignature | None) -> bool | None:
+        """Whether the file changed judging by signatures, None if they can't tell."""
+        remembered = self._signature
+        if signature is None or remembered is None:
+            return signature != remembered
+        if signature == remembered and not self._racy(signature):
+            return False
+        if signature.size != remembered.size:
+            return True
+        counter = signature.sqlite_change_counter
+        if counter is not None and remembered.sqlite_change_counter is not None:
+            return counter != remembered.sqlite_change_counter
+        if self._checksum is None:
+            return True
+        return None
+
+    def _racy(self, signature: FileSignature) -> bool:
+        return self._remembered_at - signature.mtime_ns < RACY_WINDOW_NS
@@ -0,0 +1,257 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import asdict, dataclass
+
+from core.persistent_fs.change_detection import FileChangeDetector, file_signature
+from core.persistent_fs.dr_file_system import DRFileSystem
+
+logger = logging.getLogger(__name__)
+
+# should be a multiple of the page or block size of the replicated database,
+# so a changed page touches a single chunk
+CHUNK_SIZE = int(os.environ.get("DR_FS_CHUNK_SIZE", 4 * 1024**2))
+MANIFEST_NAME = "manifest.json"
+
+
+@dataclass
+class ChunkManifest:
+    size: int
+    chunk_size: int
+    chunks: list[str]  # sha256 hex of consecutive chunks
+
+
+@dataclass
+class ReplicaUpdate:
+    """Stored changes downloaded by `ChunkedFileReplica.fetch`, not applied yet."""
+
+    manifest: ChunkManifest | None  # None for a file stored whole
+    chunks: dict[int, str]  # index -> checksum of changed chunks
+    temp_dir: str | None  # holds the downloaded chunks named by checksum
+
+
+@dataclass
+class ReplicaSyncStats:
+    uploaded_chunks: int = 0
+    downloaded_chunks: int = 0
+
+
+class ChunkedFileReplica:
+    """
+    Copy of a local file, e.g. a database, in DRFileSystem replicated by chunks.
+
+    The file is split to fixed-size chunks stored under their content hash next
+    to a manifest listing them in order. Only chunks changed since the last sync
+    are transferred and the new manifest switches readers to them at once, so
+    the cost of a sync is proportional to the pages written, not to the size of
+    the file. A file stored whole is migrated on first sync.
+
+    Subclasses flush logs of the database to the file in `_checkpoint`, which
+    runs before each sync when `log_pending` tells there is anything to flush.
+    """
+
+    def __init__(
+        self,
+        fs: DRFileSystem,
+        path: str,
+        local_path: str | None = None,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> None:
+        self.fs = fs
+        self.path = path
+        self.local_path = local_path or path
+        self.chunk_size = chunk_size
+        self.stats = ReplicaSyncStats()
+
+        self._dir = f"{path}.replica"
+        self._manifest_path = f"{self._dir}/{MANIFEST_NAME}"
+        self._remote: ChunkManifest | None = None  # last manifest seen or written
+        # manifest of the local file, valid until the file changes
+        self._local: ChunkManifest | None = None
+        self._local_changes = FileChangeDetector(self.local_path)
+
+    def _chunk_path(self, checksum: str) -> str:
+        return f"{self._dir}/chunks/{checksum}"
+
+    def restore(self) -> bool:
+        """Bring the local file up to the stored one, return True if it changed."""
+        update = self.fetch()
+        return update is not None and self.apply(update)
+
+    def fetch(self) -> ReplicaUpdate | None:
+        """
+        Download stored chunks which differ from the local file, None if there
+        are none. The local file is left as is until the update is applied, so
+        its readers can go on meanwhile; writers must wait for apply().
+        """
+        remote = self._fetch_manifest()
+        self.checkpoint()
+        if remote is None:
+            if not self.fs.isfile(self.path):
+                return None
+            return ReplicaUpdate(None, {}, None)
+        local = self._local_manifest(remote.chunk_size)
+        if local == remote:
+            return None
+
+        changed = {
+            index: checksum
+            for index, checksum in enumerate(remote.chunks)
+            if index >= len(local.chunks) or local.chunks[index] != checksum
+        }
+        logger.debug(
+            "Fetching file chunks.",
+            extra={"path": self.path, "chunks": len(changed)},
+        )
+        temp_dir = tempfile.mkdtemp()
+        try:
+            self.fs.get_many(
+                {
+                    self._chunk_path(checksum): os.path.join(temp_dir, checksum)
+                    for checksum in set(changed.values())
+                }
+            )
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        self.stats.downloaded_chunks += len(changed)
+        return ReplicaUpdate(remote, changed, temp_dir)
+
+    def apply(self, update: ReplicaUpdate) -> bool:
+        """Write fetched chunks to the local file, return True if it changed."""
+        if update.manifest is None:
+            return self._restore_single_file()
+        assert update.temp_dir is not None
+        try:
+            os.makedirs(
+                os.path.dirname(os.path.abspath(self.local_path)), exist_ok=True
+            )
+            mode = "r+b" if os.path.exists(self.local_path) else "wb"
+            with open(self.local_path, mode) as f:
+                for index, checksum in update.chunks.items():
+                    f.seek(index * update.manifest.chunk_size)
+                    with open(os.path.join(update.temp_dir, checksum), "rb") as chunk:
+                        f.write(chunk.read())
+                f.truncate(update.manifest.size)
+        finally:
+            shutil.rmtree(update.temp_dir, ignore_errors=True)
+        self._remember_local(update.manifest)
+        return True
+
+    def persist(self) -> bool:
+        """Store chunks of the local file changed since the last sync."""
+        if not os.path.exists(self.local_path):
+            return False
+        self.checkpoint()
+        local = self._local_manifest(self.chunk_size)
+        remote = self._remote
+        if local == remote:
+            return False
+
+        stored = set(remote.chunks) if remote else set()
+        missing: dict[str, int] = {}  # checksum -> index of a chunk with the content
+        for index, checksum in enumerate(local.chunks):
+            if checksum not in stored:
+                missing.setdefault(checksum, index)
+        logger.debug(
+            "Persisting file chunks.",
+            extra={"path": self.path, "chunks": len(missing)},
+        )
+        self._upload_chunks(missing)
+        self.fs.pipe_file(self._manifest_path, json.dumps(asdict(local)).encode())
+        self._remote = local
+
+        if remote is None:
+            if self.fs.isfile(self.path):
+                self.fs.rm_file(self.path)  # replaced by the chunks
+        else:
+            unreferenced = set(remote.chunks) - set(local.chunks)
+            if unreferenced:
+                self.fs.rm_many([self._chunk_path(c) for c in unreferenced])
+        return True
+
+    def checkpoint(self) -> None:
+        """
+        Make the local file hold every committed change. Syncs do it themselves,
+        callers holding connections of the database may do it beforehand while
+        they keep the connections idle.
+        """
+        if self.log_pending():
+            self._checkpoint()
+
+    def log_pending(self) -> bool:
+        """True if committed changes may be kept outside the local file."""
+        return False
+
+    def _checkpoint(self) -> None:
+        """Flush the log of the database to the local file."""
+
+    def _upload_chunks(self, chunks: dict[str, int]) -> None:
+        self.fs.makedirs(f"{self._dir}/chunks", exist_ok=True)
+        if not chunks:
+            return
+        with tempfile.TemporaryDirectory() as temp_dir:
+            files: dict[str, str] = {}
+            with open(self.local_path, "rb") as f:
+                for checksum, index in chunks.items():
+                    f.seek(index * self.chunk_size)
+                    chunk_path = os.path.join(temp_dir, checksum)
+                    with open(chunk_path, "wb") as chunk_file:
+                        chunk_file.write(f.read(self.chunk_size))
+                    files[chunk_path] = self._chunk_path(checksum)
+            self.fs.put_many(files)
+        self.stats.uploaded_chunks += len(chunks)
+
+    def _fetch_manifest(self) -> ChunkManifest | None:
+        if not self.fs.exists(self._manifest_path):
+            self._remote = None
+            return None
+        self._remote = ChunkManifest(
+            **json.loads(self.fs.cat_file(self._manifest_path))
+        )
+        return self._remote
+
+    def _restore_single_file(self) -> bool:
+        """File stored whole by previous versions."""
+        if not self.fs.isfile(self.path):
+            return False
+        logger.debug("Restoring whole file.", extra={"path": self.path})
+        return self.fs.safe_get_file(self.path, self.local_path)
+
+    def _local_manifest(self, chunk_size: int) -> ChunkManifest:
+        if (
+            self._local
+            and self._local.chunk_size == chunk_size
+            and not self._local_changes.changed()
+        ):
+            return self._local
+
+        signature = file_signature(self.local_path)
+        chunks: list[str] = []
+        if signature:
+            with open(self.local_path, "rb") as f:
+                while chunk := f.read(chunk_size):
+                    chunks.append(hashlib.sha256(chunk).hexdigest())
+        manifest = ChunkManifest(signature.size if signature else 0, chunk_size, chunks)
+        self._remember_local(manifest)
+        return manifest
+
+    def _remember_local(self, manifest: ChunkManifest) -> None:
+        self._local = manifest
+        self._local_changes.remember()
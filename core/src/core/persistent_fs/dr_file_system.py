@@ -14,44 +14,75 @@
 import datetime
 import hashlib
 import io
-import json
 import logging
 import os
 import shutil
 import tempfile
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from typing import (
     Any,
     BinaryIO,
     Callable,
+    Iterable,
+    Iterator,
+    Mapping,
     ParamSpec,
     TypeVar,
     cast,
 )
 
 import datarobot as dr
+import requests
 from fsspec import AbstractFileSystem
 from fsspec.implementations.local import LocalFileSystem
-
-Path = str
-NodeInfo = dict[str, str | int | float]
-Metadata = dict[Path, NodeInfo]
-
-CatalogId = str
-LocalFileInfo = tuple[str, float]
-LocalFilesMetadata = dict[CatalogId, LocalFileInfo]
+from fsspec.spec import AbstractBufferedFile
+from typing_extensions import Self
+
+from core.persistent_fs.local_cache import CacheMode, LocalFileCache, get_local_cache
+from core.persistent_fs.metadata_journal import (
+    Metadata,
+    MetadataChanges,
+    MetadataConflictError,
+    MetadataJournal,
+    NodeInfo,
+    Path,
+    apply_changes,
+    shard_journal_name,
+)
+from core.persistent_fs.upload_queue import StagedUpload, UploadQueue
 
 WrapperParams = ParamSpec("WrapperParams")
 WrapperReturnType = TypeVar("WrapperReturnType")
+ItemType = TypeVar("ItemType")
+ResultType = TypeVar("ResultType")
 
 logger = logging.getLogger(__name__)
 
-METADATA_STORAGE_NAME = "fs_metadata"
-TIMESTAMP_STORAGE_NAME = "fs_timestamp"
-
-FILE_API_CONNECT_TIMEOUT = os.environ.get("FILE_API_CONNECT_TIMEOUT", 180)
-FILE_API_READ_TIMEOUT = os.environ.get("FILE_API_READ_TIMEOUT", 180)
+FILE_API_CONNECT_TIMEOUT = float(os.environ.get("FILE_API_CONNECT_TIMEOUT", 180))
+FILE_API_READ_TIMEOUT = float(os.environ.get("FILE_API_READ_TIMEOUT", 180))
+# bulk transfers share the client session, whose pool keeps 10 connections per host
+BULK_MAX_WORKERS = int(os.environ.get("DR_FS_BULK_MAX_WORKERS", 8))
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_ATTEMPTS = 3
+CHECKSUM_BUFFER_SIZE = 1024 * 1024
+# how long local metadata is trusted without checking the remote journal head
+METADATA_TTL_MS = int(os.environ.get("DR_FS_METADATA_TTL_MS", 0))
+# closed files are uploaded by a background worker instead of the closing thread
+WRITE_BEHIND = os.environ.get("DR_FS_WRITE_BEHIND", "false").lower() in ("1", "true")
+# nodes deeper than this are stored in a journal of their ancestor at this depth,
+# by default one per owner of app uploads, i.e. `.data/storage/uploads/<owner>`;
+# 0 keeps everything in the root journal. Must not change once metadata is stored.
+METADATA_SHARD_DEPTH = int(os.environ.get("DR_FS_METADATA_SHARD_DEPTH", 4))
+
+BATCH_SYNC_FRAME = "batch"
+ROOT_SHARD = ""
+# keys of queued write-behind uploads, only meaningful to the local process
+LOCAL_NODE_KEYS = ("pending", "local_path")
 
 
 def _keep_metadata_in_sync(
@@ -61,37 +92,51 @@ def _keep_metadata_in_sync(
         *args: WrapperParams.args, **kwargs: WrapperParams.kwargs
     ) -> WrapperReturnType:
         fs_entity: "DRFileSystem" = cast("DRFileSystem", args[0])
-        logger.debug(
-            "Entering metadata sync wrapper.", extra={"stack": fs_entity._sync_stack}
-        )
-        fs_entity._sync_stack.append(func.__name__)
-        if (
-            len(fs_entity._sync_stack) == 1
-            and not fs_entity._remote_metadata_was_updated()
-        ):
-            fs_entity._refresh_local_metadata()
+        with fs_entity._metadata_sync(func.__name__):
+            return func(*args, **kwargs)
 
-        try:
-            result = func(*args, **kwargs)
-        except Exception:
-            logger.debug(
-                "Exception caught by sync wrapper.",
-                extra={"function": func.__name__, "stack": fs_entity._sync_stack},
-            )
-            fs_entity._sync_stack.pop()
-            raise
+    return wrapper
 
-        if len(fs_entity._sync_stack) == 1 and fs_entity._local_metadata_was_updated():
-            fs_entity._update_stored_metadata()
-        fs_entity._sync_stack.pop()
-        logger.debug(
-            "Exiting metadata sync wrapper.", extra={"stack": fs_entity._sync_stack}
-        )
-        return result
+
+def _wait_for_pending_uploads(
+    func: Callable[WrapperParams, WrapperReturnType],
+) -> Callable[WrapperParams, WrapperReturnType]:
+    """Let queued uploads of the path arguments finish, so their content is readable."""
+
+    def wrapper(
+        *args: WrapperParams.args, **kwargs: WrapperParams.kwargs
+    ) -> WrapperReturnType:
+        fs_entity: "DRFileSystem" = cast("DRFileSystem", args[0])
+        fs_entity._wait_for_uploads([arg for arg in args[1:] if isinstance(arg, str)])
+        return func(*args, **kwargs)
 
     return wrapper
 
 
+def _map_concurrently(
+    func: Callable[[ItemType], ResultType],
+    items: Iterable[ItemType],
+    max_workers: int,
+) -> tuple[list[ResultType], Exception | None]:
+    """Run `func` for all items, return successful results and the first error."""
+    results: list[ResultType] = []
+    error: Exception | None = None
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for future in [executor.submit(func, item) for item in items]:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                error = error or e
+    return results, error
+
+
+@dataclass
+class MetadataSyncStats:
+    remote_checks: int = 0
+    avoided_checks: int = 0  # skipped thanks to TTL or a pinned batch snapshot
+    shard_loads: int = 0  # shards fetched for the first time
+
+
 class DRFileSystem(AbstractFileSystem):  # type: ignore[misc]
     """
     DRFileSystem is fsspec implementation for interact with Datarobot
@@ -105,6 +150,8 @@ class DRFileSystem(AbstractFileSystem):  # type: ignore[misc]
         self,
         dr_client: dr.rest.RESTClientObject | None = None,
         *args: Any,
+        write_behind: bool = WRITE_BEHIND,
+        metadata_shard_depth: int = METADATA_SHARD_DEPTH,
         **kwargs: Any,
     ):
         super().__init__(*args, **kwargs)
@@ -117,19 +164,37 @@ class DRFileSystem(AbstractFileSystem):  # type: ignore[misc]
             raise ValueError("APPLICATION_ID env variable is not set.")
 
         self._temp_dir = tempfile.mkdtemp()
-        self._downloaded_files: LocalFilesMetadata = {}
-
-        self._fs_metadata: Metadata = {}
-        self._fs_metadata_timestamp: float = 0.0  # timestamp of when we have data
-
-        self._fs_metadata_stored: dr.KeyValue | None = None  # remotely stored metadata
-        self._fs_metadata_timestamp_stored: dr.KeyValue | None = (
-            None  # remotely stored timestamp
-        )
-
-        self._sync_stack: list[
-            str
-        ] = []  # making sure that local metadata fetched for first and updated for last nested call
+        self._cache = get_local_cache()  # downloaded files, shared by instances
+        # download lock of each catalog item with the number of its users
+        self._download_locks: dict[str, tuple[threading.Lock, int]] = {}
+        self._download_locks_guard = threading.Lock()
+
+        # metadata is split to shards with own journals, loaded when first touched
+        self._shard_depth = metadata_shard_depth
+        self._shards: dict[str, Metadata] = {}  # loaded shards by top directory
+        self._fs_metadata: Metadata = {}  # nodes of all loaded shards
+        self._children: dict[Path, set[Path]] = {}  # directory index of _fs_metadata
+        # content index of _fs_metadata, files with identical content share an item;
+        # only within a shard, so references in shards not loaded never matter
+        self._catalog_refs: dict[str, int] = {}  # catalog id -> referencing nodes
+        # (shard, sha256 hex) -> catalog id
+        self._catalog_by_checksum: dict[tuple[str, str], str] = {}
+        # dereferenced items, removed from catalog once the change is committed
+        self._released_catalog_ids: set[str] = set()
+        # changes by shard, not yet committed to journal
+        self._pending_changes: dict[str, MetadataChanges] = {}
+        self._journal = MetadataJournal(self.client, self.app_id)
+        self._journals = {ROOT_SHARD: self._journal}
+        self._metadata_ttl = METADATA_TTL_MS / 1000
+        self._shard_synced_at: dict[str, float] = {}  # time.monotonic() of last sync
+        self._fresh_shards: set[str] = set()  # checked in the current outermost call
+        self.metadata_stats = MetadataSyncStats()
+
+        # metadata is guarded by the lock for the whole outermost call of a thread
+        self._metadata_lock = threading.RLock()
+        self._thread_local = threading.local()
+
+        self._uploads = UploadQueue(self._upload_staged) if write_behind else None
 
         logger.debug("Initialized DRFileSystem.", extra={"tmp_dir": self._temp_dir})
 
@@ -138,87 +203,290 @@ class DRFileSystem(AbstractFileSystem):  # type: ignore[misc]
         if os.path.exists(self._temp_dir):
             shutil.rmtree(self._temp_dir)
 
-    def _refresh_fs_metadata_timestamp_stored(self) -> None:
-        with self.client:
-            if self._fs_metadata_timestamp_stored:
-                self._fs_metadata_timestamp_stored.refresh()
-            else:
-                self._fs_metadata_timestamp_stored = dr.KeyValue.find(
-                    self.app_id,
-                    dr.KeyValueEntityType.CUSTOM_APPLICATION,
-                    TIMESTAMP_STORAGE_NAME,
+    @property
+    def _sync_stack(self) -> list[str]:
+        """
+        Nested calls of the current thread, making sure that local metadata
+        is fetched for the first and stored for the last nested call.
+        """
+        stack: list[str] | None = getattr(self._thread_local, "sync_stack", None)
+        if stack is None:
+            stack = self._thread_local.sync_stack = []
+        return stack
+
+    @contextmanager
+    def _metadata_sync(self, name: str) -> Iterator[None]:
+        logger.debug(
+            "Entering metadata sync wrapper.", extra={"stack": self._sync_stack}
+        )
+        self._metadata_lock.acquire()
+        self._sync_stack.append(name)
+        outermost = len(self._sync_stack) == 1
+        rejected: MetadataChanges = {}
+        unreferenced: set[str] = set()
+        try:
+            if outermost:
+                self._refresh_local_metadata()
+            elif len(self._sync_stack) == 2 and self._sync_stack[0] == BATCH_SYNC_FRAME:
+                self.metadata_stats.avoided_checks += 1
+            yield
+        except Exception:
+            logger.debug(
+                "Exception caught by sync wrapper.",
+                extra={"function": name, "stack": self._sync_stack},
+            )
+            raise
+        finally:
+            try:
+                # changes are committed even if the call failed midway,
+                # they reflect catalog operations that already happened
+                if outermost and self._pending_changes:
+                    rejected = self._update_stored_metadata()
+                if outermost:
+                    unreferenced = self._take_unreferenced_catalog_ids()
+            finally:
+                self._sync_stack.pop()
+                self._metadata_lock.release()
+                logger.debug(
+                    "Exiting metadata sync wrapper.", extra={"stack": self._sync_stack}
                 )
+            if unreferenced:
+                self._remove_catalog_items(unreferenced)
+        if rejected:
+            raise MetadataConflictError(sorted(rejected))
+
+    @contextmanager
+    def batch(self) -> Iterator[Self]:
+        """
+        Pin one metadata snapshot for all operations inside the context and
+        commit their changes with a single journal entry on exit.
+        Other threads are blocked meanwhile, so keep the batch short and never
+        await inside it.
+        """
+        with self._metadata_sync(BATCH_SYNC_FRAME):
+            yield self
+
+    def flush(self, paths: Iterable[str] | None = None) -> None:
+        """
+        Wait for write-behind uploads of `paths`, or of all queued files,
+        and raise the first upload error since the last flush.
+        """
+        if self._uploads:
+            self._uploads.flush(
+                None
+                if paths is None
+                else [self._strip_protocol(path).rstrip("/") for path in paths]
+            )
 
-    def _refresh_fs_metadata_stored(self) -> None:
-        with self.client:
-            if self._fs_metadata_stored:
-                self._fs_metadata_stored.refresh()
-            else:
-                self._fs_metadata_stored = dr.KeyValue.find(
-                    self.app_id,
-                    dr.KeyValueEntityType.CUSTOM_APPLICATION,
-                    METADATA_STORAGE_NAME,
-                )
+    def drain(self) -> None:
+        """Upload all queued files and stop the write-behind worker, e.g. on shutdown."""
+        if self._uploads:
+            self._uploads.close()
+            self.flush()
+
+    def _wait_for_uploads(self, paths: Iterable[str]) -> None:
+        # the worker needs metadata lock, so its holder can't wait for uploads
+        if self._uploads and not self._sync_stack:
+            self._uploads.wait(
+                [self._strip_protocol(path).rstrip("/") for path in paths]
+            )
 
-    def _remote_metadata_was_updated(self) -> bool:
-        self._refresh_fs_metadata_timestamp_stored()
-        if not self._fs_metadata_timestamp_stored:
-            return True
-        return (
-            self._fs_metadata_timestamp_stored.numeric_value
-            <= self._fs_metadata_timestamp
-        )
+    def _index_node(self, path: Path) -> None:
+        self._children.setdefault(self._parent(path), set()).add(path)
 
-    def _local_metadata_was_updated(self) -> bool:
-        if self._fs_metadata_timestamp == 0:
-            return False
-        if not self._fs_metadata_timestamp_stored:
-            return True
-        return (
-            self._fs_metadata_timestamp
-            > self._fs_metadata_timestamp_stored.numeric_value
-        )
+    def _unindex_node(self, path: Path) -> None:
+        parent = self._parent(path)
+        siblings = self._children.get(parent)
+        if siblings is None:
+            return
+        siblings.discard(path)
+        if not siblings:
+            del self._children[parent]
 
-    def _update_stored_metadata(self) -> None:
-        logger.debug("Updating metadata in persistent storage.")
-        with self.client:
-            if self._fs_metadata_timestamp_stored:
-                self._fs_metadata_timestamp_stored.update(
-                    value=self._fs_metadata_timestamp
-                )
-            else:
-                self._fs_metadata_timestamp_stored = dr.KeyValue.create(
-                    entity_id=self.app_id,
-                    entity_type=dr.KeyValueEntityType.CUSTOM_APPLICATION,
-                    name=TIMESTAMP_STORAGE_NAME,
-                    category=dr.KeyValueCategory.ARTIFACT,
-                    value_type=dr.KeyValueType.NUMERIC,
-                    value=self._fs_metadata_timestamp,
-                )
+    def _index_content(self, info: NodeInfo) -> None:
+        catalog_id = info.get("catalog_id")
+        if not catalog_id:
+            return
+        catalog_id = str(catalog_id)
+        self._catalog_refs[catalog_id] = self._catalog_refs.get(catalog_id, 0) + 1
+        if checksum := info.get("checksum"):
+            shard = self._shard_of(str(info["name"]))
+            self._catalog_by_checksum[shard, str(checksum)] = catalog_id
+
+    def _unindex_content(self, info: NodeInfo) -> str | None:
+        """Drop reference of the node, return its catalog id once unreferenced."""
+        catalog_id = info.get("catalog_id")
+        if not catalog_id:
+            return None
+        catalog_id = str(catalog_id)
+        refs = self._catalog_refs.get(catalog_id, 0) - 1
+        if refs > 0:
+            self._catalog_refs[catalog_id] = refs
+            return None
+        self._catalog_refs.pop(catalog_id, None)
+        key = (self._shard_of(str(info["name"])), str(info.get("checksum", "")))
+        if self._catalog_by_checksum.get(key) == catalog_id:
+            del self._catalog_by_checksum[key]
+        return catalog_id
+
+    def _rebuild_index(self) -> None:
+        self._fs_metadata = {}
+        for metadata in self._shards.values():
+            self._fs_metadata.update(metadata)
+        self._children = {}
+        self._catalog_refs = {}
+        self._catalog_by_checksum = {}
+        for path, info in self._fs_metadata.items():
+            self._index_node(path)
+            self._index_content(info)
+
+    def _set_node(self, path: Path, info: NodeInfo) -> None:
+        if any(key in info for key in LOCAL_NODE_KEYS):
+            info = {k: v for k, v in info.items() if k not in LOCAL_NODE_KEYS}
+        shard = self._shard_of(path)
+        self._load_shard(shard)
+        previous = self._fs_metadata.get(path)
+        if previous is None:
+            self._index_node(path)
+        self._fs_metadata[path] = self._shards[shard][path] = info
+        self._pending_changes.setdefault(shard, {})[path] = info
+        self._index_content(info)
+        if previous:
+            self._release_content(previous)
+
+    def _remove_node(self, path: Path) -> None:
+        if self._uploads:
+            self._uploads.cancel(path)
+        shard = self._shard_of(path)
+        self._load_shard(shard)
+        previous = self._fs_metadata.pop(path, None)
+        self._shards[shard].pop(path, None)
+        self._pending_changes.setdefault(shard, {})[path] = None
+        if previous is not None:
+            self._unindex_node(path)
+            self._release_content(previous)
+
+    def _release_content(self, info: NodeInfo) -> None:
+        catalog_id = self._unindex_content(info)
+        if catalog_id:
+            self._released_catalog_ids.add(catalog_id)
+
+    def _take_unreferenced_catalog_ids(self) -> set[str]:
+        """
+        Released catalog items which are still unreferenced after commit. Items
+        of uncommitted changes wait, other writers may reference them again.
+        """
+        if self._pending_changes:
+            return set()
+        unreferenced = {
+            catalog_id
+            for catalog_id in self._released_catalog_ids
+            if not self._catalog_refs.get(catalog_id)
+        }
+        self._released_catalog_ids = set()
+        return unreferenced
 
-            if self._fs_metadata_stored:
-                self._fs_metadata_stored.update(value=json.dumps(self._fs_metadata))
-            else:
-                self._fs_metadata_stored = dr.KeyValue.create(
-                    entity_id=self.app_id,
-                    entity_type=dr.KeyValueEntityType.CUSTOM_APPLICATION,
-                    name=METADATA_STORAGE_NAME,
-                    category=dr.KeyValueCategory.ARTIFACT,
-                    value_type=dr.KeyValueType.JSON,
-                    value=json.dumps(self._fs_metadata),
-                )
+    def _update_stored_metadata(self) -> MetadataChanges:
+        """Commit pending changes, return the ones rejected due to a conflict."""
+        logger.debug(
+            "Updating metadata in persistent storage.",
+            extra={"changed_shards": len(self._pending_changes)},
+        )
+        rejected: MetadataChanges = {}
+        merged = False
+        # root goes last, nodes moved out of it are stored in their shards first
+        for shard in sorted(self._pending_changes, key=lambda s: s == ROOT_SHARD):
+            result = self._journal_of(shard).commit(
+                self._shards[shard], self._pending_changes[shard]
+            )
+            del self._pending_changes[shard]
+            self._shard_synced_at[shard] = time.monotonic()
+            merged = merged or bool(result.merged)
+            rejected.update(result.rejected)
+        if merged:
+            self._rebuild_index()
+        for info in rejected.values():
+            if info and info.get("catalog_id"):
+                self._released_catalog_ids.add(str(info["catalog_id"]))
+        if rejected:
+            logger.warning(
+                "Metadata changes rejected due to concurrent changes.",
+                extra={"paths": sorted(rejected)},
+            )
+        return rejected
 
     def _refresh_local_metadata(self) -> None:
-        logger.debug("Updating local metadata from persistent storage.")
-        self._refresh_fs_metadata_timestamp_stored()
-        if self._fs_metadata_timestamp_stored:
-            self._fs_metadata_timestamp = (
-                self._fs_metadata_timestamp_stored.numeric_value
+        self._fresh_shards = set()
+        if self._load_shard(ROOT_SHARD):
+            self.metadata_stats.remote_checks += 1
+        else:
+            self.metadata_stats.avoided_checks += 1
+
+    def _shard_of(self, path: Path, children: bool = False) -> str:
+        """
+        Shard holding the node, or its children. Nodes up to the shard depth are
+        kept in the root shard, deeper ones in the shard of their ancestor at
+        that depth, which is listed in the root shard.
+        """
+        parts = path.split("/") if path else []
+        if self._shard_depth <= 0 or len(parts) + children <= self._shard_depth:
+            return ROOT_SHARD
+        return "/".join(parts[: self._shard_depth])
+
+    def _journal_of(self, shard: str) -> MetadataJournal:
+        if shard not in self._journals:
+            self._journals[shard] = MetadataJournal(
+                self.client, self.app_id, name=shard_journal_name(shard)
             )
+        return self._journals[shard]
+
+    def _load_shard(self, shard: str) -> bool:
+        """
+        Bring the shard up to date once per outermost call, unless it was synced
+        within TTL. Return True if remote state was checked.
+        """
+        if shard in self._fresh_shards:
+            return False
+        self._fresh_shards.add(shard)
+        now = time.monotonic()
+        if now - self._shard_synced_at.get(shard, float("-inf")) < self._metadata_ttl:
+            return False
+        if shard not in self._shards:
+            logger.debug("Loading metadata shard.", extra={"shard": shard})
+            self.metadata_stats.shard_loads += 1
+        metadata = self._shards.setdefault(shard, {})
+        synced = self._journal_of(shard).sync(metadata)
+        self._shard_synced_at[shard] = now
+        if synced:
+            logger.debug(
+                "Updated local metadata from persistent storage.",
+                extra={"shard": shard},
+            )
+            # keep changes which failed to commit on top of the remote state
+            apply_changes(metadata, self._pending_changes.get(shard, {}))
+            self._rebuild_index()
+            if shard == ROOT_SHARD:
+                self._move_nodes_to_shards()
+        return True
 
-        self._refresh_fs_metadata_stored()
-        if self._fs_metadata_stored:
-            self._fs_metadata = json.loads(self._fs_metadata_stored.value)
+    def _move_nodes_to_shards(self) -> None:
+        """Move nodes stored in the root shard before sharding to their shards."""
+        root = self._shards[ROOT_SHARD]
+        misplaced = [path for path in root if self._shard_of(path) != ROOT_SHARD]
+        if not misplaced:
+            return
+        logger.info(
+            "Moving metadata nodes to their shards.", extra={"nodes": len(misplaced)}
+        )
+        for path in misplaced:
+            info = root.pop(path)
+            self._pending_changes.setdefault(ROOT_SHARD, {})[path] = None
+            shard = self._shard_of(path)
+            self._load_shard(shard)
+            if path not in self._shards[shard]:
+                self._shards[shard][path] = info
+                self._pending_changes.setdefault(shard, {})[path] = info
+        self._rebuild_index()
 
     @_keep_metadata_in_sync
     def mkdir(self, path: str, create_parents: bool = True, **kwargs: Any) -> None:
@@ -239,12 +507,14 @@ class DRFileSystem(AbstractFileSystem):  # type: ignore[misc]
             else:
                 raise FileNotFoundError()
         clean_path = path.rstrip("/")
-        self._fs_metadata[clean_path] = {
-            "type": "directory",
-            "name": clean_path,
-            "modified_at": time.time(),
-        }
-        self._fs_metadata_timestamp = time.time()
+        self._set_node(
+            clean_path,
+            {
+                "type": "directory",
+                "name": clean_path,
+                "modified_at": time.time(),
+            },
+        )
 
     @_keep_metadata_in_sync
     def makedirs(self, path: str, exist_ok: bool = False) -> None:
@@ -263,11 +533,11 @@ class DRFileSystem(AbstractFileSystem):  # type: ignore[misc]
             raise FileNotFoundError()
         if not self.isdir(path):
             raise ValueError(f"{path} is not a directory")
-        if self.ls(path, detail=False):
+        self._load_shard(self._shard_of(path, children=True))
+        if self._children.get(path) or self._pending_children(path):
             raise ValueError(f"{path} is not empty")
 
-        self._fs_metadata.pop(path, None)
-        self._fs_metadata_timestamp = time.time()
+        self._remove_node(path)
 
     @_keep_metadata_in_sync
     def ls(
@@ -278,30 +548,56 @@ class DRFileSystem(AbstractFileSystem):  # type: ignore[misc]
         )
         path = self._strip_protocol(path)
         clean_path = path.rstrip("/")
+        self._load_shard(self._shard_of(clean_path))
         # empty clean_path is root
         if clean_path and clean_path not in self._fs_metadata:
             raise FileNotFoundError()
         if clean_path and self._fs_metadata[clean_path].get("type") != "directory":
             return []
-        children = {
-            p
-            for p in self._fs_metadata.keys()
-            if p.startswith(clean_path) and "/" not in p[len(clean_path) + 1 :]
-        }
-        children.discard(clean_path)
-        ordered_children = sorted(children)
+        self._load_shard(self._shard_of(clean_path, children=True))
+        nodes = {c: self._fs_metadata[c] for c in self._children.get(clean_path, ())}
+        nodes.update(self._pending_children(clean_path))
+        ordered_children = sorted(nodes)
         if detail:
-            return [self._fs_metadata[c] for c in ordered_children]
+            return [nodes[c] for c in ordered_children]
         return ordered_children
 
+    @_keep_metadata_in_sync
+    def info(self, path: str, **kwargs: Any) -> dict[str, Any]:
+        clean_path = self._strip_protocol(path).rstrip("/")
+        if not clean_path:
+            return {"name": "", "size": 0, "type": "directory"}
+        staged = self._uploads.pending(clean_path) if self._uploads else None
+        if staged:
+            return _pending_node(staged)
+        self._load_shard(self._shard_of(clean_path))
+        if clean_path not in self._fs_metadata:
+            raise FileNotFoundError(path)
+        return dict(self._fs_metadata[clean_path])
+
+    def _pending_children(self, path: Path) -> dict[Path, NodeInfo]:
+        """Nodes of queued write-behind uploads in the directory."""
+        if not self._uploads:
+            return {}
+        return {
+            staged.virtual_path: _pending_node(staged)
+            for staged in self._uploads.pending_children(path)
+        }
+
     @_keep_metadata_in_sync
     def modified(self, path: str) -> datetime.datetime:
         if not self.exists(path):
             raise FileNotFoundError()
         return datetime.datetime.fromtimestamp(self.info(path).get("modified_at", 0.0))
 
-    @_keep_metadata_in_sync
-    def _open(self, path: str, mode: str = "rb", **kwargs: Any) -> BinaryIO:
+    def _open(
+        self, path: str, mode: str = "rb", lazy: bool = False, **kwargs: Any
+    ) -> BinaryIO:
+        """
+        Open a file. In read mode the whole file is downloaded to a local copy,
+        unless `lazy` is set and there is no fresh local copy yet: then the file
+        object fetches only requested byte ranges from the catalog.
+        """
         logger.debug("Opening file.", extra={"path": path, "mode": mode})
         path = self._strip_protocol(path)
 
@@ -309,70 +605,239 @@ class DRFileSystem(AbstractFileSystem):  # type: ignore[misc]
             raise NotImplementedError("Only read and write modes are supported")
 
         if mode == "rb":
-            if not self.exists(path):
-                raise FileNotFoundError()
-            if not self.isfile(path):
-                raise ValueError(f"{path} is not a file")
-            local_path = self._get_local_path(self.info(path))
-            return cast(BinaryIO, open(local_path, mode))
+            # file content is transferred outside of metadata lock
+            with self._metadata_sync("_open"):
+                if not self.exists(path):
+                    raise FileNotFoundError()
+                if not self.isfile(path):
+                    raise ValueError(f"{path} is not a file")
+                file_info = self.info(path)
+                if file_info.get("pending"):
+                    # staged file is removed only after the metadata is updated,
+                    # an open handle keeps it readable
+                    return cast(BinaryIO, open(file_info["local_path"], "rb"))
+            if lazy and "size" in file_info and not self._has_local_copy(file_info):
+                return cast(
+                    BinaryIO,
+                    _CatalogFile(
+                        self,
+                        path,
+                        catalog_id=file_info["catalog_id"],
+                        size=file_info["size"],
+                        block_size=kwargs.get("block_size"),
+                        cache_type=kwargs.get("cache_type", "readahead"),
+                        cache_options=kwargs.get("cache_options"),
+                    ),
+                )
+            local_path = self._get_local_path(file_info, pin=True)
+            return _CachedFileIO(self._cache, file_info["catalog_id"], local_path)
         elif mode == "wb":
-            parent = self._parent(path)
-            if not self.exists(parent):
-                raise FileNotFoundError(parent)
-            if not self.isdir(parent):
-                raise ValueError(f"{parent} is not a directory")
-            local_path = os.path.join(self._temp_dir, str(uuid.uuid4()))
+            with self._metadata_sync("_open"):
+                self._check_parent_dir(path)
+            local_path = (
+                self._uploads.staging_path()
+                if self._uploads
+                else os.path.join(self._temp_dir, str(uuid.uuid4()))
+            )
             return _FileIOWrapper(
                 fs_entity=self, virtual_path=path, name=local_path, mode=mode
             )
         else:
             raise NotImplementedError()
 
-    def _get_local_path(self, file_info: dict[str, Any]) -> str:
+    def cat_file(
+        self,
+        path: str,
+        start: int | None = None,
+        end: int | None = None,
+        **kwargs: Any,
+    ) -> bytes:
+        # partial reads fetch only the requested range instead of the whole file
+        kwargs.setdefault("lazy", start is not None or end is not None)
+        return cast(bytes, super().cat_file(path, start=start, end=end, **kwargs))
+
+    def _has_local_copy(self, file_info: dict[str, Any]) -> bool:
+        return self._cache.contains(file_info["catalog_id"])
+
+    def _get_local_path(self, file_info: dict[str, Any], pin: bool = False) -> str:
         catalog_id = file_info.get("catalog_id")
         if not catalog_id:
             raise ValueError(f"{file_info} is missing catalog_id")
-        if file_info["catalog_id"] not in self._downloaded_files:
-            # there is no local copy
-            return self._download_file(file_info)
-        local_path, local_copy_update_time = self._downloaded_files[
-            file_info["catalog_id"]
-        ]
-        if file_info["modified_at"] > local_copy_update_time:
-            # local copy is outdated
-            return self._download_file(file_info)
-        return local_path
-
-    def _download_file(self, file_info: dict[str, Any]) -> str:
+        # concurrent readers of the same file wait for a single download
+        with self._download_lock(catalog_id):
+            local_path = self._cache.get(catalog_id, pin=pin)
+            if local_path:
+                return local_path
+            return self._download_file(file_info, pin=pin)
+
+    @contextmanager
+    def _download_lock(self, catalog_id: str) -> Iterator[None]:
+        with self._download_locks_guard:
+            lock, users = self._download_locks.get(catalog_id, (threading.Lock(), 0))
+            self._download_locks[catalog_id] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._download_locks_guard:
+                lock, users = self._download_locks[catalog_id]
+                if users > 1:
+                    self._download_locks[catalog_id] = (lock, users - 1)
+                else:
+                    del self._download_locks[catalog_id]
+
+    def _download_file(self, file_info: dict[str, Any], pin: bool = False) -> str:
         catalog_id = file_info.get("catalog_id")
         if not catalog_id:
             raise ValueError(f"{file_info} is missing catalog_id")
 
-        local_path = os.path.join(self._temp_dir, catalog_id)
+        # catalog items are immutable, so partially downloaded data stays valid
+        partial_path = os.path.join(self._temp_dir, f"{catalog_id}.part")
         logger.debug(
             "Downloading file from catalog.",
-            extra={"catalog_id": catalog_id, "local_path": local_path},
+            extra={"catalog_id": catalog_id, "local_path": partial_path},
         )
 
+        for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+            try:
+                self._stream_catalog_file(
+                    catalog_id, partial_path, file_info.get("size")
+                )
+                break
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+            ):
+                if attempt == DOWNLOAD_ATTEMPTS:
+                    raise
+                logger.warning(
+                    "Download interrupted, resuming.",
+                    extra={"catalog_id": catalog_id, "attempt": attempt},
+                )
+        return self._cache.add(catalog_id, partial_path, pin=pin)
+
+    def _stream_catalog_file(
+        self, catalog_id: str, local_path: str, size: int | None = None
+    ) -> None:
+        offset = os.path.getsize(local_path) if os.path.exists(local_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            response = self.client.get(
+                f"files/{catalog_id}/file/",
+                headers=headers,
+                stream=True,
+                timeout=(FILE_API_CONNECT_TIMEOUT, FILE_API_READ_TIMEOUT),
+            )
+        except dr.errors.ClientError as e:
+            if e.status_code != 416 or not offset:
+                raise
+            if offset == size:
+                return  # partial file is complete already
+            # partial file doesn't match the item, start over
+            os.remove(local_path)
+            self._stream_catalog_file(catalog_id, local_path, size)
+            return
+        with response:
+            if response.status_code != 206:
+                offset = 0  # range is not honored, start over
+            with open(local_path, "ab" if offset else "wb") as f:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+
+    def _fetch_catalog_range(self, catalog_id: str, start: int, end: int) -> bytes:
+        if start >= end:
+            return b""
+        logger.debug(
+            "Fetching file range from catalog.",
+            extra={"catalog_id": catalog_id, "start": start, "end": end},
+        )
         response = self.client.get(
             f"files/{catalog_id}/file/",
+            headers={"Range": f"bytes={start}-{end - 1}"},
             timeout=(FILE_API_CONNECT_TIMEOUT, FILE_API_READ_TIMEOUT),
         )
-        with open(local_path, "wb") as f:
-            f.write(response.content)
-
-        self._downloaded_files[catalog_id] = (
-            local_path,
-            file_info.get("modified_at", 0),
-        )
-        return local_path
+        if response.status_code == 206:
+            return response.content
+        return response.content[start:end]  # range is not honored
 
     def _remove_catalog_item(self, catalog_id: str) -> None:
         logger.debug("Removing file from catalog.", extra={"catalog_id": catalog_id})
-        self.client.delete(f"files/{catalog_id}/")
+        try:
+            self.client.delete(f"files/{catalog_id}/")
+        except dr.errors.ClientError as e:
+            # concurrent writers may release the same item
+            if e.status_code != 404:
+                raise
+        self._cache.discard(catalog_id)
+
+    def _remove_catalog_items(self, catalog_ids: Iterable[str]) -> None:
+        _, error = _map_concurrently(
+            self._remove_catalog_item, catalog_ids, BULK_MAX_WORKERS
+        )
+        if error:
+            # metadata doesn't reference these items anymore, they are only orphaned
+            logger.warning("Failed to remove catalog items.", exc_info=error)
 
-    @_keep_metadata_in_sync
-    def _upload_to_catalog(self, virtual_path: str, local_path: str) -> None:
+    def _upload_to_catalog(
+        self,
+        virtual_path: str,
+        local_path: str,
+        cache_mode: CacheMode = "move",
+        staged: StagedUpload | None = None,
+    ) -> None:
+        """
+        Store local file as `virtual_path`. The local file becomes the cached copy
+        of the new catalog item; it's moved into the cache unless `cache_mode`
+        says otherwise: files owned by the file system which must stay in place,
+        e.g. a cached copy of another item, are linked, others are copied.
+        Content already stored in the catalog is referenced instead of uploaded.
+        """
+        checksum = calculate_checksum(local_path).hex()
+        with self._metadata_sync("_upload_to_catalog"):
+            fs_info = self._reuse_stored_content(
+                virtual_path, local_path, checksum, cache_mode
+            )
+            if fs_info:
+                self._register_upload(fs_info, staged)
+        if not fs_info:
+            fs_info = self._post_to_catalog(
+                virtual_path, local_path, cache_mode, checksum
+            )
+            with self._metadata_sync("_upload_to_catalog"):
+                self._register_upload(fs_info, staged)
+
+    def _reuse_stored_content(
+        self, virtual_path: str, local_path: str, checksum: str, cache_mode: CacheMode
+    ) -> NodeInfo | None:
+        """
+        Return node referencing catalog item with the same content as the local
+        file, None if there is no such item. Must be called under metadata sync
+        and the node registered within the same call, so the item can't be
+        removed meanwhile.
+        """
+        shard = self._shard_of(virtual_path)
+        self._load_shard(shard)
+        catalog_id = self._catalog_by_checksum.get((shard, checksum))
+        if not catalog_id:
+            return None
+        logger.debug(
+            "Reusing catalog item with identical content.",
+            extra={"virtual_path": virtual_path, "catalog_id": catalog_id},
+        )
+        if not self._cache.contains(catalog_id):
+            return self._cache_upload(
+                virtual_path, catalog_id, local_path, cache_mode, checksum
+            )
+        fs_info = self._file_node(
+            virtual_path, catalog_id, os.path.getsize(local_path), checksum
+        )
+        if cache_mode == "move":
+            os.remove(local_path)
+        return fs_info
+
+    def _post_to_catalog(
+        self, virtual_path: str, local_path: str, cache_mode: CacheMode, checksum: str
+    ) -> NodeInfo:
         logger.debug("Uploading file to catalog.", extra={"virtual_path": virtual_path})
         with open(local_path, "rb") as f:
             response = self.client.post(
@@ -381,25 +846,198 @@ class DRFileSystem(AbstractFileSystem):  # type: ignore[misc]
                 data={"useArchiveContents": "false"},
                 timeout=(FILE_API_CONNECT_TIMEOUT, FILE_API_READ_TIMEOUT),
             )
-        catalog_id = response.json()["catalogId"]
-        modified_at = time.time()
-        fs_info = {
+        return self._cache_upload(
+            virtual_path,
+            response.json()["catalogId"],
+            local_path,
+            cache_mode,
+            checksum,
+        )
+
+    def _cache_upload(
+        self,
+        virtual_path: str,
+        catalog_id: str,
+        local_path: str,
+        cache_mode: CacheMode,
+        checksum: str,
+    ) -> NodeInfo:
+        """Keep uploaded local file as the cached copy, return node of the upload."""
+        fs_info = self._file_node(
+            virtual_path, catalog_id, os.path.getsize(local_path), checksum
+        )
+        self._cache.add(catalog_id, local_path, mode=cache_mode)
+        return fs_info
+
+    @staticmethod
+    def _file_node(
+        virtual_path: str, catalog_id: str, size: int, checksum: str
+    ) -> NodeInfo:
+        return {
             "catalog_id": catalog_id,
             "type": "file",
             "name": virtual_path,
-            "modified_at": modified_at,
-            "size": os.path.getsize(local_path),
+            "modified_at": time.time(),
+            "size": size,
+            "checksum": checksum,
         }
-        self._downloaded_files[catalog_id] = (local_path, modified_at)
-        existing_info = self._fs_metadata.get(virtual_path)
-        if existing_info:
-            catalog_id = cast(str, existing_info["catalog_id"])
-            self._remove_catalog_item(catalog_id)
-            local_path, _ = self._downloaded_files.pop(catalog_id, ("", 0.0))
-            if local_path:
-                os.remove(local_path)
-        self._fs_metadata[virtual_path] = fs_info
-        self._fs_metadata_timestamp = modified_at
+
+    def _register_upload(
+        self, fs_info: NodeInfo, staged: StagedUpload | None = None
+    ) -> None:
+        """
+        Store node of uploaded file unless `staged` was superseded by a newer
+        write of the path. Replaced or superseded catalog items are released.
+        """
+        virtual_path = cast(str, fs_info["name"])
+        if self._uploads and not self._uploads.settle(staged, virtual_path):
+            self._released_catalog_ids.add(cast(str, fs_info["catalog_id"]))
+            return
+        self._set_node(virtual_path, fs_info)
+
+    def _upload_staged(self, staged: StagedUpload) -> None:
+        """Upload file queued by write-behind, called by the queue worker."""
+        self._upload_to_catalog(
+            staged.virtual_path, staged.local_path, cache_mode="link", staged=staged
+        )
+
+    def _check_parent_dir(self, path: str) -> None:
+        parent = self._parent(path)
+        if not self.exists(parent):
+            raise FileNotFoundError(parent)
+        if not self.isdir(parent):
+            raise ValueError(f"{parent} is not a directory")
+
+    def put_many(
+        self, files: Mapping[str, str], max_workers: int = BULK_MAX_WORKERS
+    ) -> None:
+        """
+        Upload local files concurrently, `files` maps local paths to remote ones.
+        Files with content already in the catalog are committed first, then
+        nodes of all uploaded files are committed with a single journal entry,
+        even if some of the uploads fail.
+        """
+        targets = {
+            lpath: self._strip_protocol(rpath).rstrip("/")
+            for lpath, rpath in files.items()
+        }
+        with self._metadata_sync("put_many"):
+            for rpath in targets.values():
+                self._check_parent_dir(rpath)
+
+        hashed, error = _map_concurrently(
+            lambda lpath: (lpath, calculate_checksum(lpath).hex()),
+            targets,
+            max_workers,
+        )
+        to_upload: list[tuple[str, str]] = []
+        with self.batch():
+            for lpath, checksum in hashed:
+                fs_info = self._reuse_stored_content(
+                    targets[lpath], lpath, checksum, cache_mode="copy"
+                )
+                if fs_info:
+                    self._register_upload(fs_info)
+                else:
+                    to_upload.append((lpath, checksum))
+
+        uploaded, upload_error = _map_concurrently(
+            lambda item: self._post_to_catalog(
+                targets[item[0]], item[0], cache_mode="copy", checksum=item[1]
+            ),
+            to_upload,
+            max_workers,
+        )
+        error = error or upload_error
+        with self.batch():
+            for fs_info in uploaded:
+                self._register_upload(fs_info)
+        if error:
+            raise error
+
+    def get_many(
+        self, files: Mapping[str, str], max_workers: int = BULK_MAX_WORKERS
+    ) -> None:
+        """Download files concurrently, `files` maps remote paths to local ones."""
+        self._wait_for_uploads(files)
+        with self._metadata_sync("get_many"):
+            targets: list[tuple[NodeInfo, str]] = []
+            for rpath, lpath in files.items():
+                file_info = self.info(rpath)
+                if file_info["type"] != "file":
+                    raise ValueError(f"{rpath} is not a file")
+                if file_info.get("pending"):
+                    # still queued within a batch, the staged file is removed
+                    # only after the metadata is updated, so it's read now
+                    _copy_file(file_info["local_path"], lpath)
+                    continue
+                targets.append((file_info, lpath))
+
+        _, error = _map_concurrently(
+            lambda item: self._copy_to_local(*item), targets, max_workers
+        )
+        if error:
+            raise error
+
+    def _copy_to_local(self, file_info: NodeInfo, lpath: str) -> None:
+        catalog_id = cast(str, file_info["catalog_id"])
+        local_path = self._get_local_path(file_info, pin=True)
+        try:
+            _copy_file(local_path, lpath)
+        finally:
+            self._cache.unpin(catalog_id)
+
+    @contextmanager
+    def local_path(self, path: str) -> Iterator[str]:
+        """
+        Yield the path of the cached local copy of a file, downloading it first
+        if needed, so readers don't copy it again. The copy stays pinned in the
+        cache until the context exits and must not be modified.
+        """
+        self._wait_for_uploads([path])
+        copy_dir = None
+        with self._metadata_sync("local_path"):
+            file_info = self.info(path)
+            if file_info["type"] != "file":
+                raise ValueError(f"{path} is not a file")
+            if file_info.get("pending"):
+                # still queued within a batch, the staged file is removed once
+                # uploaded, so it's read from a copy
+                copy_dir = tempfile.mkdtemp(dir=self._temp_dir)
+                local_path = os.path.join(copy_dir, os.path.basename(path))
+                shutil.copyfile(file_info["local_path"], local_path)
+        if copy_dir:
+            try:
+                yield local_path
+            finally:
+                shutil.rmtree(copy_dir, ignore_errors=True)
+            return
+
+        catalog_id = cast(str, file_info["catalog_id"])
+        local_path = self._get_local_path(file_info, pin=True)
+        try:
+            yield local_path
+        finally:
+            self._cache.unpin(catalog_id)
+
+    def rm_many(self, paths: Iterable[str]) -> None:
+        """
+        Remove files and empty directories, deepest paths first. Nodes are
+        committed with a single journal entry, then the catalog items are
+        removed concurrently.
+        """
+        clean_paths = sorted(
+            {self._strip_protocol(path).rstrip("/") for path in paths},
+            key=lambda path: path.count("/"),
+            reverse=True,
+        )
+        with self.batch():
+            for path in clean_paths:
+                info = self.info(path)
+                if info["type"] == "directory":
+                    self.rmdir(path)
+                else:
+                    self._remove_node(path)
 
     @_keep_metadata_in_sync
     def rm_file(self, path: str) -> None:
@@ -411,18 +1049,13 @@ class DRFileSystem(AbstractFileSystem):  # type: ignore[misc]
             return
         if self.isfile(path):
             clear_path = self._strip_protocol(path).rstrip("/")
-            info = self._fs_metadata[clear_path]
-            catalog_id = cast(str, info["catalog_id"])
-            self._remove_catalog_item(catalog_id)
-            local_path, _ = self._downloaded_files.pop(catalog_id, ("", 0.0))
-            if local_path:
-                os.remove(local_path)
-
-            self._fs_metadata.pop(clear_path)
-            self._fs_metadata_timestamp = time.time()
+            # catalog item is removed with the last node referencing it,
+            # after the change is committed
+            self._remove_node(clear_path)
             return
         raise NotImplementedError(f"No remove logic for node: {path}")
 
+    @_wait_for_pending_uploads
     @_keep_metadata_in_sync
     def cp_file(self, path1: str, path2: str, **kwargs: Any) -> None:
         logger.debug("Copy file.", extra={"src_path": path1, "dst_path": path2})
@@ -434,17 +1067,43 @@ class DRFileSystem(AbstractFileSystem):  # type: ignore[misc]
             self.mkdir(path2)
             return
         if self.isfile(path1):
-            parent = self._parent(path2)
-            if not self.exists(parent):
-                raise FileNotFoundError(parent)
-            if not self.isdir(parent):
-                raise ValueError(f"{parent} is not a directory")
-
-            local_path = self._get_local_path(self.info(path1))
-            self._upload_to_catalog(self._strip_protocol(path2).rstrip("/"), local_path)
+            self._check_parent_dir(path2)
+
+            clean_path2 = self._strip_protocol(path2).rstrip("/")
+            file_info = self.info(path1)
+            if file_info.get("pending"):
+                # upload still queued within a batch, can't be waited for here
+                self._stage_copy(file_info, clean_path2)
+                return
+            if self._shard_of(file_info["name"]) != self._shard_of(clean_path2):
+                # catalog items are shared only within a shard
+                self._copy_content(file_info, clean_path2)
+                return
+            # copy references the same catalog item, no content is transferred
+            self._set_node(
+                clean_path2,
+                {**file_info, "name": clean_path2, "modified_at": time.time()},
+            )
             return
         raise NotImplementedError(f"No copy logic for node: {path1}")
 
+    def _stage_copy(self, file_info: NodeInfo, virtual_path: str) -> None:
+        """Queue upload of a copy of the staged file for `virtual_path`."""
+        assert self._uploads is not None
+        local_path = self._uploads.staging_path()
+        # staged file is removed only after the metadata is updated
+        shutil.copyfile(cast(str, file_info["local_path"]), local_path)
+        self._uploads.enqueue(virtual_path, local_path, block=False)
+
+    def _copy_content(self, file_info: NodeInfo, virtual_path: str) -> None:
+        catalog_id = cast(str, file_info["catalog_id"])
+        local_path = self._get_local_path(file_info, pin=True)
+        try:
+            self._upload_to_catalog(virtual_path, local_path, cache_mode="link")
+        finally:
+            self._cache.unpin(catalog_id)
+
+    @_wait_for_pending_uploads
     @_keep_metadata_in_sync
     def safe_get_file(self, rpath: str, lpath: str, **kwargs: Any) -> bool:
         """Replace local file with file from DR if local file is older. Return True if replacement happened."""
@@ -486,9 +1145,11 @@ class DRFileSystem(AbstractFileSystem):  # type: ignore[misc]
 
 def calculate_checksum(path: str) -> bytes:
     adder = hashlib.sha256()
-    with open(path, "rb") as file:
-        while chunk := file.read(8192):
-            adder.update(chunk)
+    buffer = bytearray(CHECKSUM_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as file:
+        while size := file.readinto(buffer):
+            adder.update(view[:size])
     return adder.digest()
 
 
@@ -498,6 +1159,17 @@ def all_env_variables_present() -> bool:
     return not any(not os.environ.get(env_name) for env_name in expected_envs)
 
 
+def _pending_node(staged: StagedUpload) -> NodeInfo:
+    return {
+        "type": "file",
+        "name": staged.virtual_path,
+        "modified_at": staged.staged_at,
+        "size": staged.size,
+        "pending": True,
+        "local_path": staged.local_path,
+    }
+
+
 class _FileIOWrapper(io.FileIO):
     def __init__(
         self, fs_entity: DRFileSystem, virtual_path: str, name: str, mode: str
@@ -513,16 +1185,76 @@ class _FileIOWrapper(io.FileIO):
             size = self.tell()
             upload_file = size > 0
         super().close()
-        if upload_file:
+        uploads = self._fs_entity._uploads
+        if upload_file and uploads:
+            # holder of metadata lock must not wait for the worker
+            uploads.enqueue(
+                self._virtual_path, self.name, block=not self._fs_entity._sync_stack
+            )
+        elif upload_file:
             self._fs_entity._upload_to_catalog(self._virtual_path, self.name)
         else:
+            if uploads:
+                os.remove(self.name)  # staging directory is not cleaned up
             logger.debug("Wrapper was empty")
 
 
+class _CachedFileIO(io.FileIO):
+    """Read handle of a cached file, keeps the cache entry pinned while open."""
+
+    def __init__(self, cache: LocalFileCache, catalog_id: str, name: str) -> None:
+        super().__init__(name, "rb")
+        self._cache = cache
+        self._catalog_id = catalog_id
+
+    def close(self) -> None:
+        if not self.closed:
+            self._cache.unpin(self._catalog_id)
+        super().close()
+
+
+class _CatalogFile(AbstractBufferedFile):  # type: ignore[misc]
+    """Read-only file fetching byte ranges of a catalog item on demand."""
+
+    def __init__(
+        self, fs: DRFileSystem, path: str, catalog_id: str, **kwargs: Any
+    ) -> None:
+        self.catalog_id = catalog_id
+        super().__init__(fs, path, mode="rb", **kwargs)
+
+    def _fetch_range(self, start: int, end: int) -> bytes:
+        return cast(DRFileSystem, self.fs)._fetch_catalog_range(
+            self.catalog_id, start, end
+        )
+
+
+_shared_file_system: tuple[int, DRFileSystem] | None = None  # (pid, instance)
+_shared_file_system_lock = threading.Lock()
+
+
+def get_dr_file_system() -> DRFileSystem:
+    """
+    Return DRFileSystem shared by all threads of the process, so metadata and
+    downloaded files are reused between requests. Forked processes get their own.
+    """
+    global _shared_file_system
+    with _shared_file_system_lock:
+        if _shared_file_system is None or _shared_file_system[0] != os.getpid():
+            _shared_file_system = (
+                os.getpid(),
+                DRFileSystem(skip_instance_cache=True),
+            )
+        return _shared_file_system[1]
+
+
+def _copy_file(src: str, dst: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    shutil.copyfile(src, dst)
+
+
 def get_file_system() -> AbstractFileSystem:
-    expected_envs = ["DATAROBOT_ENDPOINT", "DATAROBOT_API_TOKEN", "APPLICATION_ID"]
-    if any(not os.environ.get(env_name) for env_name in expected_envs):
+    if not all_env_variables_present():
         # there is some env variables missing and probably it's a local run
         # let's use local file system
         return LocalFileSystem()
-    return DRFileSystem()
+    return get_dr_file_system()
@@ -11,6 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import logging
 import os
 from types import TracebackType
 from typing import Any
@@ -18,11 +19,48 @@ from typing import Any
 import duckdb
 from typing_extensions import Self
 
-from core.persistent_fs.dr_file_system import DRFileSystem, calculate_checksum
+from core.persistent_fs.chunked_replica import ChunkedFileReplica
+from core.persistent_fs.dr_file_system import DRFileSystem, get_dr_file_system
+
+logger = logging.getLogger(__name__)
+
+# multiple of DuckDB block size (256 KiB), so a rewritten block touches one chunk
+DUCKDB_CHUNK_SIZE = int(os.environ.get("DR_FS_DUCKDB_CHUNK_SIZE", 4 * 1024**2))
 
 
 def _get_fs_entity() -> DRFileSystem | None:
-    return DRFileSystem() if os.environ.get("APPLICATION_ID") else None
+    return get_dr_file_system() if os.environ.get("APPLICATION_ID") else None
+
+
+def register_dr_fs(connection: duckdb.DuckDBPyConnection) -> bool:
+    """
+    Register DRFileSystem with a DuckDB connection, so queries can read and
+    write `dr://` paths, e.g. Parquet datasets partitioned with
+    `COPY ... TO 'dr://dataset' (FORMAT parquet, PARTITION_BY (...))` and
+    `read_parquet('dr://dataset/*/*.parquet', hive_partitioning = true)`.
+    Return False if there is no access to persistent storage.
+    """
+    fs_entity = _get_fs_entity()
+    if not fs_entity:
+        return False
+    if not connection.filesystem_is_registered(fs_entity.protocol):
+        connection.register_filesystem(fs_entity)
+    return True
+
+
+class DuckDBReplica(ChunkedFileReplica):
+    """
+    DuckDB database file replicated by chunks. Checkpoints rewrite only the
+    blocks of changed row groups, so syncs transfer those instead of the file.
+    """
+
+    def _checkpoint(self) -> None:
+        if not os.path.exists(f"{self.local_path}.wal"):
+            return
+        # connects to the database instance of this process if it's open, raises
+        # TransactionException while other connections have writes in progress
+        with duckdb.connect(self.local_path) as connection:
+            connection.execute("CHECKPOINT")
 
 
 class DuckDBPyConnectionWrapper:
@@ -31,42 +69,40 @@ class DuckDBPyConnectionWrapper:
         connection_entity: duckdb.DuckDBPyConnection,
         database: Any,
         read_only: bool,
-        checksum: bytes,
+        replica: DuckDBReplica | None,
     ):
         self._connection_entity = connection_entity
         self._database = database
         self._read_only = read_only
-        self._checksum = checksum
-        self._fs_entity = _get_fs_entity()
-        if self._fs_entity and not self._connection_entity.filesystem_is_registered(
-            self._fs_entity.protocol
-        ):
-            self._connection_entity.register_filesystem(self._fs_entity)
+        # shared by duplicates of the connection, None if the database isn't
+        # persisted, i.e. it's in memory or there is no access to storage
+        self._replica = replica
+        register_dr_fs(self._connection_entity)
 
     def close(self) -> None:
         self._connection_entity.close()
         if self._read_only:
             # skip upload if no write actions
             return
-        if not self._database or self._database == ":memory:":
-            # skip upload if it was in memory DB
+        if not self._replica:
             return
-        if not self._fs_entity:
-            # skip upload if there is no access to persistent storage FS
-            return
-        new_checksum = calculate_checksum(self._database)
-        if new_checksum == self._checksum:
-            # skip upload if nothing has changed
-            return
-        self._fs_entity.put(self._database, self._database)
-        self._checksum = new_checksum
+        try:
+            # uploads only the chunks changed since the last sync, if any
+            self._replica.persist()
+        except (duckdb.TransactionException, duckdb.ConnectionException):
+            # the database can't be checkpointed while other connections write
+            # or use another config, they persist the changes when they close
+            logger.debug(
+                "Database is in use, skipping persist.",
+                extra={"database": self._database},
+            )
 
     def duplicate(self) -> Self:
         return self.__class__(
             self._connection_entity.duplicate(),
             self._database,
             self._read_only,
-            self._checksum,
+            self._replica,
         )
 
     def __getattr__(self, name: str) -> Any:
@@ -85,21 +121,17 @@ class DuckDBPyConnectionWrapper:
         self.close()
 
 
-def _preload_file(database: str | None) -> bytes:
-    checksum = b""
-    if not database or database == ":memory:":
-        return checksum
+def _preload_file(database: str) -> DuckDBReplica | None:
+    if database == ":memory:":
+        return None
     fs_entity = _get_fs_entity()
     if not fs_entity:
-        return checksum
-    if not fs_entity.exists(database):
-        return checksum
-
-    fs_entity.get(
-        database, database
-    )  # get file with the same name from persistent storage
+        return None
 
-    return calculate_checksum(database)
+    # get changed chunks of the file with the same name from persistent storage
+    replica = DuckDBReplica(fs_entity, database, chunk_size=DUCKDB_CHUNK_SIZE)
+    replica.restore()
+    return replica
 
 
 def connect_dr_fs(
@@ -111,7 +143,7 @@ def connect_dr_fs(
     database = database or ":memory:"
     config = config or {}
 
-    checksum = _preload_file(database)
+    replica = _preload_file(database)
 
     con = duckdb.connect(database=database, read_only=read_only, config=config)
-    return DuckDBPyConnectionWrapper(con, database, read_only, checksum)
+    return DuckDBPyConnectionWrapper(con, database, read_only, replica)
@@ -0,0 +1,174 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import atexit
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Literal
+
+logger = logging.getLogger(__name__)
+
+CatalogId = str
+# how a local file gets into the cache; only files owned by the file system,
+# which nobody modifies in place, may be hard linked
+CacheMode = Literal["move", "link", "copy"]
+
+LOCAL_CACHE_MAX_BYTES = int(os.environ.get("DR_FS_CACHE_MAX_BYTES", 1024**3))
+
+
+@dataclass
+class LocalCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0  # bytes currently stored
+
+
+@dataclass
+class _CacheEntry:
+    path: str
+    size: int
+    pins: int = 0
+
+
+class LocalFileCache:
+    """
+    Process-wide cache of catalog files downloaded to the local disk.
+
+    Catalog items are immutable, so entries are addressed by catalog id and never
+    go stale. Least recently used entries are evicted once the cache grows over
+    `max_bytes`, except pinned ones which are currently open.
+    """
+
+    def __init__(self, max_bytes: int = LOCAL_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.stats = LocalCacheStats()
+        self._dir = tempfile.mkdtemp(prefix="dr_fs_cache_")
+        self._entries: OrderedDict[CatalogId, _CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        atexit.register(shutil.rmtree, self._dir, ignore_errors=True)
+
+    def get(self, catalog_id: CatalogId, pin: bool = False) -> str | None:
+        """Return local path of the cached file, pinning it if requested."""
+        with self._lock:
+            entry = self._entries.get(catalog_id)
+            if not entry:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self._entries.move_to_end(catalog_id)
+            if pin:
+                entry.pins += 1
+            return entry.path
+
+    def contains(self, catalog_id: CatalogId) -> bool:
+        with self._lock:
+            return catalog_id in self._entries
+
+    def add(
+        self,
+        catalog_id: CatalogId,
+        path: str,
+        mode: CacheMode = "move",
+        pin: bool = False,
+    ) -> str:
+        """
+        Put a local file into the cache and return its cached path. The file is
+        moved, hard linked or copied according to `mode`. A linked file shares
+        its content with the cached copy, so it must never change afterwards.
+        """
+        target = os.path.join(self._dir, catalog_id)
+        if mode == "move":
+            shutil.move(path, target)
+        elif mode == "link":
+            try:
+                os.link(path, target)
+            except OSError:
+                shutil.copyfile(path, target)
+        else:
+            shutil.copyfile(path, target)
+        size = os.path.getsize(target)
+
+        with self._lock:
+            previous = self._entries.pop(catalog_id, None)
+            if previous:
+                self.stats.size -= previous.size
+            self._entries[catalog_id] = _CacheEntry(
+                target, size, pins=(previous.pins if previous else 0) + int(pin)
+            )
+            self.stats.size += size
+            self._evict(keep=catalog_id)
+        return target
+
+    def pin(self, catalog_id: CatalogId) -> None:
+        with self._lock:
+            entry = self._entries.get(catalog_id)
+            if entry:
+                entry.pins += 1
+
+    def unpin(self, catalog_id: CatalogId) -> None:
+        with self._lock:
+            entry = self._entries.get(catalog_id)
+            if entry and entry.pins > 0:
+                entry.pins -= 1
+            self._evict()
+
+    def discard(self, catalog_id: CatalogId) -> None:
+        """Drop the entry, e.g. when the catalog item is removed."""
+        with self._lock:
+            entry = self._entries.pop(catalog_id, None)
+            if entry:
+                self.stats.size -= entry.size
+                self._remove_file(entry.path)
+
+    def _evict(self, keep: CatalogId | None = None) -> None:
+        if self.stats.size <= self.max_bytes:
+            return
+        for catalog_id, entry in list(self._entries.items()):
+            if self.stats.size <= self.max_bytes:
+                break
+            if entry.pins or catalog_id == keep:
+                continue
+            logger.debug(
+                "Evicting file from local cache.",
+                extra={"catalog_id": catalog_id, "size": entry.size},
+            )
+            del self._entries[catalog_id]
+            self.stats.size -= entry.size
+            self.stats.evictions += 1
+            self._remove_file(entry.path)
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_local_cache: LocalFileCache | None = None
+_local_cache_lock = threading.Lock()
+
+
+def get_local_cache() -> LocalFileCache:
+    """Return the cache shared by all DRFileSystem instances of the process."""
+    global _local_cache
+    with _local_cache_lock:
+        if _local_cache is None:
+            _local_cache = LocalFileCache()
+        return _local_cache
@@ -0,0 +1,375 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any
+
+import datarobot as dr
+
+Path = str
+NodeInfo = dict[str, str | int | float]
+Metadata = dict[Path, NodeInfo]
+MetadataChanges = dict[Path, NodeInfo | None]  # None marks a removed node
+
+logger = logging.getLogger(__name__)
+
+METADATA_STORAGE_NAME = "fs_metadata"  # pre-journal format, only read to migrate
+METADATA_SNAPSHOT_STORAGE_NAME = "fs_metadata_snapshot"
+METADATA_HEAD_STORAGE_NAME = "fs_metadata_head"
+METADATA_LOG_STORAGE_PREFIX = "fs_metadata_log_"
+
+METADATA_COMPACTION_INTERVAL = int(
+    os.environ.get("DR_FS_METADATA_COMPACTION_INTERVAL", 50)
+)
+METADATA_SYNC_ATTEMPTS = 3
+METADATA_COMMIT_ATTEMPTS = int(os.environ.get("DR_FS_METADATA_COMMIT_ATTEMPTS", 10))
+
+
+class MetadataConflictError(Exception):
+    """Local changes of the paths lost to concurrent changes of another writer."""
+
+    def __init__(self, paths: list[Path]) -> None:
+        super().__init__(f"Concurrently modified paths: {', '.join(paths)}")
+        self.paths = paths
+
+
+@dataclass
+class CommitResult:
+    merged: MetadataChanges = field(default_factory=dict)  # applied remote changes
+    rejected: MetadataChanges = field(default_factory=dict)  # dropped local changes
+
+
+def shard_journal_name(shard: Path) -> str:
+    """Storage name of the journal holding nodes under the `shard` directory."""
+    digest = hashlib.sha1(shard.encode(), usedforsecurity=False).hexdigest()
+    return f"{METADATA_STORAGE_NAME}_shard_{digest[:16]}"
+
+
+def apply_changes(metadata: Metadata, changes: MetadataChanges) -> None:
+    for path, info in changes.items():
+        if info is None:
+            metadata.pop(path, None)
+        else:
+            metadata[path] = info
+
+
+def _is_conflict(local: NodeInfo | None, remote: NodeInfo | None) -> bool:
+    if local is None or remote is None:
+        return local is not remote
+    # directories carry no content, creating one concurrently is not a conflict
+    if local.get("type") == remote.get("type") == "directory":
+        return False
+    return local != remote
+
+
+class MetadataJournal:
+    """
+    Append-only change log of DRFileSystem metadata stored in DataRobot KeyValues.
+
+    Each commit is stored as a separate KeyValue holding only the changed nodes,
+    and the head KeyValue keeps the sequence number of the latest commit.
+    Every `compaction_interval` commits the whole tree is written as a snapshot,
+    so readers replay only the log entries past their last seen sequence number
+    and fall back to the snapshot when they are too far behind.
+    The storage names are derived from `name`, so independent journals, e.g.
+    shards of one tree, can live side by side.
+
+    Log entry names are unique, so creating the entry of the next sequence number
+    is a compare-and-swap: a writer who lost the race catches up with the winner,
+    merges its changes of other paths and retries with the following number.
+    The head is only a hint of the latest sequence number for readers, but it
+    never moves back and is advanced before compaction removes any entry, so a
+    writer behind the head catches up first instead of re-creating an entry
+    which was compacted away.
+    """
+
+    def __init__(
+        self,
+        client: dr.rest.RESTClientObject,
+        app_id: str,
+        compaction_interval: int = METADATA_COMPACTION_INTERVAL,
+        name: str = METADATA_STORAGE_NAME,
+    ) -> None:
+        self.client = client
+        self.app_id = app_id
+        self.compaction_interval = max(1, compaction_interval)
+
+        self._snapshot_name = f"{name}_snapshot"
+        self._head_name = f"{name}_head"
+        self._log_prefix = f"{name}_log_"
+        # only the root journal existed in the pre-journal format
+        self._legacy_name = name if name == METADATA_STORAGE_NAME else None
+
+        self.sequence = -1  # last sequence applied locally, -1 if nothing loaded
+        self._snapshot_sequence = 0
+
+        self._head_stored: dr.KeyValue | None = None
+        self._snapshot_stored: dr.KeyValue | None = None
+
+    def _find(self, name: str) -> dr.KeyValue | None:
+        return dr.KeyValue.find(
+            self.app_id, dr.KeyValueEntityType.CUSTOM_APPLICATION, name
+        )
+
+    def _create(
+        self, name: str, value_type: dr.KeyValueType, value: Any
+    ) -> dr.KeyValue:
+        return dr.KeyValue.create(
+            entity_id=self.app_id,
+            entity_type=dr.KeyValueEntityType.CUSTOM_APPLICATION,
+            name=name,
+            category=dr.KeyValueCategory.ARTIFACT,
+            value_type=value_type,
+            value=value,
+        )
+
+    def _log_entry_name(self, sequence: int) -> str:
+        return f"{self._log_prefix}{sequence}"
+
+    def head(self) -> int:
+        """Fetch sequence number of the latest remote commit."""
+        with self.client:
+            if self._head_stored:
+                self._head_stored.refresh()
+            else:
+                self._head_stored = self._find(self._head_name)
+        if not self._head_stored:
+            return 0
+        return int(self._head_stored.numeric_value)
+
+    def sync(self, metadata: Metadata) -> bool:
+        """
+        Bring `metadata` up to the remote head in place.
+        Return True if anything was applied.
+        """
+        head = self.head()
+        if head == self.sequence:
+            return False
+
+        logger.debug(
+            "Syncing metadata journal.",
+            extra={"local_sequence": self.sequence, "remote_sequence": head},
+        )
+        if self.sequence < 0 or head < self.sequence:
+            self._load_snapshot(metadata)
+        for _ in range(METADATA_SYNC_ATTEMPTS):
+            if self._replay(metadata, head):
+                return True
+            # log tail was compacted away, start over from the latest snapshot
+            self._load_snapshot(metadata)
+        raise RuntimeError(f"Unable to replay metadata journal up to {head}.")
+
+    def _replay(self, metadata: Metadata, head: int) -> bool:
+        for sequence in range(self.sequence + 1, head + 1):
+            with self.client:
+                entry = self._find(self._log_entry_name(sequence))
+            if not entry:
+                return False
+            apply_changes(metadata, json.loads(entry.value)["changes"])
+            self.sequence = sequence
+        return True
+
+    def _load_snapshot(self, metadata: Metadata) -> None:
+        logger.debug("Loading metadata snapshot.")
+        legacy_stored: dr.KeyValue | None = None
+        with self.client:
+            if self._snapshot_stored:
+                self._snapshot_stored.refresh()
+            else:
+                self._snapshot_stored = self._find(self._snapshot_name)
+            if not self._snapshot_stored and self._legacy_name:
+                legacy_stored = self._find(self._legacy_name)
+
+        metadata.clear()
+        sequence = 0
+        if self._snapshot_stored:
+            snapshot = json.loads(self._snapshot_stored.value)
+            metadata.update(snapshot["metadata"])
+            sequence = int(snapshot["sequence"])
+        elif legacy_stored:
+            metadata.update(json.loads(legacy_stored.value))
+        self.sequence = self._snapshot_sequence = sequence
+
+    def commit(self, metadata: Metadata, changes: MetadataChanges) -> CommitResult:
+        """
+        Append `changes` as the next log entry. `metadata` must already contain
+        them. If other writers committed meanwhile, their changes are applied to
+        `metadata`, and local changes of the same paths are dropped in favor of
+        the ones committed first.
+        """
+        result = CommitResult()
+        changes = dict(changes)
+        for _ in range(METADATA_COMMIT_ATTEMPTS):
+            if not changes:
+                return result
+            if self.head() > max(self.sequence, 0):
+                # names of compacted entries are free again, never reuse them
+                self._merge_remote_changes(metadata, changes, result)
+                continue
+            sequence = max(self.sequence, 0) + 1
+            logger.debug(
+                "Committing metadata changes.",
+                extra={"sequence": sequence, "changed_nodes": len(changes)},
+            )
+            try:
+                with self.client:
+                    self._create(
+                        self._log_entry_name(sequence),
+                        dr.KeyValueType.JSON,
+                        json.dumps({"sequence": sequence, "changes": changes}),
+                    )
+            except dr.errors.ClientError as e:
+                if e.status_code != 409:
+                    raise
+                self._merge_remote_changes(metadata, changes, result)
+                continue
+
+            self.sequence = sequence
+            self._advance_head(sequence)
+            if self.sequence - self._snapshot_sequence >= self.compaction_interval:
+                try:
+                    self.compact(metadata)
+                except Exception:
+                    # the commit has landed, the next one retries the compaction
+                    logger.warning(
+                        "Failed to compact metadata journal.",
+                        extra={"sequence": self.sequence},
+                        exc_info=True,
+                    )
+            return result
+        raise RuntimeError(
+            f"Unable to commit metadata in {METADATA_COMMIT_ATTEMPTS} attempts."
+        )
+
+    def _merge_remote_changes(
+        self, metadata: Metadata, changes: MetadataChanges, result: CommitResult
+    ) -> None:
+        logger.debug(
+            "Metadata commit raced with another writer, merging.",
+            extra={"sequence": self.sequence},
+        )
+        remote_changes = self._fetch_newer_changes(metadata, changes)
+        apply_changes(metadata, remote_changes)
+        result.merged.update(remote_changes)
+        for path, remote_info in remote_changes.items():
+            if path not in changes:
+                continue
+            local_info = changes.pop(path)
+            if _is_conflict(local_info, remote_info):
+                result.rejected[path] = local_info
+
+    def _fetch_newer_changes(
+        self, metadata: Metadata, changes: MetadataChanges
+    ) -> MetadataChanges:
+        """
+        Collect changes committed past the local sequence number. The head may
+        lag behind, so entries are read until the first missing one.
+        """
+        remote_changes: MetadataChanges = {}
+        while True:
+            with self.client:
+                entry = self._find(self._log_entry_name(self.sequence + 1))
+            if not entry:
+                break
+            remote_changes.update(json.loads(entry.value)["changes"])
+            self.sequence += 1
+        if remote_changes or self.head() <= self.sequence:
+            return remote_changes
+
+        # log tail was compacted away, diff the latest state with local one,
+        # paths changed locally can't be told apart and are kept
+        remote: Metadata = {}
+        self._load_snapshot(remote)
+        if not self._replay(remote, self.head()):
+            raise RuntimeError("Metadata journal was compacted while merging.")
+        return {
+            path: remote.get(path)
+            for path in metadata.keys() | remote.keys()
+            if path not in changes and metadata.get(path) != remote.get(path)
+        }
+
+    def _advance_head(self, sequence: int) -> None:
+        with self.client:
+            if not self._head_stored:
+                try:
+                    self._head_stored = self._create(
+                        self._head_name, dr.KeyValueType.NUMERIC, sequence
+                    )
+                    return
+                except dr.errors.ClientError as e:
+                    if e.status_code != 409:
+                        raise
+                    self._head_stored = self._find(self._head_name)
+            else:
+                self._head_stored.refresh()
+            # never move the head back behind a faster writer
+            if self._head_stored and self._head_stored.numeric_value < sequence:
+                self._head_stored.update(value=sequence)
+
+    def compact(self, metadata: Metadata) -> None:
+        """
+        Store `metadata` as a snapshot of the current sequence. Log entries
+        covered by the previous snapshot are removed, so readers lagging less
+        than one compaction interval can still replay the tail.
+        """
+        logger.debug("Compacting metadata journal.", extra={"sequence": self.sequence})
+        snapshot = json.dumps({"sequence": self.sequence, "metadata": metadata})
+        with self.client:
+            if self._is_compacted():
+                return
+            if self._snapshot_stored:
+                self._snapshot_stored.update(value=snapshot)
+            else:
+                try:
+                    self._snapshot_stored = self._create(
+                        self._snapshot_name, dr.KeyValueType.JSON, snapshot
+                    )
+                except dr.errors.ClientError as e:
+                    if e.status_code != 409:
+                        raise
+                    # another writer stored the first snapshot meanwhile
+                    if self._is_compacted():
+                        return
+                    assert self._snapshot_stored
+                    self._snapshot_stored.update(value=snapshot)
+
+            for entry in dr.KeyValue.list(
+                self.app_id, dr.KeyValueEntityType.CUSTOM_APPLICATION
+            ):
+                if not entry.name.startswith(self._log_prefix):
+                    continue
+                sequence = int(entry.name[len(self._log_prefix) :])
+                if sequence <= self._snapshot_sequence:
+                    entry.delete()
+        self._snapshot_sequence = self.sequence
+
+    def _is_compacted(self) -> bool:
+        """
+        Refresh the stored snapshot, return True if another writer compacted the
+        journal up to the local sequence already.
+        """
+        if self._snapshot_stored:
+            self._snapshot_stored.refresh()
+        else:
+            self._snapshot_stored = self._find(self._snapshot_name)
+        if not self._snapshot_stored:
+            return False
+        stored_sequence = int(json.loads(self._snapshot_stored.value)["sequence"])
+        if stored_sequence < self.sequence:
+            return False
+        self._snapshot_sequence = stored_sequence
+        return True
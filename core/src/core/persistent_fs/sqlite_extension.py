@@ -14,19 +14,51 @@
 import asyncio
 import os
 import sqlite3
+import threading
+from dataclasses import dataclass, field
 from typing import Any, Callable, cast
 
 import aiosqlite
 from typing_extensions import Self
 
-from core.persistent_fs.dr_file_system import DRFileSystem, calculate_checksum
+from core.persistent_fs.change_detection import FileChangeDetector
+from core.persistent_fs.dr_file_system import DRFileSystem, get_dr_file_system
 
 
 def _get_fs_entity() -> DRFileSystem | None:
-    return DRFileSystem() if os.environ.get("APPLICATION_ID") else None
+    return get_dr_file_system() if os.environ.get("APPLICATION_ID") else None
+
+
+@dataclass
+class _SharedDatabase:
+    """Local copy of a stored database, shared by its connections in the process."""
+
+    changes: FileChangeDetector
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    connections: int = 0  # open ones, the file is in use while there are any
+
+
+_shared_databases: dict[str, _SharedDatabase] = {}
+_shared_databases_lock = threading.Lock()
+
+
+def _shared_database(path: str) -> _SharedDatabase:
+    with _shared_databases_lock:
+        key = os.path.abspath(path)
+        if key not in _shared_databases:
+            _shared_databases[key] = _SharedDatabase(FileChangeDetector(path))
+        return _shared_databases[key]
 
 
 class AIOSqliteConnectionExtension(aiosqlite.Connection):
+    """
+    aiosqlite connection to a database file kept in persistent storage. The
+    file is downloaded before the first connection opens and uploaded when a
+    connection closes with changes, both off the event loop. Connections to
+    the same path share the local copy, which is downloaded again only if the
+    stored database changed meanwhile.
+    """
+
     def __init__(
         self,
         connector: Callable[[], sqlite3.Connection],
@@ -36,38 +68,71 @@ class AIOSqliteConnectionExtension(aiosqlite.Connection):
     ):
         super().__init__(connector, iter_chunk_size, loop)
         self._database_path = database_path
-        self._checksum = b""
         self._fs_entity = _get_fs_entity()
+        self._shared: _SharedDatabase | None = None
+        if self._fs_entity and database_path and database_path != ":memory:":
+            self._shared = _shared_database(database_path)
 
     def _preload_file(self) -> None:
-        if not self._fs_entity:
-            return
-        if not self._database_path or self._database_path == ":memory:":
+        if not self._fs_entity or not self._shared or not self._database_path:
             return
+        with self._shared.lock:
+            if not self._shared.connections:
+                # loaded by the first of the open connections
+                self._download_stored_file()
+            # counted only once loaded, a failed download is retried by the next
+            self._shared.connections += 1
+
+    def _download_stored_file(self) -> None:
+        assert self._fs_entity and self._shared and self._database_path
         if not self._fs_entity.exists(self._database_path):
             return
+        changes = self._shared.changes
+        checksum = self._fs_entity.info(self._database_path).get("checksum")
+        if (
+            checksum
+            and changes.checksum == bytes.fromhex(checksum)
+            and not changes.changed()
+        ):
+            return  # local copy is still the stored database
 
         self._fs_entity.get(
             self._database_path, self._database_path
         )  # get file with the same name from persistent storage
 
-        self._checksum = calculate_checksum(self._database_path)
+        changes.remember_stored(self._fs_entity, self._database_path)
+
+    def _persist_file(self) -> None:
+        if not self._fs_entity or not self._shared or not self._database_path:
+            return
+        with self._shared.lock:
+            self._shared.connections -= 1
+            if not self._shared.changes.changed():
+                return
+            self._fs_entity.put(self._database_path, self._database_path)
+            self._shared.changes.remember_stored(self._fs_entity, self._database_path)
 
     async def _connect(self) -> Self:
-        self._preload_file()
-        return await super()._connect()  # type: ignore[return-value]
+        # metadata refresh, download and hashing block, keep them off the loop
+        preloaded = False
+        try:
+            await asyncio.to_thread(self._preload_file)
+            preloaded = True
+            return await super()._connect()  # type: ignore[return-value]
+        except BaseException:
+            if not preloaded:
+                # the worker thread was started already, it would never stop
+                self._stop_running()  # type: ignore[no-untyped-call]
+            elif self._shared:
+                with self._shared.lock:
+                    self._shared.connections -= 1
+            raise
 
     async def close(self) -> None:
+        connected = self._connection is not None
         await super().close()
-        if not self._fs_entity:
-            return
-        if not self._database_path or self._database_path == ":memory:":
-            return
-        new_checksum = calculate_checksum(self._database_path)
-        if new_checksum == self._checksum:
-            return
-        self._fs_entity.put(self._database_path, self._database_path)
-        self._checksum = new_checksum
+        if connected:
+            await asyncio.to_thread(self._persist_file)
 
 
 def connect_dr_fs(  # type: ignore[no-untyped-def]
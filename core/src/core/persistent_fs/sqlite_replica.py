@@ -0,0 +1,66 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sqlite3
+
+from core.persistent_fs.chunked_replica import ChunkedFileReplica
+from core.persistent_fs.dr_file_system import DRFileSystem
+
+# multiple of SQLite page size, so a changed page touches a single chunk
+SQLITE_CHUNK_SIZE = int(os.environ.get("DR_FS_SQLITE_CHUNK_SIZE", 4 * 1024**2))
+# seconds a WAL checkpoint waits for readers still using the log
+WAL_CHECKPOINT_TIMEOUT = float(os.environ.get("DR_FS_WAL_CHECKPOINT_TIMEOUT", 5))
+
+
+class SQLiteReplica(ChunkedFileReplica):
+    """
+    Copy of a SQLite database file in DRFileSystem, replicated by chunks.
+
+    Databases in WAL mode are checkpointed before each sync, so the file holds
+    every committed transaction and no stale log frames shadow restored pages.
+    An empty log needs no checkpoint. A non-empty one is truncated, which waits
+    for readers of the log, so callers with open connections checkpoint while
+    no transaction is active, see `checkpoint`.
+    Connections kept open across a restore which changed the file must be
+    reopened, WAL mode doesn't notice the file was replaced under their cache.
+    """
+
+    def __init__(
+        self,
+        fs: DRFileSystem,
+        db_path: str,
+        local_path: str | None = None,
+        chunk_size: int = SQLITE_CHUNK_SIZE,
+    ) -> None:
+        super().__init__(fs, db_path, local_path, chunk_size)
+
+    def log_pending(self) -> bool:
+        # no WAL in rollback journal mode, an empty one after a truncation
+        wal_path = f"{self.local_path}-wal"
+        return os.path.exists(wal_path) and os.path.getsize(wal_path) > 0
+
+    def _checkpoint(self) -> None:
+        """Move committed frames from the WAL of the local file to the file."""
+        connection = sqlite3.connect(self.local_path, timeout=WAL_CHECKPOINT_TIMEOUT)
+        try:
+            busy, log_frames, checkpointed = connection.execute(
+                "PRAGMA wal_checkpoint(TRUNCATE)"
+            ).fetchone()
+        finally:
+            connection.close()
+        if busy or log_frames != checkpointed:
+            raise RuntimeError(
+                f"WAL checkpoint of {self.local_path} is incomplete, "
+                "a connection is still using the log."
+            )
@@ -0,0 +1,295 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import atexit
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_MAX_BYTES = int(
+    os.environ.get("DR_FS_WRITE_BEHIND_MAX_BYTES", 256 * 1024**2)
+)
+STAGING_DIR = os.environ.get(
+    "DR_FS_STAGING_DIR", os.path.join(tempfile.gettempdir(), "dr_fs_staging")
+)
+UPLOAD_ATTEMPTS = 3
+UPLOAD_RETRY_DELAY = 1.0  # seconds, doubled after each failed attempt
+
+
+@dataclass
+class StagedUpload:
+    virtual_path: str
+    local_path: str
+    size: int
+    staged_at: float
+
+    @property
+    def manifest_path(self) -> str:
+        return f"{self.local_path}.json"
+
+
+class UploadQueue:
+    """
+    Write-behind queue of files waiting for upload to the catalog.
+
+    Closed files are staged in a per-process directory together with a small
+    manifest and uploaded by a background worker, so a restarted app picks up
+    uploads its dead predecessors didn't finish. Only the latest write of each
+    path is uploaded; `pending` exposes it to readers until it's registered.
+    Writers are blocked while staged bytes exceed `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        upload: Callable[[StagedUpload], None],
+        staging_dir: str | None = None,
+        max_bytes: int = WRITE_BEHIND_MAX_BYTES,
+    ) -> None:
+        self._upload = upload
+        self.max_bytes = max_bytes
+        self.queued_bytes = 0
+        self.errors: list[Exception] = []
+
+        self._staging_root = staging_dir or STAGING_DIR
+        self._dir = os.path.join(self._staging_root, str(os.getpid()))
+        os.makedirs(self._dir, exist_ok=True)
+
+        self._queue: deque[StagedUpload] = deque()
+        self._pending: dict[str, StagedUpload] = {}  # latest write of each path
+        self._in_progress: StagedUpload | None = None
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self._worker = threading.Thread(
+            target=self._run, name="dr-fs-upload-queue", daemon=True
+        )
+        self._worker.start()
+        atexit.register(self.close)
+        self._recover()
+
+    def staging_path(self) -> str:
+        """Path for a new file that is going to be staged."""
+        return os.path.join(self._dir, str(uuid.uuid4()))
+
+    def enqueue(self, virtual_path: str, local_path: str, block: bool = True) -> None:
+        """
+        Stage the local file, which must be in the staging directory, for upload
+        as `virtual_path`. Unless `block` is False, wait for the queue to get under
+        the byte budget; writers holding resources the worker needs must not wait.
+        """
+        staged = StagedUpload(
+            virtual_path, local_path, os.path.getsize(local_path), time.time()
+        )
+        _write_manifest(staged)
+        with self._condition:
+            while (
+                block
+                and self.queued_bytes
+                and self.queued_bytes + staged.size > self.max_bytes
+            ):
+                self._condition.wait()
+            self._add(staged)
+        logger.debug(
+            "Queued file upload.",
+            extra={"virtual_path": virtual_path, "queued_bytes": self.queued_bytes},
+        )
+
+    def pending(self, virtual_path: str) -> StagedUpload | None:
+        with self._condition:
+            return self._pending.get(virtual_path)
+
+    def pending_children(self, parent: str) -> list[StagedUpload]:
+        with self._condition:
+            return [
+                staged
+                for path, staged in self._pending.items()
+                if path.rpartition("/")[0] == parent
+            ]
+
+    def cancel(self, virtual_path: str) -> None:
+        """Forget the pending write, e.g. because the path was overwritten or removed."""
+        with self._condition:
+            if self._pending.pop(virtual_path, None):
+                self._condition.notify_all()
+
+    def settle(self, staged: StagedUpload | None, virtual_path: str) -> bool:
+        """
+        Called when a write of `virtual_path` is being registered in metadata.
+        For an uploaded staged file return whether it's still the latest write
+        of the path, a direct write supersedes any pending one.
+        """
+        with self._condition:
+            if staged is None or self._pending.get(virtual_path) is staged:
+                self._pending.pop(virtual_path, None)
+                self._condition.notify_all()
+                return True
+            return False
+
+    def flush(self, paths: Iterable[str] | None = None) -> None:
+        """
+        Wait until the pending writes of `paths`, or all queued writes, are
+        uploaded. Raise the first upload error since the last flush.
+        """
+        self.wait(paths)
+        with self._condition:
+            errors, self.errors = self.errors, []
+        if errors:
+            raise errors[0]
+
+    def wait(self, paths: Iterable[str] | None = None) -> None:
+        """Like `flush`, but upload errors are left for the next flush."""
+        watched = set(paths) if paths is not None else None
+
+        def done() -> bool:
+            if watched is None:
+                return not self._queue and not self._in_progress
+            return not watched & self._pending.keys()
+
+        with self._condition:
+            self._condition.wait_for(done)
+
+    def close(self) -> None:
+        """Upload all queued files and stop the worker."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+
+    def _add(self, staged: StagedUpload) -> None:
+        self._queue.append(staged)
+        self._pending[staged.virtual_path] = staged
+        self.queued_bytes += staged.size
+        self._condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                staged = self._in_progress = self._queue.popleft()
+                superseded = self._pending.get(staged.virtual_path) is not staged
+            try:
+                if not superseded:
+                    self._upload_with_retries(staged)
+                _remove_staged(staged)
+            except Exception as e:
+                # staged files are kept, the upload is retried after restart
+                logger.exception(
+                    "Failed to upload queued file.",
+                    extra={"virtual_path": staged.virtual_path},
+                )
+                with self._condition:
+                    self.errors.append(e)
+                    if self._pending.get(staged.virtual_path) is staged:
+                        del self._pending[staged.virtual_path]
+            finally:
+                with self._condition:
+                    self._in_progress = None
+                    self.queued_bytes -= staged.size
+                    self._condition.notify_all()
+
+    def _upload_with_retries(self, staged: StagedUpload) -> None:
+        delay = UPLOAD_RETRY_DELAY
+        for attempt in range(1, UPLOAD_ATTEMPTS + 1):
+            try:
+                self._upload(staged)
+                return
+            except Exception:
+                if attempt == UPLOAD_ATTEMPTS:
+                    raise
+                logger.warning(
+                    "Queued upload failed, retrying.",
+                    extra={"virtual_path": staged.virtual_path, "attempt": attempt},
+                )
+                time.sleep(delay)
+                delay *= 2
+
+    def _recover(self) -> None:
+        """Take over staged files of processes which are not running anymore."""
+        recovered: list[StagedUpload] = []
+        for name in os.listdir(self._staging_root):
+            directory = os.path.join(self._staging_root, name)
+            if not name.isdigit() or directory == self._dir or _is_running(int(name)):
+                continue
+            for manifest in os.listdir(directory):
+                if not manifest.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(directory, manifest)) as f:
+                        staged = StagedUpload(**json.load(f))
+                    local_path = os.path.join(
+                        self._dir, os.path.basename(staged.local_path)
+                    )
+                    shutil.move(staged.local_path, local_path)
+                    os.remove(staged.manifest_path)
+                except (OSError, ValueError, TypeError):
+                    logger.warning(
+                        "Skipping unreadable staged upload.",
+                        extra={"manifest": manifest},
+                        exc_info=True,
+                    )
+                    continue
+                staged.local_path = local_path
+                _write_manifest(staged)
+                recovered.append(staged)
+            shutil.rmtree(directory, ignore_errors=True)
+
+        if recovered:
+            logger.info("Recovered staged uploads.", extra={"uploads": len(recovered)})
+        with self._condition:
+            for staged in sorted(recovered, key=lambda s: s.staged_at):
+                self._add(staged)
+
+
+def _write_manifest(staged: StagedUpload) -> None:
+    """Make the staged file durable, the manifest is replaced atomically."""
+    with open(staged.local_path, "rb") as f:
+        os.fsync(f.fileno())
+    partial_path = f"{staged.manifest_path}.part"
+    with open(partial_path, "w") as f:
+        json.dump(asdict(staged), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial_path, staged.manifest_path)
+
+
+def _remove_staged(staged: StagedUpload) -> None:
+    for path in [staged.manifest_path, staged.local_path]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -12,21 +12,41 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import asyncio
+import bisect
 import threading
+import time
+from collections import deque
 from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
 from typing import AsyncIterator, Iterator
 
+# upper bounds of lock wait histogram buckets, in seconds
+LOCK_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
 
-class AbstractReadWriteLock:
-    @contextmanager
-    def read_lock(self) -> Iterator[None]:
-        raise NotImplementedError()
-        yield  # fixing typecheck
 
-    @contextmanager
-    def write_lock(self) -> Iterator[None]:
-        raise NotImplementedError()
-        yield  # fixing typecheck
+@dataclass
+class WaitHistogram:
+    """Counts of lock waits by duration, the last bucket has no upper bound."""
+
+    bounds: tuple[float, ...] = LOCK_WAIT_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    total_seconds: float = 0.0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.bounds) + 1)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total_seconds += seconds
+
+
+class AbstractAsyncReadWriteLock:
+    """RW lock interface for coroutines."""
 
     @asynccontextmanager
     async def async_read_lock(self) -> AsyncIterator[None]:
@@ -39,6 +59,20 @@ class AbstractReadWriteLock:
         yield  # fixing typecheck
 
 
+class AbstractReadWriteLock(AbstractAsyncReadWriteLock):
+    """RW lock interface for both threads and coroutines."""
+
+    @contextmanager
+    def read_lock(self) -> Iterator[None]:
+        raise NotImplementedError()
+        yield  # fixing typecheck
+
+    @contextmanager
+    def write_lock(self) -> Iterator[None]:
+        raise NotImplementedError()
+        yield  # fixing typecheck
+
+
 class ThreadReadWriteLock(AbstractReadWriteLock):
     """
     Thread RW Lock. Should allow to have multiple read operations, but write operation block all others.
@@ -136,3 +170,85 @@ class MockReadWriteLock(AbstractReadWriteLock):
     @asynccontextmanager
     async def async_write_lock(self) -> AsyncIterator[None]:
         yield
+
+
+class AsyncReadWriteLock(AbstractAsyncReadWriteLock):
+    """
+    Asyncio RW lock without thread hops, for coroutines of a single event loop.
+    Waiters are served in arrival order: consecutive readers share the lock,
+    a writer waits for the readers before it and holds back the ones after it,
+    so neither readers nor writers starve. Waits are recorded to histograms.
+    """
+
+    def __init__(self) -> None:
+        self._readers = 0
+        self._writer = False
+        self._waiters: deque[tuple[bool, asyncio.Future[None]]] = deque()
+        self.read_waits = WaitHistogram()
+        self.write_waits = WaitHistogram()
+
+    def _can_acquire(self, write: bool) -> bool:
+        return not self._writer and not (write and self._readers)
+
+    def _take(self, write: bool) -> None:
+        if write:
+            self._writer = True
+        else:
+            self._readers += 1
+
+    def _release(self, write: bool) -> None:
+        if write:
+            self._writer = False
+        else:
+            self._readers -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        # the lock is handed over before the waiter runs, so no one can cut in
+        while self._waiters:
+            write, future = self._waiters[0]
+            if future.done():  # cancelled
+                self._waiters.popleft()
+                continue
+            if not self._can_acquire(write):
+                return
+            self._waiters.popleft()
+            self._take(write)
+            future.set_result(None)
+            if write:
+                return
+
+    async def _acquire(self, write: bool) -> None:
+        started = time.monotonic()
+        if not self._waiters and self._can_acquire(write):
+            self._take(write)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append((write, future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release(write)  # granted meanwhile
+                else:
+                    # a writer leaving the queue may unblock readers behind it
+                    self._wake_waiters()
+                raise
+        waits = self.write_waits if write else self.read_waits
+        waits.observe(time.monotonic() - started)
+
+    @asynccontextmanager
+    async def async_read_lock(self) -> AsyncIterator[None]:
+        await self._acquire(write=False)
+        try:
+            yield
+        finally:
+            self._release(write=False)
+
+    @asynccontextmanager
+    async def async_write_lock(self) -> AsyncIterator[None]:
+        await self._acquire(write=True)
+        try:
+            yield
+        finally:
+            self._release(write=True)
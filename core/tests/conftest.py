@@ -0,0 +1,208 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import uuid
+from collections import Counter
+from types import TracebackType
+from typing import Any, Iterator
+
+import datarobot as dr
+import pytest
+import requests
+
+from core.persistent_fs import local_cache
+from core.persistent_fs.dr_file_system import DRFileSystem
+
+
+class FakeKeyValueStorage:
+    """In-memory replacement of DataRobot KeyValue API."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, dict[str, Any]] = {}
+        self.calls: Counter[str] = Counter()
+
+
+class FakeKeyValue:
+    storage = FakeKeyValueStorage()
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.value: Any = None
+        self.numeric_value: float = 0.0
+        self.refresh()
+
+    @classmethod
+    def find(
+        cls, entity_id: str, entity_type: dr.KeyValueEntityType, name: str
+    ) -> "FakeKeyValue | None":
+        cls.storage.calls["find"] += 1
+        if name not in cls.storage.data:
+            return None
+        return cls(name)
+
+    @classmethod
+    def list(
+        cls, entity_id: str, entity_type: dr.KeyValueEntityType
+    ) -> list["FakeKeyValue"]:
+        cls.storage.calls["list"] += 1
+        return [cls(name) for name in cls.storage.data]
+
+    @classmethod
+    def create(
+        cls,
+        entity_id: str,
+        entity_type: dr.KeyValueEntityType,
+        name: str,
+        category: dr.KeyValueCategory,
+        value_type: dr.KeyValueType,
+        value: Any = None,
+    ) -> "FakeKeyValue":
+        cls.storage.calls["create"] += 1
+        if name in cls.storage.data:
+            raise dr.errors.ClientError(f"{name} already exists", 409)
+        cls.storage.data[name] = {"value_type": value_type}
+        cls._store(name, value_type, value)
+        return cls(name)
+
+    @classmethod
+    def _store(cls, name: str, value_type: dr.KeyValueType, value: Any) -> None:
+        if value_type == dr.KeyValueType.NUMERIC:
+            cls.storage.data[name]["numeric_value"] = value
+        else:
+            cls.storage.data[name]["value"] = value
+
+    def refresh(self) -> None:
+        data = self.storage.data[self.name]
+        self.value = data.get("value")
+        self.numeric_value = data.get("numeric_value", 0.0)
+
+    def update(self, value: Any = None) -> None:
+        self.storage.calls["update"] += 1
+        self._store(self.name, self.storage.data[self.name]["value_type"], value)
+        self.refresh()
+
+    def delete(self) -> None:
+        self.storage.calls["delete"] += 1
+        self.storage.data.pop(self.name, None)
+
+
+class FakeResponse:
+    def __init__(
+        self,
+        content: bytes = b"",
+        data: Any = None,
+        status_code: int = 200,
+        fail_after: int | None = None,
+    ) -> None:
+        self.content = content
+        self.status_code = status_code
+        self._data = data
+        self._fail_after = fail_after
+
+    def __enter__(self) -> "FakeResponse":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def json(self) -> Any:
+        return self._data
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        content = self.content
+        if self._fail_after is not None:
+            content = content[: self._fail_after]
+        for i in range(0, len(content), chunk_size):
+            yield content[i : i + chunk_size]
+        if self._fail_after is not None:
+            raise requests.exceptions.ChunkedEncodingError("Connection broken")
+
+
+class FakeClient:
+    """In-memory replacement of DataRobot file catalog REST API."""
+
+    def __init__(self) -> None:
+        self.files: dict[str, bytes] = {}
+        self.calls: Counter[str] = Counter()
+        self.requested_ranges: list[str] = []
+        self.interrupt_downloads_after: list[int] = []  # bytes sent before failure
+
+    def __enter__(self) -> "FakeClient":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        pass
+
+    def get(
+        self, url: str, headers: dict[str, str] | None = None, **kwargs: Any
+    ) -> FakeResponse:
+        self.calls["get"] += 1
+        content = self.files[url.split("/")[1]]
+        fail_after = (
+            self.interrupt_downloads_after.pop(0)
+            if self.interrupt_downloads_after
+            else None
+        )
+        byte_range = (headers or {}).get("Range")
+        if not byte_range:
+            return FakeResponse(content=content, fail_after=fail_after)
+        self.requested_ranges.append(byte_range)
+        start, end = byte_range.removeprefix("bytes=").split("-")
+        if int(start) >= len(content):
+            raise dr.errors.ClientError("Requested range not satisfiable", 416)
+        content = content[int(start) : int(end) + 1 if end else None]
+        return FakeResponse(content=content, status_code=206, fail_after=fail_after)
+
+    def post(self, url: str, files: dict[str, Any], **kwargs: Any) -> FakeResponse:
+        self.calls["post"] += 1
+        _, file = files["file"]
+        catalog_id = uuid.uuid4().hex
+        self.files[catalog_id] = file.read()
+        return FakeResponse(data={"catalogId": catalog_id})
+
+    def delete(self, url: str, **kwargs: Any) -> FakeResponse:
+        self.calls["delete"] += 1
+        if not self.files.pop(url.split("/")[1], None):
+            raise dr.errors.ClientError("Not found", 404)
+        return FakeResponse()
+
+
+@pytest.fixture
+def key_value_storage(monkeypatch: pytest.MonkeyPatch) -> FakeKeyValueStorage:
+    storage = FakeKeyValueStorage()
+    monkeypatch.setattr(FakeKeyValue, "storage", storage)
+    monkeypatch.setattr(dr, "KeyValue", FakeKeyValue)
+    return storage
+
+
+@pytest.fixture
+def dr_client() -> FakeClient:
+    return FakeClient()
+
+
+@pytest.fixture
+def dr_fs(
+    monkeypatch: pytest.MonkeyPatch,
+    key_value_storage: FakeKeyValueStorage,
+    dr_client: FakeClient,
+) -> Iterator[DRFileSystem]:
+    monkeypatch.setenv("APPLICATION_ID", "app-id")
+    monkeypatch.setattr(local_cache, "_local_cache", local_cache.LocalFileCache())
+    DRFileSystem.clear_instance_cache()
+    yield DRFileSystem(dr_client)
+    DRFileSystem.clear_instance_cache()
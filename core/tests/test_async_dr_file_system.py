@@ -0,0 +1,185 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import ssl
+import uuid
+from pathlib import Path
+
+import certifi
+import httpx
+import pytest
+from conftest import FakeClient
+
+from core.persistent_fs.async_dr_file_system import AsyncDRFileSystem, _ssl_verify
+from core.persistent_fs.dr_file_system import DRFileSystem
+from core.persistent_fs.local_cache import LocalFileCache
+
+
+def _catalog_transport(dr_client: FakeClient) -> httpx.MockTransport:
+    """Serve the fake catalog over HTTP."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        dr_client.calls[f"async_{request.method.lower()}"] += 1
+        parts = request.url.path.strip("/").split("/")
+        if request.method == "POST":
+            catalog_id = uuid.uuid4().hex
+            request.read()
+            # multipart body, content is between the part headers and boundary
+            body = request.content.split(b"\r\n\r\n", 2)[2]
+            dr_client.files[catalog_id] = body.rsplit(b"\r\n--", 2)[0]
+            return httpx.Response(201, json={"catalogId": catalog_id})
+        content = dr_client.files[parts[-2]]
+        byte_range = request.headers.get("Range")
+        if not byte_range:
+            return httpx.Response(200, content=content)
+        dr_client.requested_ranges.append(byte_range)
+        start, end = byte_range.removeprefix("bytes=").split("-")
+        if int(start) >= len(content):
+            return httpx.Response(416)
+        return httpx.Response(
+            206, content=content[int(start) : int(end) + 1 if end else None]
+        )
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture
+def async_dr_fs(dr_fs: DRFileSystem, dr_client: FakeClient) -> AsyncDRFileSystem:
+    dr_client.endpoint = "https://app.datarobot.com/api/v2"  # type: ignore[attr-defined]
+    dr_client.headers = {"Authorization": "Bearer token"}  # type: ignore[attr-defined]
+    dr_client.verify = True  # type: ignore[attr-defined]
+    dr_client.trust_env = False  # type: ignore[attr-defined]
+    return AsyncDRFileSystem(dr_fs, transport=_catalog_transport(dr_client))
+
+
+def test_async_operations_share_metadata_and_cache(
+    async_dr_fs: AsyncDRFileSystem, dr_fs: DRFileSystem, dr_client: FakeClient
+) -> None:
+    async def scenario() -> None:
+        await async_dr_fs._makedirs("uploads/user", exist_ok=True)
+        await async_dr_fs._pipe_file("uploads/user/doc.txt", b"content")
+        assert await async_dr_fs._exists("uploads/user/doc.txt")
+        assert await async_dr_fs._ls("uploads/user", detail=False) == [
+            "uploads/user/doc.txt"
+        ]
+        assert await async_dr_fs._cat_file("uploads/user/doc.txt") == b"content"
+
+        # metadata is shared with the sync file system
+        with dr_fs.open("uploads/user/doc.txt", "rb") as f:
+            assert f.read() == b"content"
+
+        await async_dr_fs._pipe_file("uploads/user/doc.txt", b"replaced")
+        await async_dr_fs._rm_file("uploads/user/doc.txt")
+        assert not await async_dr_fs._exists("uploads/user/doc.txt")
+        await async_dr_fs.close_session()
+
+    asyncio.run(scenario())
+    assert dr_client.calls["async_post"] == 2
+    assert dr_client.calls["delete"] == 2
+    assert not dr_client.calls["get"] and not dr_client.calls["async_get"]
+    assert not dr_client.files
+
+
+def test_async_downloads(
+    async_dr_fs: AsyncDRFileSystem,
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    tmp_path: Path,
+) -> None:
+    content = bytes(range(256)) * 4
+    with dr_fs.open("doc.bin", "wb") as f:
+        f.write(content)
+    dr_fs._cache = LocalFileCache()
+
+    async def scenario() -> None:
+        assert await async_dr_fs._cat_file("doc.bin", start=-4) == content[-4:]
+        assert dr_fs._cache.stats.size == 0
+
+        results = await asyncio.gather(
+            *[async_dr_fs._cat_file("doc.bin") for _ in range(4)]
+        )
+        assert results == [content] * 4
+        await async_dr_fs._get_file("doc.bin", str(tmp_path / "out" / "doc.bin"))
+        await async_dr_fs.close_session()
+
+    asyncio.run(scenario())
+    # concurrent readers wait for a single download
+    assert dr_client.calls["async_get"] == 2
+    assert dr_client.requested_ranges == ["bytes=1020-1023"]
+    assert (tmp_path / "out" / "doc.bin").read_bytes() == content
+
+
+def test_async_put_file_copies_source(
+    async_dr_fs: AsyncDRFileSystem,
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    tmp_path: Path,
+) -> None:
+    source = tmp_path / "doc.bin"
+    source.write_bytes(b"original")
+
+    async def scenario() -> None:
+        await async_dr_fs._put_file(str(source), "doc.bin")
+        source.write_bytes(b"CHANGED!")
+        assert await async_dr_fs._cat_file("doc.bin") == b"original"
+        dr_fs._cache = LocalFileCache()
+        assert await async_dr_fs._cat_file("doc.bin") == b"original"
+        # download locks are dropped once the download finishes
+        assert not async_dr_fs._download_locks
+        await async_dr_fs.close_session()
+
+    asyncio.run(scenario())
+    assert list(dr_client.files.values()) == [b"original"]
+
+
+def test_async_download_finishes_complete_partial_file(
+    async_dr_fs: AsyncDRFileSystem, dr_fs: DRFileSystem, dr_client: FakeClient
+) -> None:
+    with dr_fs.open("doc.bin", "wb") as f:
+        f.write(b"content")
+    catalog_id = dr_fs.info("doc.bin")["catalog_id"]
+    partial_path = Path(dr_fs._temp_dir) / f"{catalog_id}.async.part"
+    # partial file of a concurrent download by the sync file system
+    sync_partial_path = Path(dr_fs._temp_dir) / f"{catalog_id}.part"
+    sync_partial_path.write_bytes(b"cont")
+
+    async def scenario() -> None:
+        for leftover in [b"content", b"stale content"]:
+            dr_fs._cache = LocalFileCache()
+            partial_path.write_bytes(leftover)
+            assert await async_dr_fs._cat_file("doc.bin") == b"content"
+        await async_dr_fs.close_session()
+
+    asyncio.run(scenario())
+    assert dr_client.requested_ranges == ["bytes=7-", "bytes=13-"]
+    assert sync_partial_path.read_bytes() == b"cont"
+
+
+def test_async_client_uses_ssl_settings_of_dr_client(
+    async_dr_fs: AsyncDRFileSystem,
+    dr_client: FakeClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    dr_client.verify = False  # type: ignore[attr-defined]
+    assert _ssl_verify(dr_client) is False  # type: ignore[arg-type]
+
+    dr_client.verify = certifi.where()  # type: ignore[attr-defined]
+    assert isinstance(_ssl_verify(dr_client), ssl.SSLContext)  # type: ignore[arg-type]
+
+    # like requests, CA bundles are taken from the environment if trusted
+    dr_client.verify = True  # type: ignore[attr-defined]
+    monkeypatch.setenv("REQUESTS_CA_BUNDLE", certifi.where())
+    assert _ssl_verify(dr_client) is True  # type: ignore[arg-type]
+    dr_client.trust_env = True  # type: ignore[attr-defined]
+    assert isinstance(_ssl_verify(dr_client), ssl.SSLContext)  # type: ignore[arg-type]
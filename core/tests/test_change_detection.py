@@ -0,0 +1,76 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from core.persistent_fs import change_detection
+from core.persistent_fs.change_detection import FileChangeDetector
+from core.persistent_fs.dr_file_system import calculate_checksum
+
+
+@pytest.fixture(autouse=True)
+def no_racy_window(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(change_detection, "RACY_WINDOW_NS", 0)
+
+
+def _execute(db_path: Path, statement: str) -> None:
+    connection = sqlite3.connect(db_path)
+    with connection:
+        connection.execute(statement)
+    connection.close()
+
+
+def test_sqlite_change_counter_avoids_hashing(tmp_path: Path) -> None:
+    db_path = tmp_path / "db.sqlite"
+    _execute(db_path, "create table t (id integer)")
+    changes = FileChangeDetector(str(db_path))
+    changes.remember()
+
+    assert not changes.changed()
+    os.utime(db_path)  # touched only
+    assert not changes.changed()
+    _execute(db_path, "insert into t values (1)")
+    assert changes.changed()
+    assert changes.stats.hashed_checks == 0
+
+
+def test_same_sized_rewrite_falls_back_to_checksum(tmp_path: Path) -> None:
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"first")
+    changes = FileChangeDetector(str(path))
+    changes.remember(calculate_checksum(str(path)))
+
+    os.utime(path, ns=(0, 0))
+    assert not changes.changed()
+    path.write_bytes(b"other")
+    assert changes.changed()
+    assert changes.stats.hashed_checks == 2
+
+    # without a known checksum inconclusive files are reported as changed
+    changes.remember()
+    os.utime(path, ns=(0, 0))
+    assert changes.changed()
+    assert changes.stats.hashed_checks == 2
+
+
+def test_missing_file(tmp_path: Path) -> None:
+    path = tmp_path / "data.bin"
+    changes = FileChangeDetector(str(path))
+    changes.remember()
+    assert not changes.changed()
+    path.write_bytes(b"content")
+    assert changes.changed()
@@ -0,0 +1,612 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+from conftest import FakeClient, FakeKeyValueStorage
+
+from core.persistent_fs import dr_file_system, upload_queue
+from core.persistent_fs.dr_file_system import DRFileSystem
+from core.persistent_fs.local_cache import LocalFileCache
+from core.persistent_fs.metadata_journal import (
+    METADATA_HEAD_STORAGE_NAME,
+    METADATA_LOG_STORAGE_PREFIX,
+    METADATA_SNAPSHOT_STORAGE_NAME,
+    METADATA_STORAGE_NAME,
+    MetadataConflictError,
+    shard_journal_name,
+)
+
+
+def _new_instance(dr_client: FakeClient) -> DRFileSystem:
+    return DRFileSystem(dr_client, skip_instance_cache=True)
+
+
+def test_write_and_read_file(dr_fs: DRFileSystem) -> None:
+    dr_fs.mkdir("uploads/user")
+    with dr_fs.open("uploads/user/doc.txt", "wb") as f:
+        f.write(b"content")
+
+    assert dr_fs.ls("uploads", detail=False) == ["uploads/user"]
+    assert dr_fs.ls("uploads/user", detail=False) == ["uploads/user/doc.txt"]
+    with dr_fs.open("uploads/user/doc.txt", "rb") as f:
+        assert f.read() == b"content"
+
+    dr_fs.rm_file("uploads/user/doc.txt")
+    assert not dr_fs.exists("uploads/user/doc.txt")
+
+
+def test_commit_stores_only_changed_nodes(
+    dr_fs: DRFileSystem, key_value_storage: FakeKeyValueStorage
+) -> None:
+    dr_fs.mkdir("uploads/user")
+    with dr_fs.open("uploads/user/doc.txt", "wb") as f:
+        f.write(b"content")
+
+    head = key_value_storage.data[METADATA_HEAD_STORAGE_NAME]["numeric_value"]
+    assert head == 2
+    last_entry = json.loads(
+        key_value_storage.data[f"{METADATA_LOG_STORAGE_PREFIX}2"]["value"]
+    )
+    assert list(last_entry["changes"]) == ["uploads/user/doc.txt"]
+
+
+def test_other_instance_replays_log_tail(
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    key_value_storage: FakeKeyValueStorage,
+) -> None:
+    dr_fs.mkdir("uploads")
+    reader = _new_instance(dr_client)
+    assert reader.exists("uploads")
+
+    dr_fs.mkdir("uploads/user")
+    finds_before = key_value_storage.calls["find"]
+    assert reader.ls("uploads", detail=False) == ["uploads/user"]
+    # head is refreshed in place, only the new log entry is fetched
+    assert key_value_storage.calls["find"] - finds_before == 1
+
+
+def test_compaction_writes_snapshot(
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    key_value_storage: FakeKeyValueStorage,
+) -> None:
+    dr_fs._journal.compaction_interval = 3
+    for i in range(7):
+        dr_fs.mkdir(f"dir_{i}")
+
+    snapshot = json.loads(
+        key_value_storage.data[METADATA_SNAPSHOT_STORAGE_NAME]["value"]
+    )
+    assert snapshot["sequence"] == 6
+    log_entries = sorted(
+        name
+        for name in key_value_storage.data
+        if name.startswith(METADATA_LOG_STORAGE_PREFIX)
+    )
+    # entries covered by previous snapshot are removed
+    assert log_entries == [f"{METADATA_LOG_STORAGE_PREFIX}{i}" for i in range(4, 8)]
+
+    reader = _new_instance(dr_client)
+    assert reader.ls("", detail=False) == [f"dir_{i}" for i in range(7)]
+
+
+def test_compaction_by_other_replica(
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    key_value_storage: FakeKeyValueStorage,
+) -> None:
+    replica = _new_instance(dr_client)
+    assert replica.ls("", detail=False) == []
+    dr_fs._journal.compaction_interval = replica._journal.compaction_interval = 3
+    for i in range(3):
+        dr_fs.mkdir(f"dir_{i}")
+
+    # replica has not loaded the snapshot stored meanwhile
+    replica.mkdir("from_replica")
+    replica.mkdir("from_replica/sub")
+    replica.mkdir("from_replica/sub/deeper")
+    assert not replica._pending_changes
+    snapshot = json.loads(
+        key_value_storage.data[METADATA_SNAPSHOT_STORAGE_NAME]["value"]
+    )
+    assert snapshot["sequence"] == 4
+    assert _new_instance(dr_client).exists("from_replica/sub/deeper")
+
+
+def test_lagging_writer_does_not_reuse_compacted_entries(
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    key_value_storage: FakeKeyValueStorage,
+) -> None:
+    writer = _new_instance(dr_client)
+    writer.mkdir("from_writer")
+    writer._metadata_ttl = 60.0
+    dr_fs._journal.compaction_interval = 3
+    for i in range(7):
+        dr_fs.mkdir(f"dir_{i}")
+    assert f"{METADATA_LOG_STORAGE_PREFIX}2" not in key_value_storage.data
+
+    writer.mkdir("from_a")
+    assert f"{METADATA_LOG_STORAGE_PREFIX}2" not in key_value_storage.data
+    assert key_value_storage.data[METADATA_HEAD_STORAGE_NAME]["numeric_value"] == 9
+    assert _new_instance(dr_client).exists("from_a")
+    assert writer.exists("dir_6")
+
+
+def test_legacy_metadata_is_migrated(
+    dr_fs: DRFileSystem, key_value_storage: FakeKeyValueStorage
+) -> None:
+    key_value_storage.data[METADATA_STORAGE_NAME] = {
+        "value_type": "json",
+        "value": json.dumps(
+            {"uploads": {"type": "directory", "name": "uploads", "modified_at": 1.0}}
+        ),
+    }
+    assert dr_fs.isdir("uploads")
+    dr_fs.mkdir("uploads/user")
+    assert key_value_storage.data[METADATA_HEAD_STORAGE_NAME]["numeric_value"] == 1
+
+
+def test_shards_are_loaded_lazily(
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    key_value_storage: FakeKeyValueStorage,
+) -> None:
+    writer = DRFileSystem(dr_client, metadata_shard_depth=1, skip_instance_cache=True)
+    for owner in ["a", "b"]:
+        writer.mkdir(f"{owner}/docs")
+        with writer.open(f"{owner}/docs/doc.txt", "wb") as f:
+            f.write(b"content")
+    # shard nodes are stored only in the shard journal
+    head = key_value_storage.data[METADATA_HEAD_STORAGE_NAME]["numeric_value"]
+    assert head == 2
+    assert f"{shard_journal_name('a')}_head" in key_value_storage.data
+    # files of different shards don't share catalog items
+    assert len(dr_client.files) == 2
+
+    reader = DRFileSystem(dr_client, metadata_shard_depth=1, skip_instance_cache=True)
+    assert reader.ls("", detail=False) == ["a", "b"]
+    assert reader.metadata_stats.shard_loads == 1
+    assert reader.ls("a/docs", detail=False) == ["a/docs/doc.txt"]
+    assert reader.metadata_stats.shard_loads == 2
+    assert set(reader._shards) == {"", "a"}
+
+    reader.cp_file("a/docs/doc.txt", "b/docs/copy.txt")
+    writer.rm_file("a/docs/doc.txt")
+    with reader.open("b/docs/copy.txt", "rb") as f:
+        assert f.read() == b"content"
+
+
+def test_unsharded_metadata_is_moved_to_shards(
+    dr_fs: DRFileSystem, dr_client: FakeClient
+) -> None:
+    dr_fs.mkdir("a/docs")
+    with dr_fs.open("a/docs/doc.txt", "wb") as f:
+        f.write(b"content")
+
+    sharded = DRFileSystem(dr_client, metadata_shard_depth=1, skip_instance_cache=True)
+    assert sharded.ls("a/docs", detail=False) == ["a/docs/doc.txt"]
+    assert sorted(sharded._shards[""]) == ["a"]
+
+    reader = DRFileSystem(dr_client, metadata_shard_depth=1, skip_instance_cache=True)
+    with reader.open("a/docs/doc.txt", "rb") as f:
+        assert f.read() == b"content"
+    assert sorted(reader._shards["a"]) == ["a/docs", "a/docs/doc.txt"]
+
+
+def test_directory_index(dr_fs: DRFileSystem) -> None:
+    dr_fs.mkdir("uploads/user")
+    dr_fs.mkdir("uploads_backup")
+    with dr_fs.open("uploads/user/doc.txt", "wb") as f:
+        f.write(b"content")
+
+    # sibling sharing the prefix is not a child
+    assert dr_fs.ls("uploads", detail=False) == ["uploads/user"]
+    assert dr_fs.ls("", detail=False) == ["uploads", "uploads_backup"]
+    assert dr_fs.isdir("uploads/user")
+    assert dr_fs.isfile("uploads/user/doc.txt")
+    assert dr_fs.info("")["type"] == "directory"
+
+    with pytest.raises(ValueError, match="not empty"):
+        dr_fs.rmdir("uploads/user")
+    dr_fs.rm_file("uploads/user/doc.txt")
+    dr_fs.rmdir("uploads/user")
+    assert dr_fs.ls("uploads", detail=False) == []
+
+
+def test_directory_index_rebuilt_on_refresh(
+    dr_fs: DRFileSystem, dr_client: FakeClient
+) -> None:
+    reader = _new_instance(dr_client)
+    assert reader.ls("", detail=False) == []
+
+    dr_fs.mkdir("uploads/user")
+    assert reader.ls("uploads", detail=False) == ["uploads/user"]
+
+
+def test_batch_pins_metadata_and_commits_once(
+    dr_fs: DRFileSystem, key_value_storage: FakeKeyValueStorage
+) -> None:
+    with dr_fs.batch() as fs:
+        fs.mkdir("uploads/user")
+        fs.mkdir("uploads/other")
+        assert fs.exists("uploads/user")
+
+    assert dr_fs.metadata_stats.remote_checks == 1
+    assert dr_fs.metadata_stats.avoided_checks == 3
+    assert key_value_storage.data[METADATA_HEAD_STORAGE_NAME]["numeric_value"] == 1
+
+
+def test_metadata_ttl(
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(dr_fs, "_metadata_ttl", 60.0)
+    dr_fs.mkdir("uploads")
+    assert dr_fs.exists("uploads")
+    assert dr_fs.metadata_stats.remote_checks == 1
+    assert dr_fs.metadata_stats.avoided_checks == 1
+
+    # changes of other instances are not visible until TTL expires
+    _new_instance(dr_client).mkdir("other")
+    assert not dr_fs.exists("other")
+    monkeypatch.setattr(dr_fs, "_metadata_ttl", 0.0)
+    assert dr_fs.exists("other")
+
+
+def test_download_resumes_after_interruption(
+    dr_fs: DRFileSystem, dr_client: FakeClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(dr_file_system, "DOWNLOAD_CHUNK_SIZE", 4)
+    content = bytes(range(256)) * 4
+    with dr_fs.open("doc.bin", "wb") as f:
+        f.write(content)
+    # forget local copy made by upload
+    dr_fs._cache = LocalFileCache()
+
+    dr_client.interrupt_downloads_after = [100, 200]
+    with dr_fs.open("doc.bin", "rb") as f:
+        assert f.read() == content
+    assert dr_client.requested_ranges == ["bytes=100-", "bytes=300-"]
+
+
+def test_download_finishes_complete_partial_file(
+    dr_fs: DRFileSystem, dr_client: FakeClient
+) -> None:
+    with dr_fs.open("doc.bin", "wb") as f:
+        f.write(b"content")
+    catalog_id = dr_fs.info("doc.bin")["catalog_id"]
+    partial_path = Path(dr_fs._temp_dir) / f"{catalog_id}.part"
+
+    for leftover in [b"content", b"stale content"]:
+        dr_fs._cache = LocalFileCache()
+        partial_path.write_bytes(leftover)
+        assert dr_fs.cat_file("doc.bin") == b"content"
+    assert dr_client.requested_ranges == ["bytes=7-", "bytes=13-"]
+    assert not dr_fs._download_locks
+
+
+def test_lazy_open_fetches_requested_ranges(
+    dr_fs: DRFileSystem, dr_client: FakeClient
+) -> None:
+    content = b"%PDF-1.7" + b"0" * 10_000 + b"trailer"
+    with dr_fs.open("doc.pdf", "wb") as f:
+        f.write(content)
+    dr_fs._cache = LocalFileCache()
+
+    with dr_fs.open("doc.pdf", "rb", lazy=True, block_size=16) as f:
+        f.seek(-7, 2)
+        assert f.read() == b"trailer"
+    assert dr_fs.cat_file("doc.pdf", start=0, end=8) == b"%PDF-1.7"
+    assert dr_client.calls["get"] == len(dr_client.requested_ranges) == 2
+    assert dr_fs._cache.stats.size == 0
+
+
+def test_local_cache_is_shared_and_bounded(
+    dr_fs: DRFileSystem, dr_client: FakeClient
+) -> None:
+    dr_fs._cache.max_bytes = 20
+    for name in ["a", "b", "c"]:
+        with dr_fs.open(name, "wb") as f:
+            f.write(name.encode() * 10)
+    stats = dr_fs._cache.stats
+    assert (stats.size, stats.evictions) == (20, 1)
+
+    reader = _new_instance(dr_client)
+    with reader.open("c", "rb") as f:
+        assert f.read() == b"cccccccccc"
+        # open file is pinned and survives eviction
+        with reader.open("a", "rb"), reader.open("b", "rb"):
+            pass
+        assert dr_fs._cache.contains(reader.info("c")["catalog_id"])
+    assert dr_client.calls["get"] == 2
+    assert (stats.hits, stats.misses, stats.evictions) == (1, 2, 3)
+    assert stats.size == 20
+
+
+def test_local_cache_links_only_owned_files(tmp_path: Path) -> None:
+    cache = LocalFileCache()
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"original")
+    copied = cache.add("copied", str(source), mode="copy")
+    linked = cache.add("linked", str(source), mode="link")
+
+    source.write_bytes(b"CHANGED!")
+    assert Path(copied).read_bytes() == b"original"
+    assert os.path.samefile(linked, source)
+    cache.add("moved", str(source))
+    assert not source.exists()
+
+
+def test_local_path_lends_cached_copy(
+    dr_fs: DRFileSystem, dr_client: FakeClient
+) -> None:
+    with dr_fs.open("doc.pdf", "wb") as f:
+        f.write(b"content")
+    dr_fs._cache = LocalFileCache(max_bytes=0)
+
+    with dr_fs.local_path("doc.pdf") as local_path:
+        assert Path(local_path).read_bytes() == b"content"
+        # pinned copy isn't evicted while in use
+        assert dr_fs._cache.contains(dr_fs.info("doc.pdf")["catalog_id"])
+    assert not os.path.exists(local_path)
+    assert dr_client.calls["get"] == 1
+
+    dr_fs.mkdir("docs")
+    with pytest.raises(ValueError), dr_fs.local_path("docs"):
+        pass
+
+
+def test_shared_file_system_is_thread_safe(
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(dr_file_system, "_shared_file_system", None)
+    monkeypatch.setattr(
+        dr_file_system, "DRFileSystem", lambda **kwargs: _new_instance(dr_client)
+    )
+    shared = dr_file_system.get_dr_file_system()
+    shared.mkdir("uploads")
+
+    def upload(i: int) -> DRFileSystem:
+        fs = dr_file_system.get_dr_file_system()
+        with fs.open(f"uploads/{i}.txt", "wb") as f:
+            f.write(str(i).encode())
+        return fs
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        instances = set(executor.map(upload, range(32)))
+
+    assert instances == {shared}
+    assert len(shared.ls("uploads")) == 32
+    assert len(_new_instance(dr_client).ls("uploads")) == 32
+
+
+def test_bulk_operations_commit_metadata_once(
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    key_value_storage: FakeKeyValueStorage,
+    tmp_path: Path,
+) -> None:
+    dr_fs.mkdir("uploads")
+    local_files = {}
+    for i in range(10):
+        local_file = tmp_path / f"{i}.txt"
+        local_file.write_text(str(i))
+        local_files[str(local_file)] = f"uploads/{i}.txt"
+
+    dr_fs.put_many(local_files, max_workers=4)
+    assert key_value_storage.data[METADATA_HEAD_STORAGE_NAME]["numeric_value"] == 2
+    assert len(dr_fs.ls("uploads")) == 10
+    # local files are kept, and later edits don't reach the cached copies
+    assert all(Path(lpath).exists() for lpath in local_files)
+    Path(next(iter(local_files))).write_text("changed")
+    assert dr_fs.cat_file("uploads/0.txt") == b"0"
+
+    downloads = {rpath: str(tmp_path / "out" / rpath) for rpath in local_files.values()}
+    _new_instance(dr_client).get_many(downloads, max_workers=4)
+    assert Path(downloads["uploads/3.txt"]).read_text() == "3"
+
+    dr_fs.rm_many(["uploads", *local_files.values()])
+    assert key_value_storage.data[METADATA_HEAD_STORAGE_NAME]["numeric_value"] == 3
+    assert not dr_fs.exists("uploads")
+    assert not dr_client.files
+
+
+def test_identical_content_is_stored_once(
+    dr_fs: DRFileSystem, dr_client: FakeClient
+) -> None:
+    dr_fs.mkdir("uploads")
+    for name in ["a.txt", "b.txt"]:
+        with dr_fs.open(f"uploads/{name}", "wb") as f:
+            f.write(b"content")
+    dr_fs.cp_file("uploads/a.txt", "uploads/c.txt")
+    assert dr_client.calls["post"] == 1
+    assert len(dr_client.files) == 1
+
+    reader = _new_instance(dr_client)
+    with reader.open("uploads/c.txt", "rb") as f:
+        assert f.read() == b"content"
+
+    # catalog item is removed with the last referencing file
+    reader.rm_file("uploads/a.txt")
+    with reader.open("uploads/b.txt", "wb") as f:
+        f.write(b"other")
+    assert len(dr_client.files) == 2
+    dr_fs.rm_many(["uploads/c.txt"])
+    assert len(dr_client.files) == 1
+
+
+@pytest.fixture
+def staging_dir(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    monkeypatch.setattr(upload_queue, "STAGING_DIR", str(tmp_path / "staging"))
+    return tmp_path / "staging"
+
+
+def test_write_behind_reads_own_writes(
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    monkeypatch: pytest.MonkeyPatch,
+    staging_dir: Path,
+) -> None:
+    dr_fs.mkdir("uploads")
+    writer = DRFileSystem(dr_client, write_behind=True, skip_instance_cache=True)
+    upload_started, upload_allowed = threading.Event(), threading.Event()
+    post = dr_client.post
+
+    def blocked_post(*args: Any, **kwargs: Any) -> Any:
+        upload_started.set()
+        upload_allowed.wait()
+        return post(*args, **kwargs)
+
+    monkeypatch.setattr(dr_client, "post", blocked_post)
+    for name in ["a.txt", "b.txt"]:
+        with writer.open(f"uploads/{name}", "wb") as f:
+            f.write(name.encode())
+
+    assert writer.ls("uploads", detail=False) == ["uploads/a.txt", "uploads/b.txt"]
+    with writer.open("uploads/b.txt", "rb") as f:
+        assert f.read() == b"b.txt"
+    upload_started.wait()
+    writer.rm_file("uploads/a.txt")
+    assert not dr_fs.exists("uploads/b.txt")
+
+    upload_allowed.set()
+    writer.flush()
+    # removed file was already being uploaded, its catalog item is dropped
+    assert dr_client.calls["post"] == 2
+    assert len(dr_client.files) == 1
+    assert dr_fs.ls("uploads", detail=False) == ["uploads/b.txt"]
+    assert not list((staging_dir / str(os.getpid())).iterdir())
+    writer.drain()
+
+
+def test_write_behind_copy_within_batch(
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    key_value_storage: FakeKeyValueStorage,
+    staging_dir: Path,
+) -> None:
+    writer = DRFileSystem(dr_client, write_behind=True, skip_instance_cache=True)
+    with writer.batch():
+        with writer.open("doc.txt", "wb") as f:
+            f.write(b"content")
+        # the worker waits for the batch, so the upload is still queued
+        writer.cp_file("doc.txt", "copy.txt")
+    writer.flush()
+
+    for name, entry in key_value_storage.data.items():
+        if name.startswith(METADATA_LOG_STORAGE_PREFIX):
+            assert "local_path" not in entry["value"]
+    reader = _new_instance(dr_client)
+    assert reader.cat_file("copy.txt") == reader.cat_file("doc.txt") == b"content"
+    writer.drain()
+
+
+def test_write_behind_get_many_within_batch(
+    dr_fs: DRFileSystem, dr_client: FakeClient, tmp_path: Path, staging_dir: Path
+) -> None:
+    with dr_fs.open("stored.txt", "wb") as f:
+        f.write(b"stored")
+    writer = DRFileSystem(dr_client, write_behind=True, skip_instance_cache=True)
+    with writer.batch():
+        with writer.open("doc.txt", "wb") as f:
+            f.write(b"content")
+        # the queued upload is read from its staged file
+        writer.get_many(
+            {
+                "doc.txt": str(tmp_path / "out" / "doc.txt"),
+                "stored.txt": str(tmp_path / "out" / "stored.txt"),
+            }
+        )
+        assert dr_client.calls["post"] == 1  # of the stored file only
+    assert (tmp_path / "out" / "doc.txt").read_bytes() == b"content"
+    assert (tmp_path / "out" / "stored.txt").read_bytes() == b"stored"
+    writer.drain()
+
+
+def test_write_behind_recovers_staged_uploads(
+    dr_fs: DRFileSystem, dr_client: FakeClient, staging_dir: Path
+) -> None:
+    dead_process_dir = staging_dir / "999999999"
+    dead_process_dir.mkdir(parents=True)
+    staged_file = dead_process_dir / "staged"
+    staged_file.write_bytes(b"content")
+    (dead_process_dir / "staged.json").write_text(
+        json.dumps(
+            {
+                "virtual_path": "doc.txt",
+                "local_path": str(staged_file),
+                "size": 7,
+                "staged_at": 1.0,
+            }
+        )
+    )
+
+    writer = DRFileSystem(dr_client, write_behind=True, skip_instance_cache=True)
+    writer.drain()
+    assert not dead_process_dir.exists()
+    with dr_fs.open("doc.txt", "rb") as f:
+        assert f.read() == b"content"
+
+
+def test_concurrent_commits_are_merged(
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    key_value_storage: FakeKeyValueStorage,
+) -> None:
+    dr_fs.mkdir("uploads")
+    replica = _new_instance(dr_client)
+    assert replica.exists("uploads")
+    # both replicas work with the same stale metadata
+    dr_fs._metadata_ttl = replica._metadata_ttl = 60.0
+
+    dr_fs.mkdir("uploads/a")
+    replica.mkdir("uploads/b")
+    replica.mkdir("uploads/a")  # already created by the other replica
+    assert replica.ls("uploads", detail=False) == ["uploads/a", "uploads/b"]
+    assert key_value_storage.data[METADATA_HEAD_STORAGE_NAME]["numeric_value"] == 3
+    assert _new_instance(dr_client).ls("uploads", detail=False) == [
+        "uploads/a",
+        "uploads/b",
+    ]
+
+
+def test_conflicting_commit_is_rejected(
+    dr_fs: DRFileSystem, dr_client: FakeClient
+) -> None:
+    replica = _new_instance(dr_client)
+    assert not replica.exists("doc.txt")
+    replica._metadata_ttl = 60.0
+
+    with dr_fs.open("doc.txt", "wb") as f:
+        f.write(b"first")
+    with pytest.raises(MetadataConflictError) as error:
+        with replica.open("doc.txt", "wb") as f:
+            f.write(b"second")
+
+    assert error.value.paths == ["doc.txt"]
+    with replica.open("doc.txt", "rb") as f:
+        assert f.read() == b"first"
+    # catalog item of the rejected write is removed
+    assert list(dr_client.files.values()) == [b"first"]
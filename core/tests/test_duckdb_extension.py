@@ -0,0 +1,69 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from core.persistent_fs import duckdb_extension
+from core.persistent_fs.dr_file_system import DRFileSystem
+from core.persistent_fs.duckdb_extension import connect_dr_fs, register_dr_fs
+
+
+@pytest.fixture(autouse=True)
+def use_dr_fs(
+    dr_fs: DRFileSystem, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(duckdb_extension, "_get_fs_entity", lambda: dr_fs)
+    monkeypatch.setattr(duckdb_extension, "DUCKDB_CHUNK_SIZE", 256 * 1024)
+    monkeypatch.chdir(tmp_path)
+
+
+def test_only_changed_blocks_are_transferred(tmp_path: Path) -> None:
+    con = connect_dr_fs("analytics.duckdb")
+    con.execute(
+        "create table events as "
+        "select range id, md5(range::varchar) payload from range(300000)"
+    )
+    con.execute("create table totals (id integer, total integer)")
+    con.close()
+    assert con._replica
+    uploaded = con._replica.stats.uploaded_chunks
+    assert uploaded > 20
+
+    con = connect_dr_fs("analytics.duckdb")
+    assert con._replica and con._replica.stats.downloaded_chunks == 0
+    con.execute("insert into totals values (1, 2)")
+    con.close()
+    assert con._replica.stats.uploaded_chunks <= uploaded // 4
+
+    (tmp_path / "analytics.duckdb").unlink()
+    con = connect_dr_fs("analytics.duckdb", read_only=True)
+    assert con.execute("select count(*) from events").fetchone() == (300000,)
+    assert con.execute("select * from totals").fetchall() == [(1, 2)]
+    con.close()
+
+
+def test_partitioned_parquet_dataset() -> None:
+    con = duckdb.connect()
+    assert register_dr_fs(con)
+    con.execute(
+        "copy (select range id, range % 3 part from range(300)) "
+        "to 'dr://dataset' (format parquet, partition_by (part))"
+    )
+    assert con.execute(
+        "select count(*) from read_parquet("
+        "'dr://dataset/*/*.parquet', hive_partitioning = true) where part = 1"
+    ).fetchone() == (100,)
+    con.close()
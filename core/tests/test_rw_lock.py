@@ -11,10 +11,20 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
 import threading
 import time
+from contextlib import AbstractAsyncContextManager
 
-from core.utils.rw_lock import AbstractReadWriteLock, MockReadWriteLock, ThreadReadWriteLock
+import pytest
+
+from core.utils.rw_lock import (
+    AbstractReadWriteLock,
+    AsyncReadWriteLock,
+    MockReadWriteLock,
+    ThreadReadWriteLock,
+    WaitHistogram,
+)
 
 
 def thread_read_process(
@@ -102,3 +112,72 @@ def test_mock_read_write_lock() -> None:
     ]
 
     assert expected_result == result
+
+
+def test_async_read_write_lock() -> None:
+    result: list[str] = []
+    lock = AsyncReadWriteLock()
+
+    async def read(text: str, sleep_time: float) -> None:
+        async with lock.async_read_lock():
+            await asyncio.sleep(sleep_time)
+            result.append(text)
+
+    async def write(text: str, sleep_time: float) -> None:
+        async with lock.async_write_lock():
+            await asyncio.sleep(sleep_time)
+            result.append(text)
+
+    async def scenario() -> None:
+        tasks = [
+            asyncio.create_task(read("read_2", 0.04)),
+            asyncio.create_task(read("read_1", 0.03)),
+        ]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(write("write_1", 0.03)))
+        await asyncio.sleep(0.01)
+        # waiters are served in order, the reader doesn't cut in before the writer
+        tasks.append(asyncio.create_task(read("read_3", 0.01)))
+        tasks.append(asyncio.create_task(write("write_2", 0.01)))
+        tasks.append(asyncio.create_task(read("read_4", 0.01)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert result == ["read_1", "read_2", "write_1", "read_3", "write_2", "read_4"]
+    assert lock.write_waits.count == 2
+    assert lock.read_waits.count == 4
+    # the first writer waited for the readers
+    assert lock.write_waits.total_seconds >= 0.03
+
+
+def test_async_read_write_lock_cancelled_waiter() -> None:
+    lock = AsyncReadWriteLock()
+
+    async def scenario() -> None:
+        async with lock.async_read_lock():
+            writer = asyncio.create_task(_hold(lock.async_write_lock()))
+            await asyncio.sleep(0)
+            reader = asyncio.create_task(_hold(lock.async_read_lock()))
+            await asyncio.sleep(0)
+            writer.cancel()
+            # reader queued behind the cancelled writer gets the lock
+            await asyncio.wait_for(reader, timeout=1)
+            with pytest.raises(asyncio.CancelledError):
+                await writer
+        async with lock.async_write_lock():
+            pass
+
+    asyncio.run(scenario())
+
+
+async def _hold(lock_context: AbstractAsyncContextManager[None]) -> None:
+    async with lock_context:
+        await asyncio.sleep(0)
+
+
+def test_wait_histogram_custom_bounds() -> None:
+    histogram = WaitHistogram(bounds=(0.1, 1.0))
+    for seconds in [0.05, 0.5, 5.0, 50.0]:
+        histogram.observe(seconds)
+    assert histogram.counts == [1, 1, 2]
+    assert not hasattr(AsyncReadWriteLock(), "read_lock")
@@ -0,0 +1,104 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+from pathlib import Path
+
+import pytest
+from conftest import FakeClient
+
+from core.persistent_fs import sqlite_extension
+from core.persistent_fs.dr_file_system import DRFileSystem
+from core.persistent_fs.sqlite_extension import connect_dr_fs
+
+
+@pytest.fixture(autouse=True)
+def use_dr_fs(
+    dr_fs: DRFileSystem, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(sqlite_extension, "_get_fs_entity", lambda: dr_fs)
+    monkeypatch.setattr(sqlite_extension, "_shared_databases", {})
+    monkeypatch.chdir(tmp_path)
+
+
+def test_connections_share_the_preloaded_file(
+    dr_fs: DRFileSystem,
+    dr_client: FakeClient,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    async def write() -> None:
+        async with connect_dr_fs("app.db") as connection:
+            await connection.execute("create table t (id integer)")
+            await connection.execute("insert into t values (1)")
+            await connection.commit()
+
+    async def count_rows() -> int:
+        async with connect_dr_fs("app.db") as connection:
+            async with connection.execute("select count(*) from t") as cursor:
+                row = await cursor.fetchone()
+                assert row
+                return int(row[0])
+
+    asyncio.run(write())
+    assert dr_fs.exists("app.db")
+    posts = dr_client.calls["post"]
+
+    (tmp_path / "app.db").unlink()
+    downloads: list[str] = []
+    get = dr_fs.get
+
+    def counting_get(rpath: str, lpath: str) -> None:
+        downloads.append(rpath)
+        get(rpath, lpath)
+
+    monkeypatch.setattr(dr_fs, "get", counting_get)
+
+    async def read_concurrently() -> list[int]:
+        return await asyncio.gather(*(count_rows() for _ in range(5)))
+
+    assert asyncio.run(read_concurrently()) == [1] * 5
+    # the first connection downloads the file, the others reuse it
+    assert downloads == ["app.db"]
+    assert asyncio.run(count_rows()) == 1
+    assert downloads == ["app.db"]
+    # reads don't upload the file back
+    assert dr_client.calls["post"] == posts
+
+
+def test_failed_preload_is_retried(
+    dr_fs: DRFileSystem, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    async def write() -> None:
+        async with connect_dr_fs("app.db") as connection:
+            await connection.execute("create table t (id integer)")
+            await connection.commit()
+
+    asyncio.run(write())
+    (tmp_path / "app.db").unlink()
+    get = dr_fs.get
+
+    def failing_get(rpath: str, lpath: str) -> None:
+        raise ConnectionError("Network is unreachable")
+
+    monkeypatch.setattr(dr_fs, "get", failing_get)
+
+    async def connect() -> None:
+        async with connect_dr_fs("app.db"):
+            pass
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(connect())
+    monkeypatch.setattr(dr_fs, "get", get)
+    asyncio.run(connect())
+    assert (tmp_path / "app.db").stat().st_size > 0
@@ -0,0 +1,103 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sqlite3
+from pathlib import Path
+
+from conftest import FakeClient
+
+from core.persistent_fs.dr_file_system import DRFileSystem
+from core.persistent_fs.sqlite_replica import SQLiteReplica
+
+CHUNK_SIZE = 16 * 1024
+
+
+def _write_rows(db_path: Path, rows: range) -> None:
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("create table if not exists t (id integer, value text)")
+        connection.executemany(
+            "insert into t values (?, ?)", [(i, "x" * 500) for i in rows]
+        )
+    connection.close()
+
+
+def _count_rows(db_path: Path) -> int:
+    with sqlite3.connect(db_path) as connection:
+        count: int = connection.execute("select count(*) from t").fetchone()[0]
+    connection.close()
+    return count
+
+
+def test_only_changed_chunks_are_transferred(
+    dr_fs: DRFileSystem, dr_client: FakeClient, tmp_path: Path
+) -> None:
+    writer_path = tmp_path / "writer.db"
+    _write_rows(writer_path, range(1000))
+    writer = SQLiteReplica(dr_fs, "app.db", str(writer_path), chunk_size=CHUNK_SIZE)
+    assert writer.persist()
+    assert not writer.persist()
+    chunks = writer.stats.uploaded_chunks
+    assert chunks > 10
+
+    reader_path = tmp_path / "reader.db"
+    reader = SQLiteReplica(dr_fs, "app.db", str(reader_path), chunk_size=CHUNK_SIZE)
+    assert reader.restore()
+    assert _count_rows(reader_path) == 1000
+    assert not reader.restore()
+
+    _write_rows(writer_path, range(1000, 1010))
+    posts_before = dr_client.calls["post"]
+    assert writer.persist()
+    assert writer.stats.uploaded_chunks - chunks <= 3
+    # changed chunks and the manifest
+    assert dr_client.calls["post"] - posts_before <= 4
+
+    assert reader.restore()
+    assert reader.stats.downloaded_chunks - chunks <= 3
+    assert _count_rows(reader_path) == 1010
+    assert reader_path.read_bytes() == writer_path.read_bytes()
+
+
+def test_whole_file_database_is_migrated(dr_fs: DRFileSystem, tmp_path: Path) -> None:
+    db_path = tmp_path / "app.db"
+    _write_rows(db_path, range(10))
+    dr_fs.put_file(str(db_path), "app.db")
+    db_path.unlink()
+
+    replica = SQLiteReplica(dr_fs, "app.db", str(db_path), chunk_size=CHUNK_SIZE)
+    assert replica.restore()
+    assert _count_rows(db_path) == 10
+    assert replica.persist()
+    assert not dr_fs.exists("app.db")
+
+    restored_path = tmp_path / "restored.db"
+    restored = SQLiteReplica(dr_fs, "app.db", str(restored_path))
+    assert restored.restore()
+    assert _count_rows(restored_path) == 10
+
+
+def test_wal_database_is_checkpointed(dr_fs: DRFileSystem, tmp_path: Path) -> None:
+    db_path = tmp_path / "app.db"
+    connection = sqlite3.connect(db_path)
+    connection.execute("pragma journal_mode=wal")
+    with connection:
+        connection.execute("create table t (id integer, value text)")
+        connection.execute("insert into t values (1, 'x')")
+    # the open connection keeps the commits in the log
+    assert Path(f"{db_path}-wal").stat().st_size > 0
+
+    assert SQLiteReplica(dr_fs, "app.db", str(db_path)).persist()
+    connection.close()
+    restored_path = tmp_path / "restored.db"
+    assert SQLiteReplica(dr_fs, "app.db", str(restored_path)).restore()
+    assert _count_rows(restored_path) == 1
@@ -18,6 +18,7 @@ from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import AsyncGenerator
 
+from core.persistent_fs.async_dr_file_system import close_async_file_system
 from core.telemetry import configure_uvicorn_logging, init_logging
 from datarobot_asgi_middleware import DataRobotASGIMiddleware
 from fastapi import APIRouter, FastAPI, Request
@@ -119,6 +120,7 @@ def create_app(
         async with create_deps(config, deps) as dependencies:
             app.state.deps = dependencies
             yield
+        await close_async_file_system()
 
     app = FastAPI(title=title, lifespan=lifespan)
 
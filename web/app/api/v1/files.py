@@ -13,7 +13,9 @@
 # limitations under the License.
 import asyncio
 import logging
+import os
 import pathlib
+import tempfile
 import uuid as uuidpkg
 from enum import Enum
 from typing import Any
@@ -24,7 +26,7 @@ from aiogoogle.auth.creds import UserCreds
 from aiogoogle.client import Aiogoogle
 from box_sdk_gen import BoxClient, BoxDeveloperTokenAuth
 from box_sdk_gen.schemas import Items as BoxItems
-from core.persistent_fs.dr_file_system import get_file_system
+from core.persistent_fs.async_dr_file_system import get_async_file_system
 from datarobot.auth.oauth import OAuthToken
 from datarobot.auth.session import AuthCtx
 from datarobot.auth.typing import Metadata
@@ -732,18 +734,14 @@ async def upload_drive_files(
                         user_uuid
                     )
 
-                fs = get_file_system()
+                fs = get_async_file_system()
                 # Ensure directory exists
-                try:
-                    fs.mkdir(str(file_dir), create_parents=True)
-                except FileExistsError:
-                    pass
+                await fs._makedirs(str(file_dir), exist_ok=True)
 
                 file_path = str(file_dir / filename)
 
                 # Save the file
-                with fs.open(file_path, "wb") as buffer:
-                    buffer.write(file_content)
+                await fs._pipe_file(file_path, file_content)
 
                 # Create file record in database
                 source = "google_drive"
@@ -854,12 +852,9 @@ async def upload_box_files(
         # Use user's UUID for standalone files
         file_dir = pathlib.Path(request.app.state.deps.upload_path) / str(user_uuid)
 
-    fs = get_file_system()
+    fs = get_async_file_system()
     # Ensure directory exists
-    try:
-        fs.mkdir(str(file_dir), create_parents=True)
-    except FileExistsError:
-        pass
+    await fs._makedirs(str(file_dir), exist_ok=True)
 
     results: list[FileSchema | dict[str, Any]] = []
 
@@ -896,14 +891,28 @@ async def upload_box_files(
                 None, get_box_file_stream, box_client, file_id
             )
 
-            # Stream to disk
-            total_bytes = 0
-            with fs.open(file_path, "wb") as buffer:
-                for chunk in file_stream:
-                    if isinstance(chunk, str):
-                        chunk = chunk.encode("utf-8")
-                    buffer.write(chunk)
-                    total_bytes += len(chunk)
+            def stage_box_file_stream(file_stream: Any) -> tuple[str, int]:
+                """Stream Box file to a local temp file (Box SDK is synchronous)"""
+                total_bytes = 0
+                with tempfile.NamedTemporaryFile(delete=False) as staged:
+                    try:
+                        for chunk in file_stream:
+                            if isinstance(chunk, str):
+                                chunk = chunk.encode("utf-8")
+                            staged.write(chunk)
+                            total_bytes += len(chunk)
+                    except BaseException:
+                        os.remove(staged.name)
+                        raise
+                return staged.name, total_bytes
+
+            staged_path, total_bytes = await asyncio.get_running_loop().run_in_executor(
+                None, stage_box_file_stream, file_stream
+            )
+            try:
+                await fs._put_file(staged_path, file_path)
+            finally:
+                await asyncio.to_thread(os.remove, staged_path)
 
             # Create file record in database
             file_data = FileCreate(
@@ -1067,18 +1076,14 @@ async def upload_local_files(
                     user_uuid
                 )
 
-            fs = get_file_system()
+            fs = get_async_file_system()
             # Ensure directory exists
-            try:
-                fs.mkdir(str(file_dir), create_parents=True)
-            except FileExistsError:
-                pass
+            await fs._makedirs(str(file_dir), exist_ok=True)
 
             file_path = str(file_dir / file.filename)
 
             # Save the file
-            with fs.open(file_path, "wb") as buffer:
-                buffer.write(contents)
+            await fs._pipe_file(file_path, contents)
 
             # Create file record in database
             file_data = FileCreate(
@@ -50,6 +50,12 @@ class Config(DataRobotAppFrameworkBaseSettings):
     test_user_email: str | None = None
 
     database_uri: str = "sqlite+aiosqlite:///.data/database.sqlite"
+    # writes to a SQLite database within this window are persisted together
+    database_persist_window_ms: int = 1000
+    # WAL, synchronous=NORMAL, memory map etc. for SQLite connections, see SQLitePragmas
+    database_sqlite_performance_profile: bool = True
+    # read sessions use the local SQLite file, refreshed from storage this often
+    database_refresh_interval_ms: int = 2000
 
     storage_path: str = ".data/storage"
 
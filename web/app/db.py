@@ -11,24 +11,77 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, cast
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator
 
 from core.persistent_fs.dr_file_system import (
     DRFileSystem,
     all_env_variables_present,
-    calculate_checksum,
+    get_dr_file_system,
 )
+from core.persistent_fs.sqlite_replica import SQLiteReplica
 from core.utils.rw_lock import (
-    AbstractReadWriteLock,
+    AbstractAsyncReadWriteLock,
+    AsyncReadWriteLock,
     MockReadWriteLock,
-    ThreadReadWriteLock,
+    WaitHistogram,
 )
 from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import UOWTransaction
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SQLitePragmas:
+    """Performance profile applied to each new SQLite connection."""
+
+    # readers don't block the writer and commits append to the log only
+    journal_mode: str = "WAL"
+    # in WAL mode NORMAL stays consistent, a power loss may drop last commits
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024**2  # bytes
+    cache_size: int = -64 * 1024  # negative values are KiB, i.e. 64 MiB
+    temp_store: str = "MEMORY"
+    busy_timeout: int = 5000  # ms
+
+    def statements(self, in_memory: bool = False) -> list[str]:
+        # in-memory databases can't use a WAL or a memory map
+        pragmas = {
+            "journal_mode": None if in_memory else self.journal_mode,
+            "synchronous": self.synchronous,
+            "mmap_size": None if in_memory else self.mmap_size,
+            "cache_size": self.cache_size,
+            "temp_store": self.temp_store,
+            "busy_timeout": self.busy_timeout,
+        }
+        return [
+            f"PRAGMA {name}={value}"
+            for name, value in pragmas.items()
+            if value is not None
+        ]
+
+
+def _apply_sqlite_pragmas(engine: AsyncEngine, pragmas: SQLitePragmas) -> None:
+    if "sqlite" not in engine.url.drivername:
+        return
+    statements = pragmas.statements(
+        in_memory=not engine.url.database or ":memory:" == engine.url.database
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
 
 def _prepare_persistence_storage(
     engine: AsyncEngine,
@@ -42,12 +95,28 @@ def _prepare_persistence_storage(
         return None, None
 
     file_path = engine.url.database
-    persistent_fs = DRFileSystem()
+    persistent_fs = get_dr_file_system()
     return persistent_fs, file_path
 
 
+@dataclass
+class PersistenceStats:
+    write_sessions: int = 0
+    persists: int = 0  # write sessions within a window are persisted together
+    failed_persists: int = 0
+    refreshes: int = 0  # stored changes applied to the local file
+    # seconds between the first unpersisted write and its persist
+    last_durability_lag: float = 0.0
+    max_durability_lag: float = 0.0
+
+
 class DBCtx:
-    def __init__(self, engine: AsyncEngine) -> None:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        persist_window_ms: int = 0,
+        refresh_interval_ms: int = 0,
+    ) -> None:
         self.engine = engine
 
         self._session = async_sessionmaker(
@@ -60,10 +129,31 @@ class DBCtx:
         self._persistence_fs: DRFileSystem | None
         self._db_path: str | None
         self._persistence_fs, self._db_path = _prepare_persistence_storage(engine)
+        # database is replicated by chunks, so syncs transfer only changed pages
+        self._replica: SQLiteReplica | None = None
+        if self._persistence_fs and self._db_path:
+            self._replica = SQLiteReplica(self._persistence_fs, self._db_path)
+        # write sessions are persisted together once the window since the first
+        # unpersisted one passes, 0 persists each of them before it returns
+        self._persist_window = persist_window_ms / 1000
+        self._dirty_since: float | None = None  # time.monotonic() of first write
+        self._persist_task: asyncio.Task[None] | None = None
+        self.persistence_stats = PersistenceStats()
+        # read sessions are served from the local file, which is refreshed from
+        # the stored database in the background each interval; 0 refreshes it
+        # before write sessions only
+        self._refresh_interval = refresh_interval_ms / 1000
+        self._refresh_task: asyncio.Task[None] | None = None
 
-        self._rw_lock: AbstractReadWriteLock = MockReadWriteLock()
+        # sessions of a persisted database share the local file, which changes
+        # under the file lock only when a refresh applies the stored changes;
+        # writers, refreshes and persists take turns under the writer lock, so
+        # readers never wait for them. Others rely on the database itself.
+        self._file_lock: AbstractAsyncReadWriteLock = MockReadWriteLock()
+        self._writer_lock: AbstractAsyncReadWriteLock = MockReadWriteLock()
         if self._persistence_fs:
-            self._lock = ThreadReadWriteLock()
+            self._file_lock = AsyncReadWriteLock()
+            self._writer_lock = AsyncReadWriteLock()  # only its write side is used
 
     @asynccontextmanager
     async def _read_session(self) -> AsyncGenerator[AsyncSession, None]:
@@ -75,33 +165,30 @@ class DBCtx:
                     "This session is read-only and cannot perform writes."
                 )
 
-        async with self._rw_lock.async_read_lock():
-            if self._persistence_fs and self._persistence_fs.exists(self._db_path):
-                self._persistence_fs.safe_get_file(
-                    cast(str, self._db_path), cast(str, self._db_path)
-                )
-
+        self._start_refreshing()
+        async with self._file_lock.async_read_lock():
             async with self._session() as session:
                 event.listen(session.sync_session, "before_flush", prevent_writes)
                 yield session
 
     @asynccontextmanager
     async def _write_session(self) -> AsyncGenerator[AsyncSession, None]:
-        async with self._rw_lock.async_write_lock():
-            checksum: bytes | None = None
-            if self._persistence_fs and self._persistence_fs.exists(self._db_path):
-                self._persistence_fs.safe_get_file(
-                    cast(str, self._db_path), cast(str, self._db_path)
-                )
-                checksum = calculate_checksum(cast(str, self._db_path))
+        self._start_refreshing()
+        async with self._writer_lock.async_write_lock():
+            await self._refresh()
 
-            async with self._session() as session:
-                yield session
+            async with self._file_lock.async_read_lock():
+                async with self._session() as session:
+                    yield session
 
-            if self._persistence_fs:
-                new_checksum = calculate_checksum(cast(str, self._db_path))
-                if new_checksum != checksum:
-                    self._persistence_fs.put_file(self._db_path, self._db_path)
+            if self._replica:
+                self.persistence_stats.write_sessions += 1
+                if self._dirty_since is None:
+                    self._dirty_since = time.monotonic()
+                if self._persist_window <= 0:
+                    await self._persist()
+                elif not self._persist_task:
+                    self._persist_task = asyncio.create_task(self._persist_later())
 
     @asynccontextmanager
     async def session(
@@ -111,22 +198,141 @@ class DBCtx:
         async with session_context() as session:
             yield session
 
+    async def _refresh(self) -> None:
+        """Apply changes of the stored database, the caller holds the writer lock."""
+        # unpersisted local writes are newer than the stored database
+        if not self._replica or self._dirty_since is not None:
+            return
+        await self._checkpoint()
+        # the download doesn't touch the local file, readers go on meanwhile
+        update = await asyncio.to_thread(self._replica.fetch)
+        if update is None:
+            return
+        async with self._file_lock.async_write_lock():
+            # pooled connections in WAL mode would keep pages of the replaced file
+            await self.engine.dispose()
+            await asyncio.to_thread(self._replica.apply, update)
+        self.persistence_stats.refreshes += 1
+        logger.debug("Refreshed database from persistent storage.")
+
+    async def _checkpoint(self) -> None:
+        """
+        Move the WAL to the local file, the caller holds the writer lock.
+        Truncating the WAL waits for readers, so they are kept out meanwhile.
+        """
+        assert self._replica
+        if not self._replica.log_pending():
+            return
+        async with self._file_lock.async_write_lock():
+            await asyncio.to_thread(self._replica.checkpoint)
+
+    def _start_refreshing(self) -> None:
+        if self._replica and self._refresh_interval > 0 and not self._refresh_task:
+            self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            try:
+                async with self._writer_lock.async_write_lock():
+                    await self._refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to refresh database, retrying.")
+            await asyncio.sleep(self._refresh_interval)
+
+    async def _persist(self) -> None:
+        """Persist pending writes, the caller holds the writer lock."""
+        if not self._replica or self._dirty_since is None:
+            return
+        try:
+            await self._checkpoint()
+            # the file holds every commit, readers don't change it meanwhile
+            await asyncio.to_thread(self._replica.persist)
+        except Exception:
+            self.persistence_stats.failed_persists += 1
+            raise
+        lag = time.monotonic() - self._dirty_since
+        self._dirty_since = None
+        self.persistence_stats.persists += 1
+        self.persistence_stats.last_durability_lag = lag
+        self.persistence_stats.max_durability_lag = max(
+            lag, self.persistence_stats.max_durability_lag
+        )
+        logger.debug("Persisted database.", extra={"durability_lag": lag})
+
+    async def _persist_later(self) -> None:
+        try:
+            await asyncio.sleep(self._persist_window)
+            # readers don't change the file, so it's consistent without writers
+            async with self._writer_lock.async_write_lock():
+                self._persist_task = None
+                await self._persist()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Failed to persist database, retrying.")
+            self._persist_task = asyncio.create_task(self._persist_later())
+
+    def durability_lag(self) -> float:
+        """Seconds since the first write which is not persisted yet, 0 if none."""
+        if self._dirty_since is None:
+            return 0.0
+        return time.monotonic() - self._dirty_since
+
+    def lock_waits(self) -> dict[str, WaitHistogram]:
+        """Histograms of session waits for the database locks, empty if unlocked."""
+        if not isinstance(self._file_lock, AsyncReadWriteLock) or not isinstance(
+            self._writer_lock, AsyncReadWriteLock
+        ):
+            return {}
+        return {
+            "read": self._file_lock.read_waits,
+            "write": self._writer_lock.write_waits,
+            "refresh": self._file_lock.write_waits,
+        }
+
+    async def flush(self) -> None:
+        """Persist pending writes without waiting for the window to pass."""
+        if self._persist_task:
+            self._persist_task.cancel()
+            self._persist_task = None
+        async with self._writer_lock.async_write_lock():
+            await self._persist()
+
     async def shutdown(self) -> None:
         """
-        Dispose of the engine and close all pooled connections.
-        Call this on application shutdown.
+        Persist pending writes, dispose of the engine and close all pooled
+        connections. Call this on application shutdown, which is where uvicorn
+        ends up on SIGTERM too.
         """
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        await self.flush()
         await self.engine.dispose()
 
 
-async def create_db_ctx(db_url: str, log_sql_stmts: bool = False) -> DBCtx:
+async def create_db_ctx(
+    db_url: str,
+    log_sql_stmts: bool = False,
+    persist_window_ms: int = 0,
+    sqlite_pragmas: SQLitePragmas | None = None,
+    refresh_interval_ms: int = 0,
+) -> DBCtx:
     async_engine = create_async_engine(
         db_url,
         echo=log_sql_stmts,
     )
+    if sqlite_pragmas:
+        _apply_sqlite_pragmas(async_engine, sqlite_pragmas)
 
     async with async_engine.begin() as conn:
         # testing DB credentials...
         await conn.execute(text("select '1'"))
 
-    return DBCtx(async_engine)
+    return DBCtx(
+        async_engine,
+        persist_window_ms=persist_window_ms,
+        refresh_interval_ms=refresh_interval_ms,
+    )
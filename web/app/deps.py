@@ -24,7 +24,7 @@ from app.auth.api_key import APIKeyValidator
 from app.auth.oauth import get_oauth
 from app.chats import ChatRepository
 from app.config import Config
-from app.db import DBCtx, create_db_ctx
+from app.db import DBCtx, SQLitePragmas, create_db_ctx
 from app.files import FileRepository
 from app.knowledge_bases import KnowledgeBaseRepository
 from app.messages import MessageRepository
@@ -90,7 +90,14 @@ async def create_deps(
     if db_path:
         db_path.parent.mkdir(parents=True, exist_ok=True)
 
-    db = await create_db_ctx(config.database_uri)
+    db = await create_db_ctx(
+        config.database_uri,
+        persist_window_ms=config.database_persist_window_ms,
+        sqlite_pragmas=(
+            SQLitePragmas() if config.database_sqlite_performance_profile else None
+        ),
+        refresh_interval_ms=config.database_refresh_interval_ms,
+    )
 
     api_key_validator = APIKeyValidator(datarobot_endpoint=config.datarobot_endpoint)
 
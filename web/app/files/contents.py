@@ -16,8 +16,9 @@ import asyncio
 import json
 import logging
 from functools import partial
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
+from core.persistent_fs.async_dr_file_system import get_async_file_system
 from core.persistent_fs.dr_file_system import get_file_system
 
 from core import document_loader
@@ -44,6 +45,11 @@ def calculate_token_count(encoded_content: dict[int, str]) -> int:
     return total_chars // 4
 
 
+def _modified_at(info: dict[str, Any]) -> float:
+    # DataRobot file system nodes have "modified_at", local files "mtime"
+    return float(info.get("modified_at", info.get("mtime", 0.0)))
+
+
 async def get_or_create_encoded_content(
     file: "File",
     file_repo: "FileRepository",
@@ -63,22 +69,31 @@ async def get_or_create_encoded_content(
         Dictionary mapping page numbers to text content, or None if encoding fails
     """
     fs = get_file_system()
-    if not file.file_path or not fs.exists(file.file_path):
-        return None
-
+    afs = get_async_file_system()
     file_path = file.file_path
     encoded_path = f"{file_path}.encoded"
 
+    if not file_path:
+        return None
+    # one metadata lookup per path tells both whether it exists and its age
+    try:
+        file_info = await afs._info(file_path)
+    except FileNotFoundError:
+        return None
+    try:
+        encoded_info: dict[str, Any] | None = await afs._info(encoded_path)
+    except FileNotFoundError:
+        encoded_info = None
+
     # Check if encoded file already exists and is newer than the original
-    if fs.exists(encoded_path) and fs.modified(encoded_path) >= fs.modified(file_path):
+    if encoded_info and _modified_at(encoded_info) >= _modified_at(file_info):
         try:
-            with fs.open(encoded_path, "r", encoding="utf-8") as f:
-                content_str = f.read()
-                content = json.loads(content_str)
-                # Ensure we return the correct type
-                if isinstance(content, dict):
-                    return {int(k): str(v) for k, v in content.items()}
-                # If cached content is not a dict, fall through to re-encode
+            content_str = (await afs._cat_file(encoded_path)).decode("utf-8")
+            content = json.loads(content_str)
+            # Ensure we return the correct type
+            if isinstance(content, dict):
+                return {int(k): str(v) for k, v in content.items()}
+            # If cached content is not a dict, fall through to re-encode
         except Exception as e:
             logger.warning(f"Failed to load cached encoded content: {e}")
 
@@ -97,8 +112,12 @@ async def get_or_create_encoded_content(
 
         # Cache the encoded content
         try:
-            with fs.open(encoded_path, "w", encoding="utf-8") as f:
-                f.write(json.dumps(encoded_content, ensure_ascii=False, indent=2))
+            await afs._pipe_file(
+                encoded_path,
+                json.dumps(encoded_content, ensure_ascii=False, indent=2).encode(
+                    "utf-8"
+                ),
+            )
         except Exception as e:
             logger.warning(f"Failed to cache encoded content: {e}")
 
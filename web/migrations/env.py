@@ -18,11 +18,8 @@ from pathlib import Path
 from typing import cast
 
 from alembic import context
-from core.persistent_fs.dr_file_system import (
-    DRFileSystem,
-    all_env_variables_present,
-    calculate_checksum,
-)
+from core.persistent_fs.dr_file_system import DRFileSystem, all_env_variables_present
+from core.persistent_fs.sqlite_replica import SQLiteReplica
 from sqlalchemy import pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncEngine, async_engine_from_config
@@ -127,22 +124,18 @@ async def run_async_migrations() -> None:
     # getting DB file from persistent storage if applicable
     fs = _get_persistence_fs(connectable)
     _prepare_folder(connectable)  # create a folder for DB file
-    db_path = connectable.url.database
-    checksum: bytes | None = None
+    replica = SQLiteReplica(fs, cast(str, connectable.url.database)) if fs else None
 
-    if fs and fs.exists(db_path):
-        fs.get(db_path, db_path)
-        checksum = calculate_checksum(cast(str, db_path))
+    if replica:
+        replica.restore()
 
     async with connectable.connect() as connection:
         await connection.run_sync(do_run_migrations)
 
     await connectable.dispose()
 
-    if fs:
-        new_checksum = calculate_checksum(cast(str, db_path))
-        if new_checksum != checksum:
-            fs.put(db_path, db_path)
+    if replica:
+        replica.persist()
 
 
 def run_migrations_online() -> None:
@@ -11,10 +11,29 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import zipfile
 from pathlib import Path
+from typing import Any
 
+import docx
+import fitz
 import pytest
-from core.document_loader import convert_document_to_text
+from core.document_loader import (
+    DocProcessorTimeoutError,
+    aiter_document_pages,
+    convert_document_to_text,
+    document_loader,
+    iter_document_pages,
+)
+from core.document_loader.executors import (
+    EXECUTION_BACKENDS,
+    ExecutionBackend,
+    TaskRunner,
+    shutdown_process_pool,
+)
+from docx.enum.section import WD_SECTION
+from fsspec.implementations.local import LocalFileSystem
+from fsspec.implementations.memory import MemoryFileSystem
 
 
 def test_convert_markdown_to_text(shared_datadir: Path) -> None:
@@ -37,3 +56,195 @@ def test_convert_spec_to_text(
     text = convert_document_to_text(str(doc))
     assert "large amounts of feedback from users" in text[first_page]
     assert "This would involve having the nginx" in text[second_page]
+
+
+def _create_pdf(path: Path, pages: int) -> None:
+    with fitz.open() as doc:
+        for page_number in range(1, pages + 1):
+            doc.new_page().insert_text((72, 72), f"Page number {page_number}")
+        doc.save(path)
+
+
+def test_pdf_is_opened_once_per_worker(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "pages.pdf"
+    _create_pdf(path, 40)
+
+    opened = []
+    fitz_open = fitz.open
+
+    def counting_open(*args: Any, **kwargs: Any) -> fitz.Document:
+        opened.append(args)
+        return fitz_open(*args, **kwargs)
+
+    monkeypatch.setattr(document_loader.fitz, "open", counting_open)
+    text = document_loader.extract_text_from_pdf(path, max_workers=4)
+
+    assert sorted(text) == list(range(1, 41))
+    assert all(f"Page number {n}\n" in text[n] for n in text)
+    # counting the pages and one open per worker
+    assert len(opened) == 1 + 4
+
+
+@pytest.mark.parametrize("backend", EXECUTION_BACKENDS)
+def test_execution_backends(shared_datadir: Path, backend: ExecutionBackend) -> None:
+    doc = shared_datadir / "sample_documents" / "developer" / "sample_tech_spec.pdf"
+    try:
+        text = convert_document_to_text(str(doc), backend=backend)
+    finally:
+        shutdown_process_pool()
+    assert text == convert_document_to_text(str(doc), backend="inline")
+    assert "This would involve having the nginx" in text[5]
+
+
+def test_extraction_timeout(shared_datadir: Path) -> None:
+    doc = shared_datadir / "sample_documents" / "developer" / "sample_tech_spec.pdf"
+    with pytest.raises(DocProcessorTimeoutError):
+        convert_document_to_text(str(doc), timeout=0)
+
+    runner = TaskRunner("thread")
+    runner.cancel()
+    with pytest.raises(DocProcessorTimeoutError):
+        document_loader.extract_text_from_pdf(doc, runner=runner)
+
+
+def test_pages_are_streamed_in_order(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "pages.pdf"
+    _create_pdf(path, 200)
+    started: list[range] = []
+    extract_pages = document_loader._extract_pdf_pages_fitz
+
+    def counting_extract(path: Path, pages: range, *args: Any) -> Any:
+        started.append(pages)
+        return extract_pages(path, pages, *args)
+
+    monkeypatch.setattr(document_loader, "_extract_pdf_pages_fitz", counting_extract)
+    pages = iter_document_pages(str(path), max_workers=2)
+    assert next(pages) == (1, "Page number 1\n")
+    # 13 chunks of 16 pages, only the ones of two per worker run ahead
+    assert len(started) <= 5
+    assert [number for number, _ in pages] == list(range(2, 201))
+    assert len(started) == 13
+
+
+@pytest.mark.asyncio
+async def test_pages_are_streamed_asynchronously(shared_datadir: Path) -> None:
+    doc = shared_datadir / "sample_documents" / "developer" / "sample_tech_spec.pdf"
+    pages = [page async for page in aiter_document_pages(str(doc))]
+    assert dict(pages) == convert_document_to_text(str(doc))
+    assert [number for number, _ in pages] == sorted(number for number, _ in pages)
+
+
+def test_local_documents_are_not_copied(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "pages.pdf"
+    _create_pdf(path, 3)
+    opened: list[str] = []
+    fitz_open = fitz.open
+
+    def recording_open(filename: Any = None, *args: Any, **kwargs: Any) -> Any:
+        opened.append(str(filename))
+        return fitz_open(filename, *args, **kwargs)
+
+    monkeypatch.setattr(document_loader.fitz, "open", recording_open)
+    local_fs = LocalFileSystem()
+    assert convert_document_to_text(str(path), file_system=local_fs)[3]
+    assert set(opened) == {str(path)}
+
+    # file systems without local files still get a temporary copy
+    memory_fs = MemoryFileSystem()
+    memory_fs.pipe("/docs/pages.pdf", path.read_bytes())
+    opened.clear()
+    text = convert_document_to_text("/docs/pages.pdf", file_system=memory_fs)
+    assert text == convert_document_to_text(str(path))
+    assert str(path) not in opened[0] and opened[0].endswith("pages.pdf")
+
+
+def _create_docx(path: Path, sections: int) -> None:
+    document = docx.Document()
+    for section in range(1, sections + 1):
+        document.add_paragraph(f"Section {section} first page")
+        document.add_page_break()
+        document.add_paragraph(f"Section {section} second page")
+        table = document.add_table(rows=2, cols=2)
+        for row, cells in enumerate(table.rows):
+            for column, cell in enumerate(cells.cells):
+                cell.text = f"cell {section}.{row}.{column}"
+        # odd sections are followed by a continuous one on the same page
+        document.add_section(
+            WD_SECTION.CONTINUOUS if section % 2 else WD_SECTION.NEW_PAGE
+        )
+    document.save(str(path))
+
+
+def test_docx_pages_follow_page_and_section_breaks(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "sections.docx"
+    _create_docx(path, 4)
+    text = convert_document_to_text(str(path))
+
+    # the empty paragraph holds properties of the section it ends
+    assert text == {
+        1: "Section 1 first page",
+        2: "Section 1 second page\n"
+        "cell 1.0.0\tcell 1.0.1\ncell 1.1.0\tcell 1.1.1\n\n"
+        "Section 2 first page",
+        3: "Section 2 second page\ncell 2.0.0\tcell 2.0.1\ncell 2.1.0\tcell 2.1.1",
+        4: "Section 3 first page",
+        5: "Section 3 second page\n"
+        "cell 3.0.0\tcell 3.0.1\ncell 3.1.0\tcell 3.1.1\n\n"
+        "Section 4 first page",
+        6: "Section 4 second page\ncell 4.0.0\tcell 4.0.1\ncell 4.1.0\tcell 4.1.1",
+    }
+
+    # large bodies are split at section breaks and parsed in parallel
+    parse_docx_body = document_loader.parse_docx_body
+    parsed: list[Any] = []
+
+    def counting_parse(*args: Any) -> Any:
+        parsed.append(args)
+        return parse_docx_body(*args)
+
+    monkeypatch.setattr(document_loader, "parse_docx_body", counting_parse)
+    monkeypatch.setattr(document_loader, "DOCX_MIN_BYTES_PER_WORKER", 1)
+    assert convert_document_to_text(str(path), max_workers=3) == text
+    assert len(parsed) == 3
+
+
+def test_docx_body_part_follows_package_relationships(tmp_path: Path) -> None:
+    path = tmp_path / "sections.docx"
+    _create_docx(path, 2)
+    text = convert_document_to_text(str(path))
+
+    # the main document part may have any name the relationships point to
+    renamed = tmp_path / "renamed.docx"
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(renamed, "w") as target:
+        for item in source.infolist():
+            data = source.read(item)
+            if item.filename == "word/document.xml":
+                item.filename = "word/main.xml"
+            elif item.filename == "_rels/.rels":
+                data = data.replace(b"word/document.xml", b"/word/main.xml")
+            target.writestr(item, data)
+    assert convert_document_to_text(str(renamed)) == text
+
+
+def test_docx_body_is_parsed_whole_if_fragments_are_malformed(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "sections.docx"
+    _create_docx(path, 4)
+    text = convert_document_to_text(str(path))
+
+    def split_anywhere(document_xml: bytes, max_fragments: int) -> list[bytes]:
+        middle = len(document_xml) // 2
+        return [document_xml[:middle], document_xml[middle:]]
+
+    monkeypatch.setattr(document_loader, "split_docx_body", split_anywhere)
+    monkeypatch.setattr(document_loader, "DOCX_MIN_BYTES_PER_WORKER", 1)
+    assert convert_document_to_text(str(path), max_workers=2) == text
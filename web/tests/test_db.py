@@ -0,0 +1,202 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from core.persistent_fs import sqlite_replica
+from core.persistent_fs.dr_file_system import DRFileSystem
+from core.persistent_fs.sqlite_replica import SQLiteReplica
+from core.utils.rw_lock import AsyncReadWriteLock
+from sqlalchemy import text
+
+from app.db import DBCtx, SQLitePragmas, create_db_ctx
+
+
+async def _create_db_ctx(
+    tmp_path: Path, persist_window_ms: int, refresh_interval_ms: int = 0
+) -> DBCtx:
+    db = await create_db_ctx(
+        f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}",
+        persist_window_ms=persist_window_ms,
+        sqlite_pragmas=SQLitePragmas(),
+        refresh_interval_ms=refresh_interval_ms,
+    )
+    db._replica = MagicMock(spec=SQLiteReplica)
+    db._replica.fetch.return_value = None
+    db._replica.log_pending.return_value = False
+    async with db.engine.begin() as conn:
+        await conn.execute(text("create table t (id integer)"))
+    return db
+
+
+async def _write(db: DBCtx) -> None:
+    async with db.session(writable=True) as session:
+        await session.execute(text("insert into t values (1)"))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_writes_within_window_are_persisted_together(tmp_path: Path) -> None:
+    db = await _create_db_ctx(tmp_path, persist_window_ms=50)
+    for _ in range(4):
+        await _write(db)
+    assert db._replica.persist.call_count == 0  # type: ignore[union-attr]
+    assert db.durability_lag() > 0
+
+    await asyncio.sleep(0.2)
+    assert db._replica.persist.call_count == 1  # type: ignore[union-attr]
+    assert db.durability_lag() == 0
+    assert db.persistence_stats.write_sessions == 4
+    assert db.persistence_stats.persists == 1
+    assert db.persistence_stats.max_durability_lag >= 0.05
+
+    # pending writes are not overwritten by the stored database
+    await _write(db)
+    async with db.session() as session:
+        await session.execute(text("select 1"))
+    # reads don't refresh it, writes only the first one of each window
+    assert db._replica.fetch.call_count == 2  # type: ignore[union-attr]
+
+    await db.shutdown()
+    assert db._replica.persist.call_count == 2  # type: ignore[union-attr]
+
+
+@pytest.mark.asyncio
+async def test_zero_window_persists_each_write(tmp_path: Path) -> None:
+    db = await _create_db_ctx(tmp_path, persist_window_ms=0)
+    await _write(db)
+    await _write(db)
+    assert db._replica.persist.call_count == 2  # type: ignore[union-attr]
+    await db.shutdown()
+    assert db._replica.persist.call_count == 2  # type: ignore[union-attr]
+
+
+@pytest.mark.asyncio
+async def test_reads_do_not_wait_for_writes_or_refreshes(tmp_path: Path) -> None:
+    db = await _create_db_ctx(tmp_path, persist_window_ms=0)
+    db._file_lock = AsyncReadWriteLock()
+    db._writer_lock = AsyncReadWriteLock()
+
+    committed = asyncio.Event()
+    finish_write = asyncio.Event()
+
+    async def long_write() -> None:
+        async with db.session(writable=True) as session:
+            await session.execute(text("insert into t values (1)"))
+            await session.commit()
+            committed.set()
+            await finish_write.wait()
+
+    writer = asyncio.create_task(long_write())
+    await committed.wait()
+    async with db.session() as session:
+        result = await session.execute(text("select count(*) from t"))
+        assert result.scalar() == 1
+    finish_write.set()
+    await writer
+
+    # nor for a refresh downloading the stored database
+    downloading = threading.Event()
+    download = threading.Event()
+
+    def fetch() -> MagicMock:
+        downloading.set()
+        download.wait(5)
+        return MagicMock()
+
+    db._replica.fetch.side_effect = fetch  # type: ignore[union-attr]
+    db._refresh_interval = 0.01
+    async with db.session() as session:  # starts refreshing
+        await session.execute(text("select 1"))
+    assert await asyncio.to_thread(downloading.wait, 5)
+    async with db.session() as session:
+        await session.execute(text("select 1"))
+    assert db._replica.apply.call_count == 0  # type: ignore[union-attr]
+
+    download.set()
+    while not db.persistence_stats.refreshes:
+        await asyncio.sleep(0.01)
+    assert db._replica.apply.call_count >= 1  # type: ignore[union-attr]
+    await db.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_persist_waits_for_readers_of_the_wal(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(sqlite_replica, "WAL_CHECKPOINT_TIMEOUT", 0.1)
+    db = await _create_db_ctx(tmp_path, persist_window_ms=0)
+    db._file_lock = file_lock = AsyncReadWriteLock()
+    db._writer_lock = AsyncReadWriteLock()
+    fs = MagicMock(spec=DRFileSystem)
+    fs.exists.return_value = False
+    db._replica = SQLiteReplica(fs, str(tmp_path / "db.sqlite"))
+    wal_path = tmp_path / "db.sqlite-wal"
+
+    reading = asyncio.Event()
+    finish_read = asyncio.Event()
+
+    async def long_read() -> None:
+        async with db.session() as session:
+            await session.execute(text("select count(*) from t"))
+            reading.set()
+            await finish_read.wait()
+
+    reader = asyncio.create_task(long_read())
+    await reading.wait()
+    writer = asyncio.create_task(_write(db))
+
+    async def persist_waiting() -> None:
+        while not wal_path.stat().st_size or not file_lock._waiters:
+            await asyncio.sleep(0.01)
+
+    # the write is committed, its persist waits for the reader to leave
+    await asyncio.wait_for(persist_waiting(), timeout=5)
+    assert not fs.pipe_file.called
+    finish_read.set()
+    await asyncio.gather(reader, writer)
+
+    assert wal_path.stat().st_size == 0
+    assert fs.pipe_file.called
+    assert db.persistence_stats.persists == 1
+    await db.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_pragmas_are_applied_on_connect(tmp_path: Path) -> None:
+    db = await create_db_ctx(
+        f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}",
+        sqlite_pragmas=SQLitePragmas(busy_timeout=1234),
+    )
+    async with db.session() as session:
+        for pragma, expected in [
+            ("journal_mode", "wal"),
+            ("synchronous", 1),  # NORMAL
+            ("temp_store", 2),  # MEMORY
+            ("busy_timeout", 1234),
+        ]:
+            result = await session.execute(text(f"PRAGMA {pragma}"))
+            assert result.scalar() == expected
+    await db.shutdown()
+
+    # the memory database has no journal file to switch to WAL
+    db = await create_db_ctx("sqlite+aiosqlite://", sqlite_pragmas=SQLitePragmas())
+    async with db.session() as session:
+        result = await session.execute(text("PRAGMA journal_mode"))
+        assert result.scalar() == "memory"
+    await db.shutdown()
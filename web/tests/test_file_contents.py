@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import json
+import os
 import tempfile
 import uuid
 from pathlib import Path
@@ -172,6 +173,32 @@ class TestGetOrCreateEncodedContent:
 
         assert result == {1: "Cached page 1", 2: "Cached page 2"}
 
+    @pytest.mark.asyncio
+    async def test_get_or_create_encoded_content_stale_cache(
+        self,
+        temp_file_with_content: str,
+        mock_file_for_temp_path: Mock,
+        mock_file_repo: AsyncMock,
+    ) -> None:
+        """Test function re-encodes a file changed after its content was cached."""
+        encoded_path = f"{temp_file_with_content}.encoded"
+        with open(encoded_path, "w") as f:
+            json.dump({1: "Stale page"}, f)
+        modified_at = Path(temp_file_with_content).stat().st_mtime
+        os.utime(encoded_path, (modified_at - 10, modified_at - 10))
+
+        mock_content = {1: "Test page 1"}
+        with patch(
+            "core.document_loader.convert_document_to_text", return_value=mock_content
+        ):
+            result = await get_or_create_encoded_content(
+                mock_file_for_temp_path, mock_file_repo
+            )
+
+        assert result == mock_content
+        with open(encoded_path) as f:
+            assert json.load(f) == {"1": "Test page 1"}
+
     @pytest.mark.asyncio
     async def test_get_or_create_encoded_content_cached_invalid_json(
         self,